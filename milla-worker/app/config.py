@@ -16,13 +16,109 @@ class Settings(BaseSettings):
     
     # Worker
     poll_interval_seconds: int = 30
-    job_claim_limit: int = 10
+    # Direct Postgres connection for LISTEN/NOTIFY wakeup (empty = poll only)
+    database_url: str = ""
+    safety_poll_interval_seconds: int = 300
+    # Keep claiming batches while the queue is non-empty
+    drain_enabled: bool = True
+    drain_max_seconds: float = 300
+    # Keyset page size for subscription scans (keep <= PostgREST max-rows)
+    subscription_page_size: int = 1000
+    job_enqueue_chunk_size: int = 500
+    subscription_full_scan_interval_seconds: int = 3600
+    
+    # Expired forecast cleanup (ids go in the DELETE URL, keep batches modest)
+    cleanup_batch_size: int = 200
+    cleanup_time_budget_seconds: float = 300
+    job_claim_limit: int = 50
+    claim_with_context: bool = True  # needs migration 017
+    job_concurrency: int = 50
+    job_type_concurrency: dict[str, int] = {
+        "generate_reading": 50,
+        "generate_forecast": 25,
+        "generate_reading_bundle": 10,
+        # TTS calls of all audio jobs share the minimax_concurrency cap
+        "generate_forecast_audio": 5,
+    }
+    
+    # Strict JSON-schema response formats; length keywords only for models
+    # that accept minLength/maxLength in strict mode
+    structured_outputs_enabled: bool = True
+    structured_output_length_keywords: bool = False
+    
+    # Rewrite fields with forbidden terms instead of regenerating
+    content_repair_enabled: bool = True
+    # Stream single completions and abort once they cannot validate
+    streaming_validation_enabled: bool = False
+    
+    # Hedged completions: a second request once the first is slower than the
+    # hedge_percentile of recent latencies, at most hedge_max_rate of requests
+    hedging_enabled: bool = False
+    hedge_percentile: float = 95
+    hedge_window: int = 200
+    hedge_min_samples: int = 20
+    hedge_initial_delay_seconds: float = 15
+    hedge_max_rate: float = 0.1
+    
+    # One job (one chat completion) for all five reading sections
+    reading_bundle_enabled: bool = True
+    
+    # Hot-path caches (TTL 0 disables)
+    prompt_cache_ttl_seconds: float = 300
+    prompt_cache_max_size: int = 64
+    profile_cache_ttl_seconds: float = 60
+    profile_cache_max_size: int = 10000
+    # Secret for POST /cache/invalidate (X-Admin-Token header); empty disables the route
+    cache_invalidate_token: str = ""
+    
+    # Batched forecast prompts (1 = one user per request)
+    forecast_batch_size: int = 1
+    forecast_batch_max_tokens: int = 15000
+    forecast_batch_window_seconds: float = 0.05
+    
+    # Scheduled forecasts: "realtime" jobs at delivery time or "batch" (OpenAI
+    # Batch API submitted the day before, needs migration 020)
+    forecast_backend: str = "realtime"
+    forecast_batch_poll_seconds: int = 300
+    
+    # Shared generation cache (readings reused across users, personalized by name)
+    generation_cache_enabled: bool = True
+    generation_cache_variants: int = 3
+    generation_cache_ttl_seconds: float = 3600
+    generation_cache_max_size: int = 2000
+    
+    # Shared HTTP transport (OpenAI, Minimax, Supabase)
+    http2_enabled: bool = True
+    http_max_connections: int = 100
+    http_max_keepalive_connections: int = 50
+    http_keepalive_expiry_seconds: float = 60
+    http_timeout_seconds: float = 60
+    http_warmup: bool = True
     
     # Minimax TTS
     minimax_api_key: str = ""
     minimax_voice_id: str = ""
     minimax_group_id: str = ""
     minimax_timeout_seconds: int = 60
+    minimax_base_url: str = "https://api.minimax.io"
+    # Long texts are split at sentence boundaries and synthesized concurrently;
+    # minimax_concurrency caps TTS calls in flight across the whole worker
+    minimax_chunk_max_chars: int = 1000
+    minimax_concurrency: int = 4
+    # stream: true synthesis piped into a chunked Storage upload
+    minimax_streaming_enabled: bool = False
+    # Consecutive transient TTS failures that open the circuit (0 disables)
+    minimax_breaker_failure_threshold: int = 5
+    # Seconds the circuit stays open before a probe call is let through
+    minimax_breaker_recovery_seconds: float = 30
+    # Content-addressed forecast audio, reused across retries and equal texts
+    # (needs migration 021)
+    audio_cache_enabled: bool = True
+    audio_cache_ttl_seconds: float = 3600
+    audio_cache_max_size: int = 1000
+    # Deliver forecast text at once and voice it in a later low-priority
+    # generate_forecast_audio job (needs migration 022)
+    forecast_audio_deferred: bool = True
     
     class Config:
         env_file = ".env"
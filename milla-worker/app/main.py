@@ -1,24 +1,46 @@
 """
 Milla Worker - FastAPI application with APScheduler.
 
-Polls for pending jobs every 30 seconds and processes them.
+Processes pending jobs on the application's event loop, woken by Postgres
+NOTIFY when DATABASE_URL is set (polling as a slow safety net) or every
+30 seconds otherwise. Cron tasks that use the sync Supabase client run on
+the scheduler's thread executor.
 """
 
+import asyncio
 import structlog
 import pytz
+import secrets
 from contextlib import asynccontextmanager
 from datetime import datetime, date, timedelta
-from fastapi import FastAPI
-from apscheduler.schedulers.background import BackgroundScheduler
+from fastapi import FastAPI, Header, HTTPException
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 
 from app.config import get_settings
 from app.services.job_processor import (
     process_pending_jobs,
+    drain_pending_jobs,
     check_and_enqueue_for_active_subscriptions,
     enqueue_forecast_jobs_for_all_users,
     cleanup_expired_forecasts,
+    cleanup_expired_generations,
 )
+from app.services.job_wakeup import JobWakeup
+from app.services.cache import cache_stats, invalidate_caches
+from app.services.http_transport import warm_http_client, close_http_client, transport_stats
+from app.services.forecast_generator import forecast_batching_stats, forecast_period
+from app.services.forecast_batch import (
+    submit_forecast_batch,
+    poll_forecast_batches,
+    deliver_batched_forecasts,
+)
+from app.services.structured_outputs import completions_stats
+from app.services.streaming_completions import streaming_stats
+from app.services.hedging import hedging_stats
+from app.services.minimax_service import get_minimax_breaker
+from app.models.forecast import ForecastType
 
 # São Paulo timezone
 SAO_PAULO_TZ = pytz.timezone('America/Sao_Paulo')
@@ -44,36 +66,81 @@ structlog.configure(
 
 logger = structlog.get_logger()
 
-# Scheduler instance
-scheduler = BackgroundScheduler()
+# Scheduler instance (runs coroutine jobs on the FastAPI event loop)
+scheduler = AsyncIOScheduler()
+
+# Job loop state (created in lifespan)
+wakeup: JobWakeup | None = None
+job_loop_task: asyncio.Task | None = None
 
 
-def scheduled_job_processor():
-    """Scheduled task to process pending jobs."""
+async def scheduled_job_processor() -> bool:
+    """
+    Scheduled task to process pending jobs.
+    
+    Returns:
+        True if a drain stopped with backlog left (run again immediately)
+    """
+    settings = get_settings()
+    
     try:
         # First, check for new subscriptions and enqueue jobs
-        check_and_enqueue_for_active_subscriptions()
+        await asyncio.to_thread(check_and_enqueue_for_active_subscriptions)
         
         # Then process pending jobs
-        count = process_pending_jobs()
+        if settings.drain_enabled:
+            stats = await drain_pending_jobs()
+            return stats.backlog_remaining
+        
+        count = await process_pending_jobs()
         if count:
             logger.info("scheduled_run_complete", processed=count)
     except Exception as e:
         logger.error("scheduled_run_error", error=str(e))
+    
+    return False
+
+
+async def run_job_loop(wakeup: JobWakeup):
+    """
+    Process jobs whenever woken, forever.
+    
+    Goes straight into the next cycle while backlog remains; otherwise waits.
+    With LISTEN active the poll only runs every safety_poll_interval_seconds.
+    """
+    settings = get_settings()
+    
+    while True:
+        if await scheduled_job_processor():
+            continue
+        
+        timeout = (
+            settings.safety_poll_interval_seconds
+            if wakeup.listening
+            else settings.poll_interval_seconds
+        )
+        notified = await wakeup.wait(timeout)
+        logger.debug("job_loop_woken", reason="notify" if notified else "poll")
+
+
+def deliver_forecasts(forecast_type: ForecastType) -> int:
+    """
+    Deliver the forecasts of the period that starts with today's cron.
+    
+    Realtime backend enqueues one job per subscriber; batch backend releases
+    the forecasts ingested from the batch submitted the day before.
+    """
+    period_start, period_end = forecast_period(forecast_type, date.today())
+    
+    if get_settings().forecast_backend == "batch":
+        return deliver_batched_forecasts(forecast_type, period_start, period_end)
+    return enqueue_forecast_jobs_for_all_users(forecast_type.value, period_start, period_end)
 
 
 def trigger_weekly_forecasts():
     """Trigger weekly forecast generation for all active users."""
     try:
-        today = date.today()
-        # Find next Sunday (week start)
-        days_until_sunday = (6 - today.weekday()) % 7
-        if days_until_sunday == 0:
-            days_until_sunday = 7
-        week_start = today + timedelta(days=days_until_sunday)
-        week_end = week_start + timedelta(days=6)
-        
-        count = enqueue_forecast_jobs_for_all_users("weekly", week_start, week_end)
+        count = deliver_forecasts(ForecastType.WEEKLY)
         logger.info("weekly_forecasts_triggered", count=count)
     except Exception as e:
         logger.error("weekly_forecasts_error", error=str(e))
@@ -82,16 +149,7 @@ def trigger_weekly_forecasts():
 def trigger_monthly_forecasts():
     """Trigger monthly forecast generation for all active users."""
     try:
-        today = date.today()
-        # Current month
-        month_start = date(today.year, today.month, 1)
-        # Last day of current month
-        if today.month == 12:
-            month_end = date(today.year + 1, 1, 1) - timedelta(days=1)
-        else:
-            month_end = date(today.year, today.month + 1, 1) - timedelta(days=1)
-        
-        count = enqueue_forecast_jobs_for_all_users("monthly", month_start, month_end)
+        count = deliver_forecasts(ForecastType.MONTHLY)
         logger.info("monthly_forecasts_triggered", count=count)
     except Exception as e:
         logger.error("monthly_forecasts_error", error=str(e))
@@ -100,22 +158,40 @@ def trigger_monthly_forecasts():
 def trigger_yearly_forecasts():
     """Trigger yearly forecast generation for all active users."""
     try:
-        year = date.today().year
-        year_start = date(year, 1, 1)
-        year_end = date(year, 12, 31)
-        
-        count = enqueue_forecast_jobs_for_all_users("yearly", year_start, year_end)
+        count = deliver_forecasts(ForecastType.YEARLY)
         logger.info("yearly_forecasts_triggered", count=count)
     except Exception as e:
         logger.error("yearly_forecasts_error", error=str(e))
 
 
+def trigger_forecast_batch(forecast_type: str):
+    """Submit tomorrow's forecast delivery as an OpenAI batch (batch backend)."""
+    try:
+        forecast_type = ForecastType(forecast_type)
+        period_start, period_end = forecast_period(forecast_type, date.today() + timedelta(days=1))
+        batch_id = submit_forecast_batch(forecast_type, period_start, period_end)
+        logger.info("forecast_batch_triggered", forecast_type=forecast_type.value, batch_id=batch_id)
+    except Exception as e:
+        logger.error("forecast_batch_error", forecast_type=forecast_type, error=str(e))
+
+
+def scheduled_forecast_batch_poll():
+    """Ingest finished forecast batches."""
+    try:
+        finished = poll_forecast_batches()
+        if finished:
+            logger.info("forecast_batch_poll_complete", finished=finished)
+    except Exception as e:
+        logger.error("forecast_batch_poll_error", error=str(e))
+
+
 def scheduled_cleanup():
-    """Scheduled task to cleanup expired forecasts."""
+    """Scheduled task to cleanup expired forecasts and cached archetypes."""
     try:
         count = cleanup_expired_forecasts()
         if count:
             logger.info("cleanup_complete", deleted=count)
+        cleanup_expired_generations()
     except Exception as e:
         logger.error("cleanup_error", error=str(e))
 
@@ -123,16 +199,17 @@ def scheduled_cleanup():
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan - start/stop scheduler."""
+    global wakeup, job_loop_task
     settings = get_settings()
     
-    # Job processor (every 30 seconds)
-    scheduler.add_job(
-        scheduled_job_processor,
-        "interval",
-        seconds=settings.poll_interval_seconds,
-        id="job_processor",
-        replace_existing=True,
-    )
+    # Pooled connections to OpenAI/Supabase/Minimax before the first job
+    if settings.http_warmup:
+        await warm_http_client()
+    
+    # Job processor (NOTIFY wakeup with polling fallback)
+    wakeup = JobWakeup(settings.database_url)
+    await wakeup.start()
+    job_loop_task = asyncio.create_task(run_job_loop(wakeup))
     
     # Weekly forecasts - Sunday 20:00 BRT
     scheduler.add_job(
@@ -158,6 +235,33 @@ async def lifespan(app: FastAPI):
         replace_existing=True,
     )
     
+    crons = ["weekly_forecasts", "monthly_forecasts", "yearly_forecasts", "forecast_cleanup"]
+    
+    if settings.forecast_backend == "batch":
+        # Submit the day before each delivery cron, poll until ingested
+        batch_crons = {
+            "weekly": CronTrigger(day_of_week='sat', hour=20, minute=0, timezone=SAO_PAULO_TZ),
+            "monthly": CronTrigger(day='last', hour=8, minute=0, timezone=SAO_PAULO_TZ),
+            "yearly": CronTrigger(month=12, day=31, hour=8, minute=0, timezone=SAO_PAULO_TZ),
+        }
+        for forecast_type, trigger in batch_crons.items():
+            scheduler.add_job(
+                trigger_forecast_batch,
+                trigger,
+                args=[forecast_type],
+                id=f'{forecast_type}_forecast_batch',
+                replace_existing=True,
+            )
+            crons.append(f'{forecast_type}_forecast_batch')
+        
+        scheduler.add_job(
+            scheduled_forecast_batch_poll,
+            IntervalTrigger(seconds=settings.forecast_batch_poll_seconds),
+            id='forecast_batch_poll',
+            replace_existing=True,
+        )
+        crons.append('forecast_batch_poll')
+    
     # Cleanup expired forecasts - Daily 3:00 BRT
     scheduler.add_job(
         scheduled_cleanup,
@@ -170,13 +274,18 @@ async def lifespan(app: FastAPI):
     logger.info(
         "scheduler_started",
         poll_interval=settings.poll_interval_seconds,
-        crons=["weekly_forecasts", "monthly_forecasts", "yearly_forecasts", "forecast_cleanup"],
+        listen_enabled=bool(settings.database_url),
+        forecast_backend=settings.forecast_backend,
+        crons=crons,
     )
     
     yield
     
-    # Shutdown scheduler
+    # Shutdown job loop and scheduler
+    job_loop_task.cancel()
+    await wakeup.stop()
     scheduler.shutdown(wait=False)
+    await close_http_client()
     logger.info("scheduler_stopped")
 
 
@@ -196,9 +305,52 @@ async def health():
         "status": "ok",
         "timestamp": datetime.utcnow().isoformat(),
         "scheduler_running": scheduler.running,
+        "job_loop_running": job_loop_task is not None and not job_loop_task.done(),
+        "wakeup_mode": "listen" if wakeup and wakeup.listening else "poll",
+        "minimax_circuit": get_minimax_breaker().state,
     }
 
 
+@app.get("/metrics")
+async def metrics():
+    """In-process counters (cache hit rates, HTTP connection reuse, completion retries, ...)."""
+    return {
+        "caches": cache_stats(),
+        "http": transport_stats(),
+        "forecast_batching": forecast_batching_stats(),
+        "completions": completions_stats(),
+        "streaming": streaming_stats(),
+        "hedging": hedging_stats(),
+        "circuit_breakers": {"minimax": get_minimax_breaker().stats()},
+    }
+
+
+@app.post("/cache/invalidate")
+async def invalidate_cache(
+    section: str | None = None,
+    user_id: str | None = None,
+    x_admin_token: str | None = Header(default=None),
+):
+    """
+    Drop cached prompts/profiles.
+    
+    Call after activating a new prompt version so workers pick it up
+    before the TTL expires. No parameters clears everything.
+    
+    Needs CACHE_INVALIDATE_TOKEN in the X-Admin-Token header (the route
+    does not exist without it): a flush sends every lookup to Supabase.
+    """
+    token = get_settings().cache_invalidate_token
+    if not token:
+        raise HTTPException(status_code=404)
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, token):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+    
+    removed = invalidate_caches(section=section, user_id=user_id)
+    logger.info("cache_invalidated", section=section, removed=removed)
+    return {"success": True, "removed": removed}
+
+
 @app.get("/")
 async def root():
     """Root endpoint."""
@@ -218,10 +370,10 @@ async def trigger_job_processing():
     """
     try:
         # Check for subscriptions
-        enqueued = check_and_enqueue_for_active_subscriptions()
+        enqueued = await asyncio.to_thread(check_and_enqueue_for_active_subscriptions)
         
         # Process jobs
-        processed = process_pending_jobs()
+        processed = await process_pending_jobs()
         
         return {
             "success": True,
@@ -30,6 +30,10 @@ MONTH_NAMES = {
 }
 
 
+# Linguagem determinística proibida no conteúdo
+FORECAST_FORBIDDEN_TERMS = ['vai acontecer', 'certamente', 'definitivamente', 'sem dúvida']
+
+
 class ForecastContent(BaseModel):
     """Conteúdo validado da previsão gerada pela IA."""
     
@@ -41,9 +45,8 @@ class ForecastContent(BaseModel):
     @classmethod
     def no_deterministic_language(cls, v: str) -> str:
         """Valida que não há linguagem determinística inadequada."""
-        forbidden = ['vai acontecer', 'certamente', 'definitivamente', 'sem dúvida']
         v_lower = v.lower()
-        for term in forbidden:
+        for term in FORECAST_FORBIDDEN_TERMS:
             if term in v_lower:
                 raise ValueError(f"Linguagem determinística: '{term}'")
         return v
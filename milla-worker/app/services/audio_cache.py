@@ -0,0 +1,204 @@
+"""
+Content-addressed cache of synthesized forecast audio.
+
+Audio depends only on the text and the TTS settings (voice, model, voice
+and audio settings, chunk size), so it is stored once under
+cache/{audio_key}.mp3 in the forecasts-audio bucket and indexed in the
+audio_cache table (migration 021). A job retried after TTS, or another
+forecast with the same text, reuses that object instead of paying for a
+new synthesis; the path is deterministic, so retries leave no orphans.
+
+Cached objects are shared, so forecast cleanup leaves them alone; they go
+with their row once its expires_at (the latest expiry of a forecast that
+used it) has passed.
+"""
+
+import hashlib
+import json
+import uuid
+from datetime import datetime, timezone
+from typing import Optional
+
+import structlog
+
+from app.config import get_settings
+from app.services.cache import get_audio_cache
+from app.services.minimax_service import (
+    AUDIO_BUCKET,
+    AUDIO_SETTING,
+    TTS_MODEL,
+    VOICE_SETTING,
+    SpeechStream,
+    synthesize_long_speech_async,
+    upload_audio_stream_async,
+    upload_audio_to_storage_async,
+)
+from app.services.supabase_client import get_async_supabase_client
+
+logger = structlog.get_logger()
+
+CACHE_PREFIX = "cache/"
+
+
+def audio_cache_key(text: str) -> str:
+    """Hash of everything the synthesized audio depends on."""
+    settings = get_settings()
+    inputs = {
+        "text": text,
+        "voice_id": settings.minimax_voice_id,
+        "model": TTS_MODEL,
+        "voice_setting": VOICE_SETTING,
+        "audio_setting": AUDIO_SETTING,
+        "chunk_max_chars": settings.minimax_chunk_max_chars,
+    }
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+
+
+def audio_cache_path(audio_key: str) -> str:
+    """Object path of a cached audio in the forecasts-audio bucket."""
+    return f"{CACHE_PREFIX}{audio_key}.mp3"
+
+
+async def get_or_synthesize_audio(
+    user_id: str,
+    text: str,
+    expires_at: Optional[datetime] = None,
+) -> tuple[Optional[str], Optional[float], str]:
+    """
+    Public URL of the audio for text, synthesizing and uploading it on a miss.
+
+    Concurrent callers for the same audio in this process share one
+    synthesis; other workers find it in the table afterwards.
+
+    Args:
+        user_id: Owner of the forecast (path of uncached audio)
+        text: Text to voice
+        expires_at: Expiry of the forecast that will use the audio (None = never)
+
+    Returns:
+        (public URL or None if the upload failed, duration in seconds,
+        cache status: "hit", "miss" or "bypass")
+    """
+    settings = get_settings()
+
+    if not settings.audio_cache_enabled:
+        url, duration, _ = await _synthesize_and_upload(text, user_id, None)
+        return url, duration, "bypass"
+
+    audio_key = audio_cache_key(text)
+    synthesized = False
+
+    async def load() -> Optional[dict]:
+        nonlocal synthesized
+        entry = await _fetch_entry(audio_key)
+        if entry is not None:
+            return entry
+
+        path = audio_cache_path(audio_key)
+        url, duration, size = await _synthesize_and_upload(text, user_id, path)
+        synthesized = True
+        if url is None:
+            return None
+
+        entry = {"storage_path": path, "duration_seconds": duration, "expires_at": _iso(expires_at)}
+        await _store_entry(audio_key, entry, size)
+        return entry
+
+    entry = await get_audio_cache().get_or_load(audio_key, load)
+    if entry is None:
+        return None, None, "miss"
+
+    # Every hit, in-process ones included, may come from a longer-lived
+    # forecast; the row is only written when the expiry moves later
+    await _extend_entry(audio_key, entry, expires_at)
+
+    supabase = await get_async_supabase_client()
+    url = await supabase.storage.from_(AUDIO_BUCKET).get_public_url(entry["storage_path"])
+    return url, entry["duration_seconds"], "miss" if synthesized else "hit"
+
+
+async def _synthesize_and_upload(
+    text: str,
+    user_id: str,
+    storage_path: Optional[str],
+) -> tuple[Optional[str], float, int]:
+    settings = get_settings()
+    # Uncached audio gets a fresh path per forecast
+    forecast_id = str(uuid.uuid4())
+
+    if settings.minimax_streaming_enabled:
+        # Audio goes to Storage as it is synthesized
+        speech = SpeechStream(text)
+        try:
+            url = await upload_audio_stream_async(speech, user_id, forecast_id, storage_path)
+        finally:
+            await speech.aclose()
+        return url, speech.duration, speech.size
+
+    audio_bytes, duration = await synthesize_long_speech_async(text)
+    url = await upload_audio_to_storage_async(audio_bytes, user_id, forecast_id, storage_path)
+    return url, duration, len(audio_bytes)
+
+
+async def _fetch_entry(audio_key: str) -> Optional[dict]:
+    supabase = await get_async_supabase_client()
+
+    try:
+        result = await supabase.table("audio_cache").select(
+            "storage_path, duration_seconds, expires_at"
+        ).eq("audio_key", audio_key).limit(1).execute()
+    except Exception as e:
+        # Cache is best effort: a failed read is a miss
+        logger.warning("audio_cache_read_failed", error=str(e)[:200])
+        return None
+
+    return result.data[0] if result.data else None
+
+
+async def _extend_entry(audio_key: str, entry: dict, expires_at: Optional[datetime]) -> None:
+    # Keep the object as long as the longest-lived forecast using it
+    current = entry.get("expires_at")
+    if current is None or (expires_at is not None and _naive_utc(expires_at) <= _naive_utc(current)):
+        return
+
+    entry["expires_at"] = _iso(expires_at)
+    supabase = await get_async_supabase_client()
+    try:
+        await supabase.table("audio_cache").update(
+            {"expires_at": entry["expires_at"]}
+        ).eq("audio_key", audio_key).execute()
+    except Exception as e:
+        logger.warning("audio_cache_write_failed", error=str(e)[:200])
+
+
+async def _store_entry(audio_key: str, entry: dict, size_bytes: int) -> None:
+    settings = get_settings()
+    supabase = await get_async_supabase_client()
+
+    try:
+        await supabase.table("audio_cache").upsert(
+            {
+                "audio_key": audio_key,
+                **entry,
+                "size_bytes": size_bytes,
+                "voice_id": settings.minimax_voice_id,
+                "model_used": TTS_MODEL,
+            },
+            on_conflict="audio_key",
+        ).execute()
+        logger.info("audio_cached", audio_key=audio_key[:12], size_bytes=size_bytes)
+    except Exception as e:
+        logger.warning("audio_cache_write_failed", error=str(e)[:200])
+
+
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def _naive_utc(value) -> datetime:
+    # Table timestamps come back as aware ISO strings; job expiries are naive UTC
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
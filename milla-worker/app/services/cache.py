@@ -0,0 +1,222 @@
+"""
+In-process TTL cache for hot-path lookups (prompts, profiles).
+
+Entries expire after a TTL and the least recently used entry is evicted
+once max_size is reached. Concurrent async loads of the same key share
+one database round trip. Hit/miss counters are exposed via stats().
+"""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+from app.config import get_settings
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe LRU cache with per-entry expiry."""
+
+    def __init__(self, name: str, ttl_seconds: float, max_size: int):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.coalesced = 0
+        self._inflight: dict[Hashable, asyncio.Future] = {}
+        self._entries: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return a fresh cached value (counting the hit) or default."""
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+
+            if entry is not _MISSING:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store a value, evicting the least recently used entry if full."""
+        if self.ttl_seconds <= 0 or self.max_size <= 0:
+            return
+
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    async def get_or_load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """
+        Return the cached value or await loader() once for all concurrent callers.
+
+        None results are not cached.
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                if not inflight.cancelled():
+                    raise
+                # The loading caller was cancelled, not us: load again
+                return await self.get_or_load(key, loader)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+
+        try:
+            value = await loader()
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so a load nobody else awaited does not warn
+            future.exception()
+            raise
+        except BaseException:
+            # Cancelled: waiters must not hang on a future nobody resolves
+            future.cancel()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+        if value is not None:
+            self.set(key, value)
+        future.set_result(value)
+        return value
+
+    def invalidate(self, predicate: Optional[Callable[[Hashable], bool]] = None) -> int:
+        """
+        Drop entries matching predicate (all entries if None).
+
+        Returns:
+            Number of entries removed
+        """
+        with self._lock:
+            if predicate is None:
+                removed = len(self._entries)
+                self._entries.clear()
+                return removed
+
+            keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                del self._entries[key]
+            return len(keys)
+
+    def stats(self) -> dict:
+        """Counters for the metrics endpoint."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "coalesced": self.coalesced,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+@lru_cache
+def get_prompt_cache() -> TTLCache:
+    """Active prompts keyed by (section, is_active)."""
+    settings = get_settings()
+    return TTLCache(
+        "prompts",
+        ttl_seconds=settings.prompt_cache_ttl_seconds,
+        max_size=settings.prompt_cache_max_size,
+    )
+
+
+@lru_cache
+def get_profile_cache() -> TTLCache:
+    """Profiles keyed by user_id (short-lived)."""
+    settings = get_settings()
+    return TTLCache(
+        "profiles",
+        ttl_seconds=settings.profile_cache_ttl_seconds,
+        max_size=settings.profile_cache_max_size,
+    )
+
+
+@lru_cache
+def get_generation_cache() -> TTLCache:
+    """Name-neutral generations keyed by (kind, cache_key, variant)."""
+    settings = get_settings()
+    return TTLCache(
+        "generations",
+        ttl_seconds=settings.generation_cache_ttl_seconds,
+        max_size=settings.generation_cache_max_size,
+    )
+
+
+@lru_cache
+def get_audio_cache() -> TTLCache:
+    """Forecast audio entries keyed by audio_key (see audio_cache)."""
+    settings = get_settings()
+    return TTLCache(
+        "audio",
+        ttl_seconds=settings.audio_cache_ttl_seconds,
+        max_size=settings.audio_cache_max_size,
+    )
+
+
+def invalidate_caches(section: Optional[str] = None, user_id: Optional[str] = None) -> dict:
+    """
+    Invalidation hook: drop cached prompts and/or profiles.
+
+    With no arguments both caches are cleared. Call after publishing a new
+    prompt version or editing a profile out of band.
+
+    Returns:
+        Entries removed per cache
+    """
+    removed = {"prompts": 0, "profiles": 0}
+
+    if section is not None or user_id is None:
+        removed["prompts"] = get_prompt_cache().invalidate(
+            None if section is None else lambda key: key[0] == section
+        )
+
+    if user_id is not None or section is None:
+        removed["profiles"] = get_profile_cache().invalidate(
+            None if user_id is None else lambda key: key == user_id
+        )
+
+    return removed
+
+
+def cache_stats() -> dict:
+    """Stats of every hot-path cache."""
+    return {
+        "prompts": get_prompt_cache().stats(),
+        "profiles": get_profile_cache().stats(),
+        "generations": get_generation_cache().stats(),
+        "audio": get_audio_cache().stats(),
+    }
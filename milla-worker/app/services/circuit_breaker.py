@@ -0,0 +1,162 @@
+"""
+Circuit breaker for calls to an external service.
+
+After failure_threshold consecutive failures the circuit opens and calls
+fail at once with CircuitOpenError instead of waiting on a service that is
+down. Once recovery_seconds have passed it is half-open: a single probe
+call goes through (the others keep failing fast) and its outcome closes
+the circuit or opens it for another recovery_seconds.
+
+The state is shared by everything in the process (event loop tasks and
+worker threads alike). Only errors that say something about the service's
+health count as failures (is_failure); a rejected request, for example,
+means the service is up.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+import structlog
+
+logger = structlog.get_logger()
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Call rejected without trying: the circuit is open."""
+
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"{name} circuit open, next probe in {retry_in:.0f}s")
+        self.name = name
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """Thread-safe closed/open/half-open circuit breaker."""
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int,
+        recovery_seconds: float,
+        is_failure: Callable[[BaseException], bool] = lambda exc: True,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_seconds = recovery_seconds
+        self.is_failure = is_failure
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._stats = {"calls": 0, "failures": 0, "rejected": 0, "opened": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.failure_threshold > 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and self._retry_in() <= 0:
+                return HALF_OPEN
+            return self._state
+
+    @contextmanager
+    def guard(self) -> Iterator[None]:
+        """
+        Run the enclosed call through the breaker.
+
+        Raises:
+            CircuitOpenError: If the circuit is open (or half-open with a
+                probe already in flight)
+        """
+        if not self.enabled:
+            yield
+            return
+
+        probe = self._acquire()
+        try:
+            yield
+        except BaseException as exc:
+            if isinstance(exc, Exception) and self.is_failure(exc):
+                self._record_failure(probe, exc)
+            elif isinstance(exc, Exception):
+                self._record_success(probe)
+            else:
+                # Cancelled: no verdict, let another call probe
+                self._release(probe)
+            raise
+        else:
+            self._record_success(probe)
+
+    def stats(self) -> dict:
+        """State and counters (metrics endpoint)."""
+        state = self.state
+        with self._lock:
+            return {
+                "state": state,
+                "consecutive_failures": self._failures,
+                "retry_in_seconds": round(max(0.0, self._retry_in()), 1) if state == OPEN else None,
+                **self._stats,
+            }
+
+    def _acquire(self) -> bool:
+        with self._lock:
+            self._stats["calls"] += 1
+            if self._state == CLOSED:
+                return False
+
+            retry_in = self._retry_in()
+            if self._state == OPEN and retry_in <= 0:
+                self._state = HALF_OPEN
+            if self._state == HALF_OPEN and not self._probing:
+                self._probing = True
+                logger.info("circuit_half_open", circuit=self.name)
+                return True
+
+            self._stats["rejected"] += 1
+            raise CircuitOpenError(self.name, max(0.0, retry_in))
+
+    def _record_success(self, probe: bool) -> None:
+        with self._lock:
+            self._failures = 0
+            if probe:
+                self._probing = False
+            if self._state != CLOSED and probe:
+                self._state = CLOSED
+                logger.info("circuit_closed", circuit=self.name)
+
+    def _record_failure(self, probe: bool, exc: Exception) -> None:
+        with self._lock:
+            self._stats["failures"] += 1
+            self._failures += 1
+            if probe:
+                self._probing = False
+            if probe or (self._state == CLOSED and self._failures >= self.failure_threshold):
+                self._open(exc)
+
+    def _release(self, probe: bool) -> None:
+        with self._lock:
+            if probe:
+                self._probing = False
+
+    def _open(self, exc: Exception) -> None:
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._stats["opened"] += 1
+        logger.warning(
+            "circuit_opened",
+            circuit=self.name,
+            consecutive_failures=self._failures,
+            error=str(exc)[:100],
+        )
+
+    def _retry_in(self) -> float:
+        return self._opened_at + self.recovery_seconds - time.monotonic()
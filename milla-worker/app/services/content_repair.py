@@ -0,0 +1,195 @@
+"""
+Targeted repair of responses rejected for deterministic language.
+
+ReadingContent and ForecastContent reject a whole response when one field
+contains a forbidden term ("sempre", "certamente", ...). Instead of paying
+for a full regeneration, repair_content() rewrites only the offending
+fields: first with a local substitution of unambiguous phrases, then, if
+that still does not validate, with a compact model call that receives just
+those fields.
+Responses with any other validation error are left to the usual retry.
+"""
+
+import json
+import re
+from typing import Optional, TypeVar
+
+import structlog
+from openai import AsyncOpenAI, OpenAIError
+from pydantic import BaseModel, ValidationError
+
+from app.config import get_settings
+from app.models.forecast import FORECAST_FORBIDDEN_TERMS, ForecastContent
+from app.models.reading import FORBIDDEN_TERMS, ReadingContent
+from app.services.structured_outputs import (
+    json_schema_format,
+    object_schema,
+    record_repair,
+    strict_json_schema,
+)
+
+logger = structlog.get_logger()
+
+M = TypeVar("M", bound=BaseModel)
+
+# Forbidden terms and the fields their validator checks, per model
+REPAIRABLE_FIELDS: dict[type[BaseModel], tuple[list[str], tuple[str, ...]]] = {
+    ReadingContent: (FORBIDDEN_TERMS, ("interpretacao", "sombra", "conselho")),
+    ForecastContent: (FORECAST_FORBIDDEN_TERMS, ("conteudo",)),
+}
+
+# Non-deterministic replacements (whole words, case of the first letter kept).
+# Only phrases that read the same in any sentence: "sempre", "nunca",
+# "com certeza" or "definitivamente" change meaning or grammar depending on
+# context ("para sempre", "nunca mais") and are left to the model rewrite.
+LOCAL_REWRITES = {
+    "vai acontecer": "pode acontecer",
+    "certamente": "provavelmente",
+    "sem dúvida": "muito provavelmente",
+}
+
+REPAIR_INSTRUCTIONS = (
+    "Reescreva os textos do JSON abaixo sem linguagem determinística, removendo ou "
+    "suavizando os termos {terms}. Mantenha o sentido, o tom e aproximadamente o mesmo "
+    "tamanho. Responda com um objeto JSON com as mesmas chaves."
+)
+
+
+def find_forbidden_terms(model: type[BaseModel], data: dict) -> dict[str, list[str]]:
+    """Forbidden terms found in each checked field of data."""
+    terms, fields = REPAIRABLE_FIELDS.get(model, ([], ()))
+    found = {}
+
+    for field in fields:
+        value = data.get(field)
+        if isinstance(value, str):
+            hits = [term for term in terms if term in value.lower()]
+            if hits:
+                found[field] = hits
+
+    return found
+
+
+def rewrite_locally(text: str, terms: list[str]) -> str:
+    """Replace forbidden terms that have a known non-deterministic equivalent."""
+    for term in terms:
+        replacement = LOCAL_REWRITES.get(term)
+        if replacement is None:
+            continue
+        text = re.sub(
+            rf"\b{re.escape(term)}\b",
+            lambda match: replacement.capitalize() if match.group(0)[0].isupper() else replacement,
+            text,
+            flags=re.IGNORECASE,
+        )
+    return text
+
+
+def repair_locally(model: type[M], data: dict) -> Optional[M]:
+    """Validated content after local rewrites, or None if that is not enough."""
+    found = find_forbidden_terms(model, data)
+    if not found:
+        return None
+
+    patched = {**data, **{field: rewrite_locally(data[field], terms) for field, terms in found.items()}}
+    try:
+        return model.model_validate(patched)
+    except ValidationError:
+        return None
+
+
+async def repair_content(
+    model: type[M],
+    data: dict,
+    full_tokens: int,
+    client: AsyncOpenAI,
+) -> Optional[M]:
+    """
+    Fix a response that failed validation only because of forbidden terms.
+
+    Args:
+        model: ReadingContent or ForecastContent
+        data: The rejected response object
+        full_tokens: Tokens of the rejected completion (what a regeneration costs)
+        client: OpenAI client for the model rewrite
+
+    Returns:
+        Validated content, or None if it cannot be repaired (regenerate instead)
+    """
+    if not isinstance(data, dict) or not get_settings().content_repair_enabled:
+        return None
+
+    found = find_forbidden_terms(model, data)
+    if not found or not _only_forbidden_term_errors(model, data, found):
+        return None
+
+    repaired = repair_locally(model, data)
+    if repaired is not None:
+        record_repair(local=True, repair_tokens=0, tokens_saved=full_tokens)
+        logger.info("content_repaired", model=model.__name__, fields=list(found), mode="local")
+        return repaired
+
+    terms = sorted({term for hits in found.values() for term in hits})
+    try:
+        rewritten, repair_tokens = await _rewrite_fields(model, {field: data[field] for field in found}, terms, client)
+        repaired = model.model_validate({**data, **rewritten})
+    except (OpenAIError, ValueError) as e:
+        logger.warning("content_repair_failed", model=model.__name__, fields=list(found), error=str(e)[:200])
+        return None
+
+    record_repair(local=False, repair_tokens=repair_tokens, tokens_saved=max(0, full_tokens - repair_tokens))
+    logger.info(
+        "content_repaired",
+        model=model.__name__,
+        fields=list(found),
+        mode="model",
+        repair_tokens=repair_tokens,
+    )
+    return repaired
+
+
+def response_tokens(response) -> int:
+    """Prompt + completion tokens of a chat completion (0 if unreported)."""
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return 0
+    return int(getattr(usage, "prompt_tokens", 0) or 0) + int(getattr(usage, "completion_tokens", 0) or 0)
+
+
+def _only_forbidden_term_errors(model: type[BaseModel], data: dict, found: dict[str, list[str]]) -> bool:
+    # Validator failures surface as value_error; length/missing errors have other types
+    try:
+        model.model_validate(data)
+    except ValidationError as e:
+        return all(
+            error["type"] == "value_error" and error["loc"][:1] and error["loc"][0] in found
+            for error in e.errors()
+        )
+    return False
+
+
+async def _rewrite_fields(
+    model: type[BaseModel],
+    fields: dict[str, str],
+    terms: list[str],
+    client: AsyncOpenAI,
+) -> tuple[dict, int]:
+    properties = strict_json_schema(model)["properties"]
+    instructions = REPAIR_INSTRUCTIONS.format(terms=", ".join(f'"{term}"' for term in terms))
+
+    response = await client.chat.completions.create(
+        model=get_settings().openai_model,
+        messages=[{"role": "user", "content": f"{instructions}\n\n{json.dumps(fields, ensure_ascii=False)}"}],
+        response_format=json_schema_format(
+            "content_repair", object_schema({field: properties[field] for field in fields})
+        ),
+        # ~4 characters per token, with room for a slightly longer rewrite
+        max_tokens=sum(len(text) for text in fields.values()) // 2 + 100,
+        temperature=0.3,
+    )
+
+    rewritten = json.loads(response.choices[0].message.content or "")
+    if not isinstance(rewritten, dict):
+        raise ValueError("Repair response is not a JSON object")
+
+    return {field: rewritten[field] for field in fields if field in rewritten}, response_tokens(response)
@@ -0,0 +1,512 @@
+"""
+Offline forecast generation through the OpenAI Batch API.
+
+Scheduled fan-outs don't need answers within seconds. With
+forecast_backend="batch" every forecast of the next period is submitted
+the day before delivery as one JSONL batch, which runs against the Batch
+API's own rate limits instead of the ones interactive reading jobs use.
+The worker polls the batch, bulk-ingests the results into forecasts with
+delivered_at NULL (invisible to users) and the regular delivery cron
+releases them. Whatever the batch could not produce falls back to realtime
+generate_forecast jobs. Batches are tracked in forecast_batches (migration 020).
+Stored forecasts are voiced by low-priority generate_forecast_audio jobs
+before their release.
+
+With the generation cache enabled one request is sent per archetype
+(base + variant) and personalized for each user on ingestion.
+"""
+
+import json
+from datetime import date, datetime, timezone
+from itertools import islice
+from typing import Iterator, Optional
+
+import structlog
+from pydantic import ValidationError
+
+from app.config import get_settings
+from app.models.forecast import (
+    FORECAST_SECTION_MAP,
+    ForecastCalculationBase,
+    ForecastContent,
+    ForecastType,
+)
+from app.services.content_repair import repair_locally
+from app.services.forecast_generator import (
+    calculate_forecast_base,
+    fill_forecast_prompt,
+    forecast_request_body,
+)
+from app.services.generation_cache import (
+    NAME_PLACEHOLDER,
+    forecast_cache_key,
+    forecast_entry_expires_at,
+    personalize,
+    variant_index,
+)
+from app.services.job_processor import (
+    enqueue_forecast_jobs_for_all_users,
+    enqueue_jobs_bulk,
+    forecast_audio_job_row,
+    forecast_expires_at,
+    forecast_job_row,
+    iter_active_subscriber_ids,
+)
+from app.services.openai_service import get_openai_client
+from app.services.structured_outputs import record_repair
+from app.services.supabase_client import get_supabase_client
+
+logger = structlog.get_logger()
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+BATCH_COMPLETION_WINDOW = "24h"
+
+# Batch states with nothing left to wait for (expired/cancelled may still
+# have a partial output file)
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+# Profile ids go in the request URL, keep lookups modest
+PROFILE_CHUNK_SIZE = 200
+
+
+def iter_subscriber_profiles() -> Iterator[dict]:
+    """Profiles (id, full_name, birthdate) of active subscribers, chunk by chunk."""
+    supabase = get_supabase_client()
+    user_ids = iter_active_subscriber_ids()
+
+    while chunk := list(islice(user_ids, PROFILE_CHUNK_SIZE)):
+        result = supabase.table("profiles").select(
+            "id, full_name, birthdate"
+        ).in_("id", chunk).execute()
+        yield from result.data or []
+
+
+def iter_forecast_targets(
+    forecast_type: ForecastType,
+    period_start: date,
+) -> Iterator[tuple[dict, ForecastCalculationBase]]:
+    """Subscribers that can get a forecast, with their calculation base."""
+    skipped = 0
+
+    for profile in iter_subscriber_profiles():
+        if not profile.get("birthdate") or not profile.get("full_name"):
+            skipped += 1
+            continue
+        birthdate = date.fromisoformat(profile["birthdate"])
+        yield profile, calculate_forecast_base(birthdate, forecast_type, period_start)
+
+    if skipped:
+        logger.info("forecast_batch_profiles_skipped", count=skipped)
+
+
+def request_custom_id(
+    user_id: str,
+    calc_base: ForecastCalculationBase,
+    period_start: date,
+    prompt_version: str,
+    model: str,
+) -> str:
+    """
+    Batch request id for a user: their archetype ("a:<variant>:<cache_key>")
+    when the generation cache is enabled, otherwise "u:<user_id>".
+    """
+    settings = get_settings()
+    if not settings.generation_cache_enabled:
+        return f"u:{user_id}"
+
+    variant = variant_index(user_id, settings.generation_cache_variants)
+    return f"a:{variant}:{forecast_cache_key(calc_base, period_start, prompt_version, model)}"
+
+
+def build_batch_requests(
+    forecast_type: ForecastType,
+    period_start: date,
+    period_end: date,
+    prompt: dict,
+) -> tuple[list[dict], int]:
+    """
+    JSONL request lines for every subscriber's forecast of the period.
+
+    Returns:
+        (request lines, number of users covered)
+    """
+    model = get_settings().openai_model
+    requests: dict[str, dict] = {}
+    users = 0
+
+    for profile, calc_base in iter_forecast_targets(forecast_type, period_start):
+        users += 1
+        custom_id = request_custom_id(profile["id"], calc_base, period_start, prompt["version"], model)
+        if custom_id in requests:
+            continue
+
+        nome = profile["full_name"] if custom_id.startswith("u:") else NAME_PLACEHOLDER
+        filled_prompt = fill_forecast_prompt(prompt["template"], nome, calc_base, period_start, period_end)
+        requests[custom_id] = {
+            "custom_id": custom_id,
+            "method": "POST",
+            "url": BATCH_ENDPOINT,
+            "body": forecast_request_body(filled_prompt),
+        }
+
+    return list(requests.values()), users
+
+
+def submit_forecast_batch(
+    forecast_type: ForecastType,
+    period_start: date,
+    period_end: date,
+) -> Optional[str]:
+    """
+    Submit the period's forecasts as one OpenAI batch.
+
+    Does nothing if the period already has a pending or ingested batch.
+
+    Returns:
+        OpenAI batch id, or None if nothing was submitted
+    """
+    existing = _find_batch(forecast_type, period_start)
+    if existing and existing["status"] in ("submitted", "ingested"):
+        logger.info("forecast_batch_exists", forecast_type=forecast_type.value, status=existing["status"])
+        return None
+
+    prompt = _fetch_prompt(forecast_type)
+    if not prompt:
+        raise ValueError(f"No active prompt for: {FORECAST_SECTION_MAP[forecast_type]}")
+
+    requests, users = build_batch_requests(forecast_type, period_start, period_end, prompt)
+    if not requests:
+        logger.info("no_forecasts_to_batch", forecast_type=forecast_type.value)
+        return None
+
+    client = get_openai_client()
+    jsonl = "\n".join(json.dumps(request, ensure_ascii=False) for request in requests).encode()
+    input_file = client.files.create(
+        file=(f"forecasts-{forecast_type.value}-{period_start.isoformat()}.jsonl", jsonl),
+        purpose="batch",
+    )
+    batch = client.batches.create(
+        input_file_id=input_file.id,
+        endpoint=BATCH_ENDPOINT,
+        completion_window=BATCH_COMPLETION_WINDOW,
+        metadata={"forecast_type": forecast_type.value, "period_start": period_start.isoformat()},
+    )
+
+    _insert_batch({
+        "openai_batch_id": batch.id,
+        "input_file_id": input_file.id,
+        "type": forecast_type.value,
+        "period_start": period_start.isoformat(),
+        "period_end": period_end.isoformat(),
+        "prompt_version": prompt["version"],
+        "model_used": get_settings().openai_model,
+        "request_count": len(requests),
+        "status": "submitted",
+    })
+
+    logger.info(
+        "forecast_batch_submitted",
+        batch_id=batch.id,
+        forecast_type=forecast_type.value,
+        requests=len(requests),
+        users=users,
+    )
+    return batch.id
+
+
+def poll_forecast_batches() -> int:
+    """
+    Check every submitted batch; ingest finished ones, fall back on failed ones.
+
+    Returns:
+        Number of batches that left the submitted state
+    """
+    client = get_openai_client()
+    finished = 0
+
+    for row in _submitted_batches():
+        try:
+            batch = client.batches.retrieve(row["openai_batch_id"])
+        except Exception as e:
+            logger.warning("forecast_batch_poll_failed", batch_id=row["openai_batch_id"], error=str(e)[:200])
+            continue
+
+        if batch.status not in TERMINAL_STATUSES:
+            logger.debug("forecast_batch_pending", batch_id=batch.id, status=batch.status)
+            continue
+
+        finished += 1
+        if batch.status == "completed" or batch.output_file_id:
+            ingest_forecast_batch(row, batch.output_file_id)
+        else:
+            fail_forecast_batch(row, f"batch {batch.status}")
+
+    return finished
+
+
+def ingest_forecast_batch(row: dict, output_file_id: Optional[str]) -> dict:
+    """
+    Store a finished batch's forecasts (undelivered), enqueue their audio
+    jobs and realtime jobs for every subscriber it did not cover.
+
+    Returns:
+        Ingestion summary (also stored in forecast_batches.result)
+    """
+    settings = get_settings()
+    forecast_type = ForecastType(row["type"])
+    period_start = date.fromisoformat(row["period_start"])
+    period_end = date.fromisoformat(row["period_end"])
+
+    results = _read_results(output_file_id) if output_file_id else {}
+
+    archetypes = [
+        _archetype_entry(custom_id, content, row, period_end)
+        for custom_id, content in results.items()
+        if custom_id.startswith("a:")
+    ]
+    if archetypes:
+        _store_archetypes(archetypes)
+
+    fallback: list[str] = []
+    expires_at = forecast_expires_at(forecast_type)
+
+    def forecast_rows() -> Iterator[dict]:
+        for profile, calc_base in iter_forecast_targets(forecast_type, period_start):
+            custom_id = request_custom_id(
+                profile["id"], calc_base, period_start, row["prompt_version"], row["model_used"]
+            )
+            forecast = _personal_forecast(results.get(custom_id), profile["full_name"])
+            if forecast is None:
+                fallback.append(profile["id"])
+                continue
+
+            yield {
+                "user_id": profile["id"],
+                "type": forecast_type.value,
+                "period_start": row["period_start"],
+                "period_end": row["period_end"],
+                "title": forecast.titulo,
+                "content": forecast.conteudo,
+                "summary": forecast.resumo,
+                "prompt_version": row["prompt_version"],
+                "model_used": row["model_used"],
+                "calculation_base": calc_base.model_dump(),
+                "delivered_at": None,
+                "expires_at": expires_at.isoformat() if expires_at else None,
+            }
+
+    stored = 0
+    audio_jobs = 0
+    voiced = bool(settings.minimax_api_key and settings.minimax_voice_id)
+    rows = forecast_rows()
+    while chunk := list(islice(rows, settings.job_enqueue_chunk_size)):
+        inserted = _upsert_forecasts(chunk)
+        stored += len(inserted)
+        if voiced:
+            audio_jobs += enqueue_jobs_bulk(
+                forecast_audio_job_row(forecast["user_id"], forecast_type.value, period_start, forecast["content"])
+                for forecast in inserted
+            )
+
+    fallback_jobs = enqueue_jobs_bulk(
+        forecast_job_row(user_id, forecast_type.value, period_start, period_end)
+        for user_id in fallback
+    )
+
+    summary = {
+        "results": len(results),
+        "forecasts": stored,
+        "audio_jobs": audio_jobs,
+        "fallback_users": len(fallback),
+        "fallback_jobs": fallback_jobs,
+    }
+    _update_batch(row["id"], {
+        "status": "ingested",
+        "output_file_id": output_file_id,
+        "result": summary,
+        "ingested_at": datetime.now(timezone.utc).isoformat(),
+    })
+
+    logger.info("forecast_batch_ingested", batch_id=row["openai_batch_id"], **summary)
+    return summary
+
+
+def fail_forecast_batch(row: dict, error: str, status: str = "failed") -> int:
+    """
+    Give up on a batch and generate the period with realtime jobs.
+
+    Returns:
+        Number of realtime jobs created
+    """
+    _update_batch(row["id"], {"status": status, "error": error})
+    logger.warning("forecast_batch_abandoned", batch_id=row["openai_batch_id"], status=status, error=error)
+
+    return enqueue_forecast_jobs_for_all_users(
+        row["type"],
+        date.fromisoformat(row["period_start"]),
+        date.fromisoformat(row["period_end"]),
+    )
+
+
+def deliver_batched_forecasts(
+    forecast_type: ForecastType,
+    period_start: date,
+    period_end: date,
+) -> int:
+    """
+    Delivery cron in batch mode: release the ingested forecasts of the period.
+
+    A batch still running at delivery time is cancelled and, like a missing
+    or failed batch, replaced by realtime jobs.
+
+    Returns:
+        Forecasts released or realtime jobs created
+    """
+    row = _find_batch(forecast_type, period_start)
+
+    if row and row["status"] == "ingested":
+        return release_forecasts(forecast_type, period_start)
+
+    if row and row["status"] == "submitted":
+        try:
+            get_openai_client().batches.cancel(row["openai_batch_id"])
+        except Exception as e:
+            logger.warning("forecast_batch_cancel_failed", batch_id=row["openai_batch_id"], error=str(e)[:200])
+        return fail_forecast_batch(row, "not ready at delivery time", status="cancelled")
+
+    return enqueue_forecast_jobs_for_all_users(forecast_type.value, period_start, period_end)
+
+
+def release_forecasts(forecast_type: ForecastType, period_start: date) -> int:
+    """
+    Make the period's ingested forecasts visible (delivered_at = now).
+
+    Returns:
+        Number of forecasts released
+    """
+    supabase = get_supabase_client()
+    result = supabase.table("forecasts").update(
+        {"delivered_at": datetime.now(timezone.utc).isoformat()}
+    ).eq(
+        "type", forecast_type.value
+    ).eq(
+        "period_start", period_start.isoformat()
+    ).is_("delivered_at", "null").execute()
+
+    released = len(result.data or [])
+    logger.info("forecasts_released", forecast_type=forecast_type.value, count=released)
+    return released
+
+
+def _read_results(output_file_id: str) -> dict[str, dict]:
+    """Successful, parseable responses of a batch output file by custom_id."""
+    content = get_openai_client().files.content(output_file_id).text
+    results = {}
+    errors = 0
+
+    for line in content.splitlines():
+        if not line.strip():
+            continue
+        item = {}
+        try:
+            # A truncated or malformed line fails on its own, like an errored item
+            item = json.loads(line)
+            response = item.get("response") or {}
+            if item.get("error") or response.get("status_code") != 200:
+                raise ValueError(str(item.get("error") or response.get("status_code")))
+            message = response["body"]["choices"][0]["message"]["content"]
+            results[item["custom_id"]] = json.loads(message)
+        except (AttributeError, KeyError, IndexError, TypeError, ValueError) as e:
+            errors += 1
+            custom_id = item.get("custom_id") if isinstance(item, dict) else None
+            logger.debug("forecast_batch_item_failed", custom_id=custom_id, error=str(e)[:200])
+
+    if errors:
+        logger.warning("forecast_batch_items_failed", count=errors)
+    return results
+
+
+def _personal_forecast(content: Optional[dict], nome: str) -> Optional[ForecastContent]:
+    if not isinstance(content, dict):
+        return None
+    personalized = personalize(content, nome)
+    try:
+        return ForecastContent.model_validate(personalized)
+    except ValidationError:
+        # Forbidden terms are fixed locally; anything else goes realtime
+        repaired = repair_locally(ForecastContent, personalized)
+        if repaired is not None:
+            record_repair(local=True, repair_tokens=0, tokens_saved=0)
+        return repaired
+
+
+def _archetype_entry(custom_id: str, content: dict, row: dict, period_end: date) -> dict:
+    _, variant, cache_key = custom_id.split(":", 2)
+    return {
+        "kind": f"forecast_{row['type']}",
+        "cache_key": cache_key,
+        "variant": int(variant),
+        "content": content,
+        "prompt_version": row["prompt_version"],
+        "model_used": row["model_used"],
+        "expires_at": forecast_entry_expires_at(period_end).isoformat(),
+    }
+
+
+def _store_archetypes(entries: list[dict]) -> None:
+    """Share the batch's archetypes with realtime fallback jobs (best effort)."""
+    supabase = get_supabase_client()
+    try:
+        supabase.table("generation_cache").upsert(
+            entries,
+            on_conflict="kind,cache_key,variant",
+            ignore_duplicates=True,
+        ).execute()
+    except Exception as e:
+        logger.warning("generation_cache_write_failed", kind=entries[0]["kind"], error=str(e)[:200])
+
+
+def _upsert_forecasts(rows: list[dict]) -> list[dict]:
+    """Insert forecasts, keeping any a realtime job already stored (returns the inserted rows)."""
+    supabase = get_supabase_client()
+    result = supabase.table("forecasts").upsert(
+        rows,
+        on_conflict="user_id,type,period_start",
+        ignore_duplicates=True,
+    ).execute()
+    return result.data or []
+
+
+def _fetch_prompt(forecast_type: ForecastType) -> Optional[dict]:
+    supabase = get_supabase_client()
+    result = supabase.table("prompts").select("*").eq(
+        "section", FORECAST_SECTION_MAP[forecast_type]
+    ).eq(
+        "is_active", True
+    ).limit(1).execute()
+    return result.data[0] if result.data else None
+
+
+def _find_batch(forecast_type: ForecastType, period_start: date) -> Optional[dict]:
+    """Most recent batch of a period."""
+    supabase = get_supabase_client()
+    result = supabase.table("forecast_batches").select("*").eq(
+        "type", forecast_type.value
+    ).eq(
+        "period_start", period_start.isoformat()
+    ).order("created_at", desc=True).limit(1).execute()
+    return result.data[0] if result.data else None
+
+
+def _submitted_batches() -> list[dict]:
+    supabase = get_supabase_client()
+    result = supabase.table("forecast_batches").select("*").eq("status", "submitted").execute()
+    return result.data or []
+
+
+def _insert_batch(row: dict) -> None:
+    get_supabase_client().table("forecast_batches").insert(row).execute()
+
+
+def _update_batch(batch_row_id: str, changes: dict) -> None:
+    get_supabase_client().table("forecast_batches").update(changes).eq("id", batch_row_id).execute()
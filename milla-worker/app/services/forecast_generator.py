@@ -2,14 +2,32 @@
 Forecast generator service - generates personalized predictions using OpenAI.
 """
 
+import asyncio
 import json
+import weakref
 import structlog
-from datetime import date
+from pydantic import ValidationError
+from datetime import date, timedelta
+from string import Template
 from typing import Optional
 
 from app.config import get_settings
-from app.services.supabase_client import get_supabase_client
+from app.services.supabase_client import get_async_supabase_client
+from app.services.cache import get_prompt_cache
+from app.services.openai_service import get_async_openai_client
 from app.services.numerology import reduce_to_arcano, get_arcano_name
+from app.services.micro_batcher import MicroBatcher
+from app.services.content_repair import repair_content, response_tokens
+from app.services.hedging import hedged
+from app.services.streaming_completions import create_completion
+from app.services.structured_outputs import (
+    array_schema,
+    json_schema_format,
+    model_response_format,
+    object_schema,
+    record_completion,
+    strict_json_schema,
+)
 from app.models.forecast import (
     ForecastType, 
     ForecastContent, 
@@ -20,6 +38,24 @@ from app.models.forecast import (
 
 logger = structlog.get_logger()
 
+# Limite de tokens de saída por previsão
+FORECAST_MAX_TOKENS = 2500
+
+# Chamadas por previsão antes de falhar o job
+FORECAST_MAX_ATTEMPTS = 2
+
+FORECAST_BATCH_INSTRUCTIONS = (
+    "Gere {n} previsões independentes, uma para cada item abaixo. Responda com um "
+    'objeto JSON {{"previsoes": [...]}} contendo exatamente {n} objetos, na mesma '
+    "ordem dos itens, cada um no formato JSON pedido no seu item."
+)
+
+# Um micro-batcher por event loop; contadores de uso de tokens
+_batchers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, MicroBatcher]" = (
+    weakref.WeakKeyDictionary()
+)
+_usage = {"requests": 0, "forecasts": 0, "prompt_tokens": 0, "completion_tokens": 0}
+
 
 def calculate_ano_pessoal(birthdate: date, year: int) -> int:
     """
@@ -67,6 +103,36 @@ def get_arcano_regente(ano_pessoal: int) -> str:
     return get_arcano_name(ano_pessoal)
 
 
+def forecast_base_key(calc_base: ForecastCalculationBase) -> str:
+    """
+    Chave estável da base numérica (ex: 'ano_pessoal=6:numero_semana=9').
+    
+    Usuários com a mesma chave no mesmo período recebem a mesma previsão.
+    """
+    fields = calc_base.model_dump(exclude_none=True)
+    return ":".join(f"{name}={fields[name]}" for name in sorted(fields))
+
+
+def forecast_period(forecast_type: ForecastType, reference: date) -> tuple[date, date]:
+    """
+    Período entregue pelo cron do tipo no dia reference.
+    
+    Semanal: próximo domingo (exclusive) a sábado. Mensal: mês de reference.
+    Anual: ano de reference.
+    """
+    if forecast_type == ForecastType.WEEKLY:
+        days_until_sunday = (6 - reference.weekday()) % 7 or 7
+        week_start = reference + timedelta(days=days_until_sunday)
+        return week_start, week_start + timedelta(days=6)
+    
+    if forecast_type == ForecastType.MONTHLY:
+        month_start = reference.replace(day=1)
+        next_month = (month_start + timedelta(days=31)).replace(day=1)
+        return month_start, next_month - timedelta(days=1)
+    
+    return date(reference.year, 1, 1), date(reference.year, 12, 31)
+
+
 def calculate_forecast_base(
     birthdate: date, 
     forecast_type: ForecastType,
@@ -104,18 +170,25 @@ def calculate_forecast_base(
         )
 
 
-def get_forecast_prompt(forecast_type: ForecastType) -> Optional[dict]:
+async def get_forecast_prompt(forecast_type: ForecastType) -> Optional[dict]:
     """
-    Busca o prompt ativo para o tipo de previsão.
+    Busca o prompt ativo para o tipo de previsão (cache por seção + is_active).
     """
-    supabase = get_supabase_client()
     section = FORECAST_SECTION_MAP.get(forecast_type)
     
     if not section:
         return None
     
+    return await get_prompt_cache().get_or_load(
+        (section, True), lambda: _fetch_forecast_prompt(section)
+    )
+
+
+async def _fetch_forecast_prompt(section: str) -> Optional[dict]:
+    supabase = await get_async_supabase_client()
+    
     try:
-        result = supabase.table("prompts").select("*").eq(
+        result = await supabase.table("prompts").select("*").eq(
             "section", section
         ).eq(
             "is_active", True
@@ -130,30 +203,18 @@ def get_forecast_prompt(forecast_type: ForecastType) -> Optional[dict]:
         return None
 
 
-def generate_forecast_content(
+def fill_forecast_prompt(
     prompt_template: str,
     nome: str,
-    birthdate: date,
-    forecast_type: ForecastType,
+    calc_base: ForecastCalculationBase,
     period_start: date,
     period_end: date,
-) -> ForecastContent:
+) -> str:
     """
-    Gera conteúdo de previsão via OpenAI.
+    Preenche o template de previsão com nome, período e base numérica.
     
-    Valida com Pydantic e retorna ForecastContent.
+    Usa safe_substitute para evitar problemas com {} do JSON.
     """
-    from openai import OpenAI
-    
-    settings = get_settings()
-    client = OpenAI(api_key=settings.openai_api_key)
-    
-    # Calcular base numérica
-    calc_base = calculate_forecast_base(birthdate, forecast_type, period_start)
-    
-    # Preencher template usando safe_substitute para evitar problemas com {} do JSON
-    from string import Template
-    
     # Converter placeholders de {var} para $var (Template format)
     template_str = prompt_template.replace("{nome}", "$nome")
     template_str = template_str.replace("{period_start}", "$period_start")
@@ -166,7 +227,7 @@ def generate_forecast_content(
     template_str = template_str.replace("{arcano_regente}", "$arcano_regente")
     
     template = Template(template_str)
-    filled_prompt = template.safe_substitute(
+    return template.safe_substitute(
         nome=nome,
         period_start=period_start.strftime("%d/%m/%Y"),
         period_end=period_end.strftime("%d/%m/%Y"),
@@ -177,48 +238,276 @@ def generate_forecast_content(
         ano=calc_base.ano or period_start.year,
         arcano_regente=calc_base.arcano_regente or "",
     )
+
+
+def generate_forecast_content(
+    prompt_template: str,
+    nome: str,
+    birthdate: date,
+    forecast_type: ForecastType,
+    period_start: date,
+    period_end: date,
+) -> ForecastContent:
+    """
+    Gera conteúdo de previsão via OpenAI (wrapper síncrono para scripts e testes).
+    
+    Ver generate_forecast_content_async.
+    """
+    return asyncio.run(generate_forecast_content_async(
+        prompt_template=prompt_template,
+        nome=nome,
+        birthdate=birthdate,
+        forecast_type=forecast_type,
+        period_start=period_start,
+        period_end=period_end,
+    ))
+
+
+async def generate_forecast_content_async(
+    prompt_template: str,
+    nome: str,
+    birthdate: date,
+    forecast_type: ForecastType,
+    period_start: date,
+    period_end: date,
+) -> ForecastContent:
+    """
+    Gera conteúdo de previsão via OpenAI.
+    
+    Valida com Pydantic e retorna ForecastContent.
+    """
+    # Calcular base numérica
+    calc_base = calculate_forecast_base(birthdate, forecast_type, period_start)
+    
+    return await generate_forecast_from_base_async(
+        prompt_template=prompt_template,
+        nome=nome,
+        calc_base=calc_base,
+        forecast_type=forecast_type,
+        period_start=period_start,
+        period_end=period_end,
+    )
+
+
+async def generate_forecast_from_base_async(
+    prompt_template: str,
+    nome: str,
+    calc_base: ForecastCalculationBase,
+    forecast_type: ForecastType,
+    period_start: date,
+    period_end: date,
+) -> ForecastContent:
+    """
+    Gera conteúdo de previsão a partir de uma base já calculada.
+    
+    A previsão só depende da base, do período e do nome.
+    """
+    settings = get_settings()
+    
+    filled_prompt = fill_forecast_prompt(
+        prompt_template, nome, calc_base, period_start, period_end
+    )
     
     logger.info(
         "openai_request_start",
         forecast_type=forecast_type.value,
-        user_name=nome[:4] + "..."
+        user_name=nome[:4] + "...",
+        batched=settings.forecast_batch_size > 1,
     )
     
-    # Chamar OpenAI
-    response = client.chat.completions.create(
-        model=settings.openai_model,
-        messages=[{"role": "user", "content": filled_prompt}],
-        response_format={"type": "json_object"},
-        max_tokens=2500,
-        temperature=0.8
-    )
+    if settings.forecast_batch_size > 1:
+        return await get_forecast_batcher().submit(filled_prompt)
     
-    content_str = response.choices[0].message.content
+    return await generate_forecast_from_prompt_async(filled_prompt)
+
+
+def forecast_request_body(filled_prompt: str) -> dict:
+    """
+    Parâmetros do chat completion de uma previsão (também usados nas linhas da Batch API).
+    """
+    return {
+        "model": get_settings().openai_model,
+        "messages": [{"role": "user", "content": filled_prompt}],
+        "response_format": model_response_format(ForecastContent, "forecast"),
+        "max_tokens": FORECAST_MAX_TOKENS,
+        "temperature": 0.8,
+    }
+
+
+async def generate_forecast_from_prompt_async(filled_prompt: str) -> ForecastContent:
+    """
+    Gera uma previsão a partir do prompt já preenchido.
+    
+    Uma resposta inválida é pedida de novo (até FORECAST_MAX_ATTEMPTS chamadas)
+    em vez de consumir uma tentativa do job com backoff.
+    """
+    client = get_async_openai_client()
+    last_error = None
+    
+    for attempt in range(FORECAST_MAX_ATTEMPTS):
+        # Chamar OpenAI (com streaming, aborta assim que a resposta não pode validar)
+        completion = await create_completion(client, ForecastContent, **forecast_request_body(filled_prompt))
+        _record_usage(completion, forecasts=1)
+        
+        try:
+            if completion.aborted:
+                raise ValueError(f"Stream aborted early: {completion.aborted}")
+            forecast = await parse_or_repair_forecast(completion.content, response_tokens(completion), client)
+        except ValueError as e:
+            last_error = e
+            record_completion("forecast", valid=False)
+            logger.warning("forecast_validation_error", attempt=attempt + 1, error=str(e)[:200])
+            continue
+        
+        record_completion("forecast", valid=True)
+        logger.info(
+            "openai_request_success",
+            title_preview=forecast.titulo[:30],
+            attempt=attempt + 1,
+        )
+        return forecast
+    
+    raise ValueError(f"Failed to generate valid forecast after {FORECAST_MAX_ATTEMPTS} attempts: {last_error}")
+
+
+def parse_forecast(content_str: Optional[str]) -> ForecastContent:
+    """
+    Valida o JSON de uma previsão.
     
+    Raises:
+        ValueError: JSON inválido ou fora do ForecastContent
+    """
     # Log raw content for debugging
     logger.debug("openai_raw_response", content_preview=content_str[:200] if content_str else "None")
     
     # Parse JSON with error handling
     try:
-        content_dict = json.loads(content_str)
+        content_dict = json.loads(content_str or "")
     except json.JSONDecodeError as e:
-        logger.error("json_parse_error", error=str(e), raw_content=content_str[:500])
+        logger.error("json_parse_error", error=str(e), raw_content=(content_str or "")[:500])
         raise ValueError(f"Invalid JSON from OpenAI: {e}")
     
-    # Debug logging - trace the exact issue
-    logger.info(
-        "openai_response_parsed",
-        dict_type=type(content_dict).__name__,
-        dict_keys=list(content_dict.keys()) if isinstance(content_dict, dict) else "not_a_dict",
-        has_titulo="titulo" in content_dict if isinstance(content_dict, dict) else False,
-    )
+    if not isinstance(content_dict, dict):
+        raise ValueError("Forecast is not a JSON object")
     
+    # Validar e retornar
+    return ForecastContent(**content_dict)
+
+
+async def parse_or_repair_forecast(content_str: Optional[str], full_tokens: int, client) -> ForecastContent:
+    """
+    parse_forecast, reescrevendo os campos com termos proibidos em vez de falhar.
+    """
+    try:
+        return parse_forecast(content_str)
+    except ValidationError:
+        repaired = await repair_content(ForecastContent, json.loads(content_str), full_tokens, client)
+        if repaired is None:
+            raise
+        return repaired
+
+
+async def generate_forecast_batch_async(filled_prompts: list[str]) -> list:
+    """
+    Gera várias previsões numa única chamada OpenAI.
+    
+    A resposta é {"previsoes": [...]} na ordem dos prompts. Cada elemento é
+    validado separadamente.
+    
+    Returns:
+        Lista com ForecastContent ou a exceção de cada elemento inválido
+    """
+    settings = get_settings()
+    client = get_async_openai_client()
+    n = len(filled_prompts)
+    
+    parts = [FORECAST_BATCH_INSTRUCTIONS.format(n=n)]
+    parts += [f"### Item {i + 1}\n{prompt}" for i, prompt in enumerate(filled_prompts)]
+    
+    response = await hedged("forecast_batch", lambda: client.chat.completions.create(
+        model=settings.openai_model,
+        messages=[{"role": "user", "content": "\n\n".join(parts)}],
+        response_format=json_schema_format(
+            "forecast_batch",
+            object_schema({"previsoes": array_schema(strict_json_schema(ForecastContent), n)}),
+        ),
+        max_tokens=FORECAST_MAX_TOKENS * n,
+        temperature=0.8
+    ))
+    _record_usage(response, forecasts=n)
+    
+    try:
+        items = json.loads(response.choices[0].message.content or "").get("previsoes")
+    except (json.JSONDecodeError, AttributeError) as e:
+        raise ValueError(f"Invalid batch JSON from OpenAI: {e}")
+    
+    if not isinstance(items, list):
+        raise ValueError("Batch response has no 'previsoes' array")
+    
+    results = []
+    item_tokens = response_tokens(response) // n
+    for i in range(n):
+        try:
+            if i >= len(items) or not isinstance(items[i], dict):
+                raise ValueError(f"Missing item {i + 1} in batch response")
+            results.append(ForecastContent(**items[i]))
+        except ValidationError as e:
+            repaired = await repair_content(ForecastContent, items[i], item_tokens, client)
+            results.append(e if repaired is None else repaired)
+        except ValueError as e:
+            results.append(e)
+    
+    record_completion("forecast_batch", valid=not any(isinstance(result, Exception) for result in results))
     logger.info(
-        "openai_request_success",
-        forecast_type=forecast_type.value,
-        title_preview=str(content_dict.get("titulo", ""))[:30] if isinstance(content_dict, dict) else "n/a"
+        "forecast_batch_generated",
+        size=n,
+        valid=sum(not isinstance(result, Exception) for result in results),
     )
+    return results
+
+
+def forecast_batch_size() -> int:
+    """Itens por lote, limitado para caber em forecast_batch_max_tokens."""
+    settings = get_settings()
+    by_tokens = settings.forecast_batch_max_tokens // FORECAST_MAX_TOKENS
+    return max(1, min(settings.forecast_batch_size, by_tokens))
+
+
+def get_forecast_batcher() -> MicroBatcher:
+    """Micro-batcher de previsões do event loop atual."""
+    loop = asyncio.get_running_loop()
+    batcher = _batchers.get(loop)
     
-    # Validar e retornar
-    return ForecastContent(**content_dict)
+    if batcher is None:
+        batcher = MicroBatcher(
+            "forecasts",
+            batch_size=forecast_batch_size(),
+            window_seconds=get_settings().forecast_batch_window_seconds,
+            run_batch=generate_forecast_batch_async,
+            run_single=generate_forecast_from_prompt_async,
+        )
+        _batchers[loop] = batcher
+    
+    return batcher
+
+
+def forecast_batching_stats() -> dict:
+    """Uso de tokens e lotes (endpoint de métricas e benchmark)."""
+    stats = dict(_usage)
+    for batcher in list(_batchers.values()):
+        stats.update(batcher.stats())
+    return stats
+
+
+def reset_forecast_usage() -> None:
+    """Zera os contadores de uso (testes e benchmark)."""
+    for key in _usage:
+        _usage[key] = 0
+
 
+def _record_usage(response, forecasts: int) -> None:
+    usage = getattr(response, "usage", None)
+    _usage["requests"] += 1
+    _usage["forecasts"] += forecasts
+    _usage["prompt_tokens"] += getattr(usage, "prompt_tokens", 0) or 0
+    _usage["completion_tokens"] += getattr(usage, "completion_tokens", 0) or 0
@@ -0,0 +1,373 @@
+"""
+Shared generation cache - reuse name-neutral LLM outputs across users.
+
+A reading depends only on (section, ponto_valor, prompt_version, model) plus
+the user's name, so there are at most 5 x 22 distinct readings per prompt
+version. Forecasts likewise depend only on the ForecastCalculationBase and
+the period, so a fan-out costs one generation per distinct base (archetype)
+rather than per subscriber. Each key keeps a few variants generated with a
+{nome} placeholder (table generation_cache, migration 018); users are spread
+over the variants by a stable hash of their id and the placeholder is
+replaced on use.
+"""
+
+import hashlib
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Awaitable, Callable, Optional
+
+import structlog
+from pydantic import ValidationError
+
+from app.config import get_settings
+from app.models.forecast import ForecastCalculationBase, ForecastContent, ForecastType
+from app.models.reading import ReadingContent
+from app.services.cache import get_generation_cache
+from app.services.forecast_generator import forecast_base_key, generate_forecast_from_base_async
+from app.services.openai_service import generate_reading_async, generate_reading_bundle_async
+from app.services.supabase_client import get_async_supabase_client
+
+logger = structlog.get_logger()
+
+NAME_PLACEHOLDER = "{nome}"
+
+# Forecast archetypes are kept a while past the period for late retries
+FORECAST_ENTRY_GRACE_DAYS = 30
+
+
+def variant_index(user_id: str, variants: int) -> int:
+    """Stable variant for a user (same user always gets the same variant)."""
+    digest = hashlib.sha1(user_id.encode()).digest()
+    return int.from_bytes(digest[:4], "big") % max(1, variants)
+
+
+def personalize(content: Any, nome: str) -> Any:
+    """Replace the name placeholder in every string of a JSON-like value."""
+    if isinstance(content, str):
+        return content.replace(NAME_PLACEHOLDER, nome)
+    if isinstance(content, list):
+        return [personalize(item, nome) for item in content]
+    if isinstance(content, dict):
+        return {key: personalize(value, nome) for key, value in content.items()}
+    return content
+
+
+def forecast_cache_key(
+    calc_base: ForecastCalculationBase,
+    period_start: date,
+    prompt_version: str,
+    model: str,
+) -> str:
+    """Cache key of a forecast archetype (same base and period)."""
+    return f"{period_start.isoformat()}:{forecast_base_key(calc_base)}:{prompt_version}:{model}"
+
+
+def forecast_entry_expires_at(period_end: date) -> datetime:
+    """When a forecast archetype can be dropped from the table."""
+    return datetime.combine(
+        period_end + timedelta(days=FORECAST_ENTRY_GRACE_DAYS), time.min, tzinfo=timezone.utc
+    )
+
+
+async def get_or_generate(
+    kind: str,
+    cache_key: str,
+    variant: int,
+    generate: Callable[[], Awaitable[dict]],
+    prompt_version: str,
+    model: str,
+    expires_at: Optional[datetime] = None,
+) -> tuple[dict, bool]:
+    """
+    Get a cached name-neutral generation, generating and storing it on a miss.
+
+    Concurrent callers for the same entry in this process share one
+    generation; other workers find it in the table afterwards.
+
+    Returns:
+        (content with placeholder, True if this call ran the generation)
+    """
+    generated = False
+
+    async def load() -> dict:
+        nonlocal generated
+        content = await _fetch_entry(kind, cache_key, variant)
+        if content is not None:
+            return content
+
+        content = await generate()
+        generated = True
+        await _store_entry(kind, cache_key, variant, content, prompt_version, model, expires_at)
+        return content
+
+    content = await get_generation_cache().get_or_load((kind, cache_key, variant), load)
+    return content, generated
+
+
+async def generate_reading_cached(
+    user_id: str,
+    section: str,
+    prompt: dict,
+    nome: str,
+    ponto_nome: str,
+    ponto_valor: int,
+    arcano: str,
+) -> tuple[ReadingContent, str]:
+    """
+    Reading for a user from the shared cache, personalized with their name.
+
+    Falls back to a direct generation when caching is disabled or the
+    personalized variant no longer validates (e.g. a very long name).
+
+    Returns:
+        (reading, cache status: "hit", "miss" or "bypass")
+    """
+    settings = get_settings()
+
+    async def generate_direct() -> ReadingContent:
+        return await generate_reading_async(
+            prompt_template=prompt["template"],
+            nome=nome,
+            ponto_nome=ponto_nome,
+            ponto_valor=ponto_valor,
+            arcano=arcano,
+        )
+
+    if not settings.generation_cache_enabled:
+        return await generate_direct(), "bypass"
+
+    async def generate_neutral() -> dict:
+        reading = await generate_reading_async(
+            prompt_template=prompt["template"],
+            nome=NAME_PLACEHOLDER,
+            ponto_nome=ponto_nome,
+            ponto_valor=ponto_valor,
+            arcano=arcano,
+        )
+        return reading.model_dump_for_db()
+
+    cache_key = f"{section}:{ponto_valor}:{prompt['version']}:{settings.openai_model}"
+    variant = variant_index(user_id, settings.generation_cache_variants)
+
+    content, generated = await get_or_generate(
+        "reading",
+        cache_key,
+        variant,
+        generate_neutral,
+        prompt_version=prompt["version"],
+        model=settings.openai_model,
+    )
+
+    try:
+        reading = ReadingContent.model_validate(personalize(content, nome))
+    except ValidationError as e:
+        logger.warning("cached_reading_invalid", cache_key=cache_key, error=str(e)[:200])
+        return await generate_direct(), "bypass"
+
+    return reading, "miss" if generated else "hit"
+
+
+async def generate_reading_bundle_cached(
+    user_id: str,
+    nome: str,
+    sections: dict[str, dict],
+) -> tuple[dict[str, ReadingContent], dict[str, str], dict[str, str]]:
+    """
+    All of a user's reading sections, filling cache misses with one bundle call.
+
+    Args:
+        sections: section -> {prompt, ponto_nome, ponto_valor, arcano}
+
+    Returns:
+        (readings by section, cache status by section, errors by failed section)
+    """
+    settings = get_settings()
+    readings: dict[str, ReadingContent] = {}
+    statuses: dict[str, str] = {}
+
+    def bundle_input(section: str) -> dict:
+        data = sections[section]
+        return {
+            "prompt_template": data["prompt"]["template"],
+            "ponto_nome": data["ponto_nome"],
+            "ponto_valor": data["ponto_valor"],
+            "arcano": data["arcano"],
+        }
+
+    if not settings.generation_cache_enabled:
+        readings, errors = await generate_reading_bundle_async(
+            nome, {section: bundle_input(section) for section in sections}
+        )
+        return readings, {section: "bypass" for section in readings}, errors
+
+    variant = variant_index(user_id, settings.generation_cache_variants)
+    keys = {
+        section: (
+            "reading",
+            f"{section}:{data['ponto_valor']}:{data['prompt']['version']}:{settings.openai_model}",
+            variant,
+        )
+        for section, data in sections.items()
+    }
+
+    # 1. Sections already in the cache (memory, then table)
+    neutral: dict[str, dict] = {}
+    for section, key in keys.items():
+        content = await _lookup_entry(*key)
+        if content is not None:
+            neutral[section] = content
+            statuses[section] = "hit"
+
+    # 2. One bundle call for the misses, stored for other users
+    missing = [section for section in sections if section not in neutral]
+    errors: dict[str, str] = {}
+    if missing:
+        generated, errors = await generate_reading_bundle_async(
+            NAME_PLACEHOLDER, {section: bundle_input(section) for section in missing}
+        )
+        for section, reading in generated.items():
+            content = reading.model_dump_for_db()
+            kind, cache_key, _ = keys[section]
+            await _store_entry(
+                kind, cache_key, variant, content,
+                sections[section]["prompt"]["version"], settings.openai_model,
+            )
+            get_generation_cache().set(keys[section], content)
+            neutral[section] = content
+            statuses[section] = "miss"
+
+    # 3. Personalize; anything that no longer validates is generated for the user
+    direct = []
+    for section, content in neutral.items():
+        try:
+            readings[section] = ReadingContent.model_validate(personalize(content, nome))
+        except ValidationError:
+            direct.append(section)
+
+    if direct:
+        logger.warning("cached_reading_invalid", sections=direct)
+        generated, direct_errors = await generate_reading_bundle_async(
+            nome, {section: bundle_input(section) for section in direct}
+        )
+        readings.update(generated)
+        errors.update(direct_errors)
+        statuses.update({section: "bypass" for section in direct})
+
+    return readings, statuses, errors
+
+
+async def generate_forecast_cached(
+    user_id: str,
+    prompt: dict,
+    nome: str,
+    calc_base: ForecastCalculationBase,
+    forecast_type: ForecastType,
+    period_start: date,
+    period_end: date,
+) -> tuple[ForecastContent, str]:
+    """
+    Forecast for a user from its archetype (same base + period), personalized.
+
+    Returns:
+        (forecast, cache status: "hit", "miss" or "bypass")
+    """
+    settings = get_settings()
+
+    async def generate(for_name: str) -> ForecastContent:
+        return await generate_forecast_from_base_async(
+            prompt_template=prompt["template"],
+            nome=for_name,
+            calc_base=calc_base,
+            forecast_type=forecast_type,
+            period_start=period_start,
+            period_end=period_end,
+        )
+
+    if not settings.generation_cache_enabled:
+        return await generate(nome), "bypass"
+
+    async def generate_neutral() -> dict:
+        return (await generate(NAME_PLACEHOLDER)).model_dump()
+
+    cache_key = forecast_cache_key(calc_base, period_start, prompt["version"], settings.openai_model)
+    variant = variant_index(user_id, settings.generation_cache_variants)
+
+    content, generated = await get_or_generate(
+        f"forecast_{forecast_type.value}",
+        cache_key,
+        variant,
+        generate_neutral,
+        prompt_version=prompt["version"],
+        model=settings.openai_model,
+        expires_at=forecast_entry_expires_at(period_end),
+    )
+
+    try:
+        forecast = ForecastContent.model_validate(personalize(content, nome))
+    except ValidationError as e:
+        logger.warning("cached_forecast_invalid", cache_key=cache_key, error=str(e)[:200])
+        return await generate(nome), "bypass"
+
+    return forecast, "miss" if generated else "hit"
+
+
+async def _lookup_entry(kind: str, cache_key: str, variant: int) -> Optional[dict]:
+    """Cached entry from memory or the table, without generating."""
+    cache = get_generation_cache()
+    content = cache.get((kind, cache_key, variant))
+    if content is None:
+        content = await _fetch_entry(kind, cache_key, variant)
+        if content is not None:
+            cache.set((kind, cache_key, variant), content)
+    return content
+
+
+async def _fetch_entry(kind: str, cache_key: str, variant: int) -> Optional[dict]:
+    supabase = await get_async_supabase_client()
+
+    try:
+        result = await supabase.table("generation_cache").select("content").eq(
+            "kind", kind
+        ).eq(
+            "cache_key", cache_key
+        ).eq(
+            "variant", variant
+        ).limit(1).execute()
+    except Exception as e:
+        # Cache is best effort: a failed read is a miss
+        logger.warning("generation_cache_read_failed", kind=kind, error=str(e)[:200])
+        return None
+
+    if result.data:
+        return result.data[0]["content"]
+    return None
+
+
+async def _store_entry(
+    kind: str,
+    cache_key: str,
+    variant: int,
+    content: dict,
+    prompt_version: str,
+    model: str,
+    expires_at: Optional[datetime] = None,
+) -> None:
+    supabase = await get_async_supabase_client()
+
+    try:
+        # Another worker may have stored the same entry first; keep theirs
+        await supabase.table("generation_cache").upsert(
+            {
+                "kind": kind,
+                "cache_key": cache_key,
+                "variant": variant,
+                "content": content,
+                "prompt_version": prompt_version,
+                "model_used": model,
+                "expires_at": expires_at.isoformat() if expires_at else None,
+            },
+            on_conflict="kind,cache_key,variant",
+            ignore_duplicates=True,
+        ).execute()
+        logger.info("generation_cached", kind=kind, cache_key=cache_key, variant=variant)
+    except Exception as e:
+        logger.warning("generation_cache_write_failed", kind=kind, error=str(e)[:200])
@@ -0,0 +1,147 @@
+"""
+Hedged requests for OpenAI completions.
+
+With hedging_enabled, a completion that has not returned after the
+hedge_percentile of recent latencies for its kind gets a second, identical
+request; the first successful response wins and the other is cancelled.
+Until a kind has hedge_min_samples latencies the delay is
+hedge_initial_delay_seconds, so a stuck request is still hedged right
+after a restart.
+
+Hedges are capped at hedge_max_rate * hedge_window among the last
+hedge_window requests (all kinds together), which bounds the extra token
+spend.
+"""
+
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Awaitable, Callable, TypeVar
+
+import structlog
+
+from app.config import get_settings
+
+logger = structlog.get_logger()
+
+T = TypeVar("T")
+
+# Recent latencies per kind (seconds, winning attempt only)
+_latencies: dict[str, deque] = {}
+# Whether each of the recent requests was hedged (budget window)
+_recent: deque = deque()
+_stats: dict[str, dict[str, int]] = {}
+
+
+def hedge_delay(kind: str) -> float:
+    """Seconds to wait before hedging a request of this kind."""
+    settings = get_settings()
+    samples = _latencies.get(kind)
+    if not samples or len(samples) < settings.hedge_min_samples:
+        return settings.hedge_initial_delay_seconds
+
+    ordered = sorted(samples)
+    index = max(0, math.ceil(settings.hedge_percentile / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+async def hedged(kind: str, call: Callable[[], Awaitable[T]]) -> T:
+    """
+    Run call(), firing a second call() if the first is slower than usual.
+
+    Args:
+        kind: Latency class of the request ("reading", "forecast", ...)
+        call: Factory for the request; called once per attempt
+
+    Returns:
+        The result of the first attempt to succeed
+    """
+    settings = get_settings()
+    if not settings.hedging_enabled:
+        return await call()
+
+    stats = _stats.setdefault(kind, {"requests": 0, "hedged": 0, "hedge_wins": 0, "budget_denied": 0})
+    stats["requests"] += 1
+    delay = hedge_delay(kind)
+
+    primary = _Attempt(call)
+    attempts = [primary]
+    try:
+        done, _ = await asyncio.wait({primary.task}, timeout=delay)
+        if done:
+            _record_request(hedged=False)
+            return primary.finish(kind)
+
+        if not _within_budget():
+            stats["budget_denied"] += 1
+            _record_request(hedged=False)
+            await asyncio.wait({primary.task})
+            return primary.finish(kind)
+
+        _record_request(hedged=True)
+        stats["hedged"] += 1
+        hedge = _Attempt(call)
+        attempts.append(hedge)
+        logger.info("completion_hedged", kind=kind, delay=round(delay, 3))
+
+        pending = {primary.task, hedge.task}
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for attempt in attempts:
+                if attempt.task in done and not attempt.task.exception():
+                    if attempt is hedge:
+                        stats["hedge_wins"] += 1
+                    return attempt.finish(kind)
+
+        # Both failed: surface the original request's error
+        return primary.finish(kind)
+    finally:
+        for attempt in attempts:
+            if not attempt.task.done():
+                attempt.task.cancel()
+
+
+def hedging_stats() -> dict:
+    """Hedged requests, wins and budget use per kind (metrics endpoint)."""
+    settings = get_settings()
+    return {
+        "enabled": settings.hedging_enabled,
+        "hedge_rate": round(sum(_recent) / len(_recent), 3) if _recent else 0.0,
+        "max_rate": settings.hedge_max_rate,
+        "by_kind": {
+            kind: {**stats, "delay_seconds": round(hedge_delay(kind), 3)}
+            for kind, stats in _stats.items()
+        },
+    }
+
+
+def reset_hedging_stats() -> None:
+    """Forget latencies and counters (tests and benchmarks)."""
+    _latencies.clear()
+    _recent.clear()
+    _stats.clear()
+
+
+class _Attempt:
+    def __init__(self, call: Callable[[], Awaitable[T]]):
+        self.started = time.monotonic()
+        self.task = asyncio.ensure_future(call())
+
+    def finish(self, kind: str):
+        result = self.task.result()  # raises the attempt's error
+        settings = get_settings()
+        samples = _latencies.setdefault(kind, deque(maxlen=settings.hedge_window))
+        samples.append(time.monotonic() - self.started)
+        return result
+
+
+def _within_budget() -> bool:
+    settings = get_settings()
+    return sum(_recent) < settings.hedge_max_rate * settings.hedge_window
+
+
+def _record_request(hedged: bool) -> None:
+    _recent.append(hedged)
+    while len(_recent) > get_settings().hedge_window:
+        _recent.popleft()
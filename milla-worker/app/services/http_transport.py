@@ -0,0 +1,145 @@
+"""
+Shared HTTP transport - one pooled httpx.AsyncClient per event loop.
+
+OpenAI, Minimax and the async Supabase client all send their requests
+through it, so jobs reuse keep-alive (HTTP/2 where the server offers it)
+connections instead of paying a TCP + TLS handshake per call.
+"""
+
+import asyncio
+import weakref
+from dataclasses import dataclass, field
+
+import httpx
+import structlog
+
+from app.config import get_settings
+
+logger = structlog.get_logger()
+
+OPENAI_ORIGIN = "https://api.openai.com"
+
+
+@dataclass
+class TransportStats:
+    """Requests vs newly opened connections (everything else was reused)."""
+
+    requests: int = 0
+    connections_opened: int = 0
+    by_host: dict[str, dict[str, int]] = field(default_factory=dict)
+
+    def record(self, host: str, key: str) -> None:
+        if key == "requests":
+            self.requests += 1
+        else:
+            self.connections_opened += 1
+        host_stats = self.by_host.setdefault(host, {"requests": 0, "connections_opened": 0})
+        host_stats[key] += 1
+
+    @property
+    def reuse_rate(self) -> float:
+        if not self.requests:
+            return 0.0
+        return round(max(0, self.requests - self.connections_opened) / self.requests, 3)
+
+
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+    weakref.WeakKeyDictionary()
+)
+_stats = TransportStats()
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Get the pooled client for the running loop (created on first use)."""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+
+    if client is None or client.is_closed:
+        client = create_http_client()
+        _clients[loop] = client
+
+    return client
+
+
+def create_http_client() -> httpx.AsyncClient:
+    """Build a pooled client from settings, instrumented for transport_stats()."""
+    settings = get_settings()
+    return httpx.AsyncClient(
+        http2=settings.http2_enabled,
+        limits=httpx.Limits(
+            max_connections=settings.http_max_connections,
+            max_keepalive_connections=settings.http_max_keepalive_connections,
+            keepalive_expiry=settings.http_keepalive_expiry_seconds,
+        ),
+        timeout=settings.http_timeout_seconds,
+        follow_redirects=True,
+        event_hooks={"request": [_track_request]},
+    )
+
+
+async def warm_http_client() -> None:
+    """
+    Open connections to the configured upstreams before the first job.
+
+    Any HTTP response (even 4xx) leaves a warm connection in the pool.
+    """
+    settings = get_settings()
+    client = get_http_client()
+
+    origins = [OPENAI_ORIGIN, settings.supabase_url]
+    if settings.minimax_api_key:
+        origins.append(settings.minimax_base_url)
+
+    async def warm(origin: str) -> None:
+        try:
+            await client.head(origin, timeout=5)
+        except httpx.HTTPError as e:
+            logger.warning("http_warmup_failed", origin=origin, error=str(e)[:200])
+
+    await asyncio.gather(*(warm(origin) for origin in origins if origin))
+    logger.info("http_transport_warmed", **transport_stats())
+
+
+async def close_http_client() -> None:
+    """Close the running loop's client (lifespan shutdown)."""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+def transport_stats() -> dict:
+    """Pool size and connection reuse for the metrics endpoint."""
+    settings = get_settings()
+    return {
+        "http2": settings.http2_enabled,
+        "max_connections": settings.http_max_connections,
+        "pool_connections": sum(_pool_size(client) for client in list(_clients.values())),
+        "requests": _stats.requests,
+        "connections_opened": _stats.connections_opened,
+        "reuse_rate": _stats.reuse_rate,
+        "by_host": {host: dict(counts) for host, counts in _stats.by_host.items()},
+    }
+
+
+def reset_transport_stats() -> None:
+    """Zero the counters (tests and benchmarks)."""
+    global _stats
+    _stats = TransportStats()
+
+
+async def _track_request(request: httpx.Request) -> None:
+    host = request.url.host
+    _stats.record(host, "requests")
+
+    async def trace(event_name: str, info: dict) -> None:
+        if event_name == "connection.connect_tcp.complete":
+            _stats.record(host, "connections_opened")
+
+    request.extensions["trace"] = trace
+
+
+def _pool_size(client: httpx.AsyncClient) -> int:
+    # httpcore keeps the pool on the default transport; 0 if that changes
+    pool = getattr(getattr(client, "_transport", None), "_pool", None)
+    return len(getattr(pool, "connections", ()))
+
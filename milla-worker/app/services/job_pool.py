@@ -0,0 +1,117 @@
+"""
+Bounded job pool - runs a batch of claimed jobs concurrently on the event loop.
+
+Global concurrency is capped by `job_concurrency`; each job type can be
+further capped through `job_type_concurrency`.
+"""
+
+import asyncio
+import time
+from contextlib import AsyncExitStack
+from dataclasses import dataclass
+from itertools import chain, zip_longest
+from typing import Awaitable, Callable
+
+import structlog
+
+from app.config import get_settings
+
+logger = structlog.get_logger()
+
+
+@dataclass
+class BatchStats:
+    """Timing summary for one batch of jobs."""
+
+    jobs: int
+    wall_ms: int
+    job_ms_total: int
+
+    @property
+    def parallelism(self) -> float:
+        """Summed job time over wall time (1.0 = sequential)."""
+        if not self.wall_ms:
+            return 0.0
+        return round(self.job_ms_total / self.wall_ms, 2)
+
+
+def interleave_by_type(jobs: list[dict]) -> list[dict]:
+    """
+    Round-robin jobs across types, keeping claim order within each type.
+
+    Keeps a large run of one job type from starving the others of
+    global slots.
+    """
+    by_type: dict[str, list[dict]] = {}
+    for job in jobs:
+        by_type.setdefault(job.get("type", "generate_reading"), []).append(job)
+
+    rounds = zip_longest(*by_type.values())
+    return [job for job in chain.from_iterable(rounds) if job is not None]
+
+
+async def run_jobs(
+    jobs: list[dict],
+    handler: Callable[[dict], Awaitable[None]],
+) -> BatchStats:
+    """
+    Run handler for every job with bounded concurrency.
+
+    Handler errors are logged and never abort the rest of the batch.
+
+    Returns:
+        BatchStats with wall time and summed per-job time
+    """
+    if not jobs:
+        return BatchStats(jobs=0, wall_ms=0, job_ms_total=0)
+
+    settings = get_settings()
+    global_limit = asyncio.Semaphore(max(1, settings.job_concurrency))
+    type_limits = {
+        job_type: asyncio.Semaphore(limit)
+        for job_type, limit in settings.job_type_concurrency.items()
+        if limit > 0
+    }
+    durations_ms: list[int] = []
+
+    async def run(job: dict) -> None:
+        job_type = job.get("type", "generate_reading")
+
+        async with AsyncExitStack() as slots:
+            # Type slot first so waiting jobs never hold a global slot
+            if job_type in type_limits:
+                await slots.enter_async_context(type_limits[job_type])
+            await slots.enter_async_context(global_limit)
+
+            job_start = time.monotonic()
+            try:
+                await handler(job)
+            except Exception as e:
+                # Handlers record their own failures; this is a last resort
+                logger.error(
+                    "unexpected_error",
+                    job_id=job.get("id", "unknown")[:8],
+                    error=str(e),
+                )
+            finally:
+                durations_ms.append(int((time.monotonic() - job_start) * 1000))
+
+    batch_start = time.monotonic()
+    await asyncio.gather(*(run(job) for job in interleave_by_type(jobs)))
+
+    stats = BatchStats(
+        jobs=len(jobs),
+        wall_ms=int((time.monotonic() - batch_start) * 1000),
+        job_ms_total=sum(durations_ms),
+    )
+
+    logger.info(
+        "batch_completed",
+        jobs=stats.jobs,
+        concurrency=settings.job_concurrency,
+        wall_ms=stats.wall_ms,
+        job_ms_total=stats.job_ms_total,
+        parallelism=stats.parallelism,
+    )
+
+    return stats
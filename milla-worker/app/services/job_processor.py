@@ -4,14 +4,21 @@ Job processor - claims and processes pending jobs.
 
 import time
 import asyncio
-from datetime import datetime, date, timedelta
-from typing import Optional
+import threading
+from dataclasses import dataclass
+from datetime import datetime, date, timedelta, timezone
+from itertools import islice
+from typing import Iterable, Iterator, Optional
 import structlog
 
 from app.config import get_settings
-from app.services.supabase_client import get_supabase_client
+from app.services.supabase_client import get_supabase_client, get_async_supabase_client
 from app.services.numerology import SectionType, get_section_reading_data
-from app.services.openai_service import generate_reading
+from app.models.forecast import ForecastType
+from app.services.generation_cache import generate_reading_cached, generate_reading_bundle_cached
+from app.services.job_pool import run_jobs
+from app.services.cache import get_prompt_cache, get_profile_cache
+from app.services.structured_outputs import job_completion_stats, track_job_completions
 
 logger = structlog.get_logger()
 
@@ -24,22 +31,54 @@ SECTION_DISPLAY_NAMES = {
     "manifestacao_material": "Manifestação Material",
 }
 
+READING_SECTIONS: list[SectionType] = list(SECTION_DISPLAY_NAMES)
+
 # Backoff intervals in seconds
 BACKOFF_INTERVALS = [30, 60, 120]
 
+# Claim order among due jobs (migration 022): lower runs first
+AUDIO_JOB_PRIORITY = 10
+
+# Incremental subscription check state (watermark = start of last complete check)
+SUBSCRIPTION_CHECK_OVERLAP_SECONDS = 60
+_subscription_watermark: Optional[datetime] = None
+_last_full_subscription_scan = 0.0
+# The scheduler and /trigger both run the check in worker threads
+_subscription_check_lock = threading.Lock()
+
+
+@dataclass
+class DrainStats:
+    """Summary of one drain (consecutive batches until the queue is empty)."""
+    
+    batches: int
+    jobs: int
+    duration_ms: int
+    backlog_remaining: bool = False
+    
+    @property
+    def jobs_per_second(self) -> float:
+        if not self.duration_ms:
+            return 0.0
+        return round(self.jobs / (self.duration_ms / 1000), 2)
 
-def claim_jobs() -> list[dict]:
+
+async def claim_jobs() -> list[dict]:
     """
     Claim pending jobs using RPC.
     
+    With claim_with_context each job also carries "profile" and "prompt"
+    (migration 017), so processing needs no extra lookups.
+    
     Returns list of claimed job records.
     """
     settings = get_settings()
-    supabase = get_supabase_client()
+    supabase = await get_async_supabase_client()
+    rpc_name = "claim_pending_jobs_with_context" if settings.claim_with_context else "claim_pending_jobs"
     
     try:
-        result = supabase.rpc(
-            "claim_pending_jobs",
+        result = await supabase.rpc(
+            rpc_name,
             {"job_limit": settings.job_claim_limit}
         ).execute()
         
@@ -53,12 +92,16 @@ def claim_jobs() -> list[dict]:
         return []
 
 
-def get_profile(user_id: str) -> Optional[dict]:
-    """Get user profile."""
-    supabase = get_supabase_client()
+async def get_profile(user_id: str) -> Optional[dict]:
+    """Get user profile (cached briefly; a user's section jobs share one lookup)."""
+    return await get_profile_cache().get_or_load(user_id, lambda: _fetch_profile(user_id))
+
+
+async def _fetch_profile(user_id: str) -> Optional[dict]:
+    supabase = await get_async_supabase_client()
     
     try:
-        result = supabase.table("profiles").select("*").eq("id", user_id).execute()
+        result = await supabase.table("profiles").select("*").eq("id", user_id).execute()
         if result.data and len(result.data) > 0:
             return result.data[0]
         return None
@@ -67,12 +110,18 @@ def get_profile(user_id: str) -> Optional[dict]:
         return None
 
 
-def get_active_prompt(section: SectionType) -> Optional[dict]:
-    """Get the active prompt for a section."""
-    supabase = get_supabase_client()
+async def get_active_prompt(section: SectionType) -> Optional[dict]:
+    """Get the active prompt for a section (cached by section + is_active)."""
+    return await get_prompt_cache().get_or_load(
+        (section, True), lambda: _fetch_active_prompt(section)
+    )
+
+
+async def _fetch_active_prompt(section: SectionType) -> Optional[dict]:
+    supabase = await get_async_supabase_client()
     
     try:
-        result = supabase.table("prompts").select("*").eq("section", section).eq("is_active", True).execute()
+        result = await supabase.table("prompts").select("*").eq("section", section).eq("is_active", True).execute()
         if result.data and len(result.data) > 0:
             return result.data[0]
         return None
@@ -81,7 +130,7 @@ def get_active_prompt(section: SectionType) -> Optional[dict]:
         return None
 
 
-def upsert_reading(
+async def upsert_reading(
     user_id: str,
     section: SectionType,
     content: dict,
@@ -91,9 +140,9 @@ def upsert_reading(
     """
     Upsert reading (insert or update on conflict).
     """
-    supabase = get_supabase_client()
+    supabase = await get_async_supabase_client()
     
-    supabase.table("readings").upsert(
+    await supabase.table("readings").upsert(
         {
             "user_id": user_id,
             "section": section,
@@ -107,20 +156,20 @@ def upsert_reading(
     logger.info("reading_upserted", user_id=user_id[:8], section=section)
 
 
-def update_job_completed(job_id: str, result: Optional[dict] = None) -> None:
+async def update_job_completed(job_id: str, result: Optional[dict] = None) -> None:
     """Mark job as completed."""
-    supabase = get_supabase_client()
+    supabase = await get_async_supabase_client()
     
-    supabase.table("jobs").update({
+    await supabase.table("jobs").update({
         "status": "completed",
         "completed_at": datetime.utcnow().isoformat(),
         "result": result or {"success": True},
     }).eq("id", job_id).execute()
 
 
-def update_job_failed(job_id: str, error: str, attempts: int) -> None:
+async def update_job_failed(job_id: str, error: str, attempts: int) -> None:
     """Mark job as failed or schedule retry."""
-    supabase = get_supabase_client()
+    supabase = await get_async_supabase_client()
     
     update_data = {
         "last_error": error[:500],  # Truncate error
@@ -133,13 +182,12 @@ def update_job_failed(job_id: str, error: str, attempts: int) -> None:
     else:
         # Schedule retry with backoff
         backoff = BACKOFF_INTERVALS[min(attempts - 1, len(BACKOFF_INTERVALS) - 1)]
-        from datetime import timedelta
         retry_at = datetime.utcnow() + timedelta(seconds=backoff)
         update_data["status"] = "pending"
         update_data["started_at"] = None
         update_data["scheduled_at"] = retry_at.isoformat()
     
-    supabase.table("jobs").update(update_data).eq("id", job_id).execute()
+    await supabase.table("jobs").update(update_data).eq("id", job_id).execute()
     
     logger.info(
         "job_updated",
@@ -149,19 +197,39 @@ def update_job_failed(job_id: str, error: str, attempts: int) -> None:
     )
 
 
-def process_job(job: dict) -> None:
+async def defer_job(job_id: str, delay_seconds: float, attempts: int) -> None:
+    """Put a claimed job back in the queue without spending an attempt."""
+    supabase = await get_async_supabase_client()
+    
+    await supabase.table("jobs").update({
+        "status": "pending",
+        "started_at": None,
+        "attempts": max(0, attempts - 1),
+        "scheduled_at": (datetime.utcnow() + timedelta(seconds=delay_seconds)).isoformat(),
+    }).eq("id", job_id).execute()
+    
+    logger.info("job_deferred", job_id=job_id[:8], delay_seconds=round(delay_seconds))
+
+
+async def process_job(job: dict) -> None:
     """
     Process a single job based on type.
     """
     job_type = job.get("type", "generate_reading")
     
-    if job_type == "generate_forecast":
-        process_forecast_job(job)
-    else:
-        process_reading_job(job)
+    # Completions, retries and repairs of this job go into its result
+    with track_job_completions():
+        if job_type == "generate_forecast":
+            await process_forecast_job(job)
+        elif job_type == "generate_forecast_audio":
+            await process_forecast_audio_job(job)
+        elif job_type == "generate_reading_bundle":
+            await process_reading_bundle_job(job)
+        else:
+            await process_reading_job(job)
 
 
-def process_reading_job(job: dict) -> None:
+async def process_reading_job(job: dict) -> None:
     """
     Process a reading generation job.
     """
@@ -182,8 +250,8 @@ def process_reading_job(job: dict) -> None:
     )
     
     try:
-        # Get profile
-        profile = get_profile(user_id)
+        # Get profile (returned with the claim when available)
+        profile = job.get("profile") or await get_profile(user_id)
         if not profile:
             raise ValueError(f"Profile not found for user")
         
@@ -194,7 +262,7 @@ def process_reading_job(job: dict) -> None:
             raise ValueError("User has no name")
         
         # Get prompt
-        prompt = get_active_prompt(section)
+        prompt = job.get("prompt") or await get_active_prompt(section)
         if not prompt:
             raise ValueError(f"No active prompt for section: {section}")
         
@@ -202,10 +270,12 @@ def process_reading_job(job: dict) -> None:
         birthdate = date.fromisoformat(profile["birthdate"])
         ponto_valor, arcano = get_section_reading_data(birthdate, section)
         
-        # Generate reading
+        # Generate reading (shared per section/arcano, personalized by name)
         settings = get_settings()
-        reading_content = generate_reading(
-            prompt_template=prompt["template"],
+        reading_content, cache_status = await generate_reading_cached(
+            user_id=user_id,
+            section=section,
+            prompt=prompt,
             nome=profile["full_name"],
             ponto_nome=SECTION_DISPLAY_NAMES.get(section, section),
             ponto_valor=ponto_valor,
@@ -213,7 +283,7 @@ def process_reading_job(job: dict) -> None:
         )
         
         # Upsert reading
-        upsert_reading(
+        await upsert_reading(
             user_id=user_id,
             section=section,
             content=reading_content.model_dump_for_db(),
@@ -223,13 +293,19 @@ def process_reading_job(job: dict) -> None:
         
         # Mark completed
         elapsed_ms = int((time.time() - start_time) * 1000)
-        update_job_completed(job_id, {"success": True, "duration_ms": elapsed_ms})
+        await update_job_completed(job_id, {
+            "success": True,
+            "duration_ms": elapsed_ms,
+            "generation_cache": cache_status,
+            "completions": job_completion_stats().as_result(),
+        })
         
         logger.info(
             "job_completed",
             job_id=job_id[:8],
             section=section,
             duration_ms=elapsed_ms,
+            generation_cache=cache_status,
         )
         
     except Exception as e:
@@ -244,81 +320,305 @@ def process_reading_job(job: dict) -> None:
             duration_ms=elapsed_ms,
         )
         
-        update_job_failed(job_id, f"{error_type}: {str(e)}", attempts)
+        await update_job_failed(job_id, f"{error_type}: {str(e)}", attempts)
+
+
+async def process_reading_bundle_job(job: dict) -> None:
+    """
+    Process a generate_reading_bundle job: all five sections for one user.
+    
+    Sections already saved with the active prompt version are skipped and
+    cached sections are reused; the rest come from a single chat completion
+    where each section is validated on its own and only failures are retried.
+    Valid sections are saved even if others fail, so a job retry only
+    generates what is still missing.
+    """
+    job_id = job["id"]
+    user_id = job["user_id"]
+    attempts = job["attempts"]
+    
+    start_time = time.time()
+    
+    logger.info("bundle_job_started", job_id=job_id[:8], attempt=attempts)
+    
+    try:
+        profile = job.get("profile") or await get_profile(user_id)
+        if not profile:
+            raise ValueError("Profile not found for user")
+        
+        if not profile.get("birthdate"):
+            raise ValueError("User has no birthdate")
+        
+        if not profile.get("full_name"):
+            raise ValueError("User has no name")
+        
+        birthdate = date.fromisoformat(profile["birthdate"])
+        
+        # Prompts for every section (in-process cache after the first job)
+        sections = {}
+        for section in READING_SECTIONS:
+            prompt = await get_active_prompt(section)
+            if not prompt:
+                raise ValueError(f"No active prompt for section: {section}")
+            
+            ponto_valor, arcano = get_section_reading_data(birthdate, section)
+            sections[section] = {
+                "prompt": prompt,
+                "ponto_nome": SECTION_DISPLAY_NAMES[section],
+                "ponto_valor": ponto_valor,
+                "arcano": arcano,
+            }
+        
+        # Sections saved by an earlier attempt (same prompt version) are done
+        supabase = await get_async_supabase_client()
+        saved = await _saved_reading_sections(supabase, user_id, sections)
+        missing = {section: data for section, data in sections.items() if section not in saved}
+        
+        readings, statuses, errors = {}, {}, {}
+        if missing:
+            readings, statuses, errors = await generate_reading_bundle_cached(
+                user_id=user_id,
+                nome=profile["full_name"],
+                sections=missing,
+            )
+        statuses.update({section: "saved" for section in saved})
+        
+        # Save every valid section in one upsert
+        if readings:
+            settings = get_settings()
+            await supabase.table("readings").upsert(
+                [
+                    {
+                        "user_id": user_id,
+                        "section": section,
+                        "content": reading.model_dump_for_db(),
+                        "prompt_version": sections[section]["prompt"]["version"],
+                        "model_used": settings.openai_model,
+                    }
+                    for section, reading in readings.items()
+                ],
+                on_conflict="user_id,section"
+            ).execute()
+        
+        if errors:
+            raise ValueError(f"Sections failed validation: {', '.join(sorted(errors))}")
+        
+        elapsed_ms = int((time.time() - start_time) * 1000)
+        await update_job_completed(job_id, {
+            "success": True,
+            "duration_ms": elapsed_ms,
+            "generation_cache": statuses,
+            "completions": job_completion_stats().as_result(),
+        })
+        
+        logger.info(
+            "bundle_job_completed",
+            job_id=job_id[:8],
+            duration_ms=elapsed_ms,
+            cache_hits=sum(status == "hit" for status in statuses.values()),
+        )
+        
+    except Exception as e:
+        elapsed_ms = int((time.time() - start_time) * 1000)
+        error_type = type(e).__name__
+        
+        logger.error(
+            "bundle_job_failed",
+            job_id=job_id[:8],
+            error_type=error_type,
+            duration_ms=elapsed_ms,
+        )
+        
+        await update_job_failed(job_id, f"{error_type}: {str(e)}", attempts)
+
+
+async def _saved_reading_sections(supabase, user_id: str, sections: dict[str, dict]) -> set[str]:
+    result = await supabase.table("readings").select(
+        "section, prompt_version"
+    ).eq("user_id", user_id).execute()
+    
+    return {
+        row["section"]
+        for row in result.data or []
+        if row["section"] in sections
+        and row["prompt_version"] == sections[row["section"]]["prompt"]["version"]
+    }
 
 
-def process_pending_jobs() -> int:
+async def process_pending_jobs() -> int:
     """
     Main job processing loop.
     
+    Claimed jobs run concurrently on the bounded job pool.
+    
     Returns:
         Number of jobs processed
     """
     logger.info("polling_jobs")
     
-    jobs = claim_jobs()
+    jobs = await claim_jobs()
     
     if not jobs:
         logger.debug("no_pending_jobs")
         return 0
     
-    for job in jobs:
-        try:
-            process_job(job)
-        except Exception as e:
-            # Should not happen, but catch anyway
-            logger.error(
-                "unexpected_error",
-                job_id=job.get("id", "unknown")[:8],
-                error=str(e),
-            )
+    await run_jobs(jobs, process_job)
     
     return len(jobs)
 
 
-def enqueue_reading_jobs(user_id: str) -> int:
+async def drain_pending_jobs() -> DrainStats:
     """
-    Enqueue 5 reading jobs for a user.
+    Claim and process batches back to back until the claim comes back empty.
     
-    Called when subscription is activated.
-    Uses deterministic idempotency keys to prevent duplicates.
+    Stops early after drain_max_seconds (if set) so the caller can run its
+    periodic checks; backlog_remaining tells it to come straight back.
+    """
+    settings = get_settings()
+    start_time = time.monotonic()
+    stats = DrainStats(batches=0, jobs=0, duration_ms=0)
+    
+    while True:
+        count = await process_pending_jobs()
+        if not count:
+            break
+        
+        stats.batches += 1
+        stats.jobs += count
+        
+        elapsed = time.monotonic() - start_time
+        if settings.drain_max_seconds and elapsed >= settings.drain_max_seconds:
+            stats.backlog_remaining = True
+            break
+    
+    stats.duration_ms = int((time.monotonic() - start_time) * 1000)
+    
+    if stats.batches:
+        logger.info(
+            "drain_completed",
+            batches=stats.batches,
+            jobs=stats.jobs,
+            duration_ms=stats.duration_ms,
+            jobs_per_second=stats.jobs_per_second,
+            backlog_remaining=stats.backlog_remaining,
+        )
+    
+    return stats
+
+
+def iter_active_subscriber_ids(page_size: Optional[int] = None) -> Iterator[str]:
+    """
+    Stream user_ids of active subscriptions, one keyset page at a time.
+    
+    Pages are ordered by user_id and continue after the last id seen, so
+    every subscriber is covered regardless of PostgREST's row cap and only
+    one page is held in memory.
+    """
+    settings = get_settings()
+    supabase = get_supabase_client()
+    page_size = page_size or settings.subscription_page_size
+    
+    last_user_id = None
+    
+    while True:
+        query = supabase.table("subscriptions").select(
+            "user_id"
+        ).eq(
+            "status", "active"
+        ).order("user_id").limit(page_size)
+        
+        if last_user_id is not None:
+            query = query.gt("user_id", last_user_id)
+        
+        rows = query.execute().data or []
+        
+        for row in rows:
+            yield row["user_id"]
+        
+        if len(rows) < page_size:
+            return
+        
+        last_user_id = rows[-1]["user_id"]
+
+
+def enqueue_jobs_bulk(rows: Iterable[dict]) -> int:
+    """
+    Insert job rows in chunks, skipping rows whose idempotency_key exists.
+    
+    Each chunk is one upsert with ON CONFLICT (idempotency_key) DO NOTHING;
+    PostgREST returns only the rows it actually inserted. A failed chunk
+    is logged and the remaining chunks still run.
     
     Returns:
         Number of jobs created
     """
+    settings = get_settings()
     supabase = get_supabase_client()
+    chunk_size = settings.job_enqueue_chunk_size
+    
+    rows = iter(rows)
+    created = 0
+    
+    while chunk := list(islice(rows, chunk_size)):
+        created += _insert_jobs_chunk(supabase, chunk) or 0
+    
+    return created
+
+
+def _insert_jobs_chunk(supabase, chunk: list[dict]) -> Optional[int]:
+    """Upsert one chunk of job rows; None if the request failed (logged)."""
+    try:
+        result = supabase.table("jobs").upsert(
+            chunk,
+            on_conflict="idempotency_key",
+            ignore_duplicates=True,
+        ).execute()
+        return len(result.data or [])
+    except Exception as e:
+        logger.error("enqueue_chunk_failed", size=len(chunk), error=str(e)[:200])
+        return None
+
+
+def reading_job_rows(user_id: str) -> list[dict]:
+    """
+    Build the reading job rows for a user (deterministic idempotency keys).
     
-    sections: list[SectionType] = [
-        "missao_da_alma",
-        "personalidade",
-        "destino",
-        "proposito",
-        "manifestacao_material",
+    One generate_reading_bundle job when reading_bundle_enabled, otherwise
+    one generate_reading job per section.
+    """
+    if get_settings().reading_bundle_enabled:
+        return [{
+            "user_id": user_id,
+            "type": "generate_reading_bundle",
+            "payload": {"sections": list(READING_SECTIONS)},
+            "idempotency_key": f"{user_id}:bundle:v1",
+        }]
+    
+    return [
+        {
+            "user_id": user_id,
+            "type": "generate_reading",
+            "payload": {"section": section},
+            "idempotency_key": f"{user_id}:{section}:v1",
+        }
+        for section in READING_SECTIONS
     ]
+
+
+def enqueue_reading_jobs(user_id: str) -> int:
+    """
+    Enqueue the reading jobs for a user (one bundle or 5 section jobs).
     
-    created = 0
+    Called when subscription is activated.
+    Uses deterministic idempotency keys to prevent duplicates.
     
-    for section in sections:
-        # Deterministic idempotency key
-        idempotency_key = f"{user_id}:{section}:v1"
-        
-        try:
-            supabase.table("jobs").insert({
-                "user_id": user_id,
-                "type": "generate_reading",
-                "payload": {"section": section},
-                "idempotency_key": idempotency_key,
-            }).execute()
-            
-            created += 1
-            logger.info("job_enqueued", user_id=user_id[:8], section=section)
-            
-        except Exception as e:
-            # Likely duplicate key - job already exists
-            if "duplicate" in str(e).lower() or "unique" in str(e).lower():
-                logger.debug("job_already_exists", section=section)
-            else:
-                logger.error("enqueue_failed", section=section, error=str(e))
+    Returns:
+        Number of jobs created
+    """
+    created = enqueue_jobs_bulk(reading_job_rows(user_id))
+    
+    if created:
+        logger.info("jobs_enqueued", user_id=user_id[:8], count=created)
     
     return created
 
@@ -327,41 +627,87 @@ def check_and_enqueue_for_active_subscriptions() -> int:
     """
     Check for active subscriptions that don't have jobs and enqueue them.
     
+    One RPC returns only the subscribers without reading jobs. After the
+    first full scan the check is incremental (subscriptions changed since
+    the last check), with a periodic full scan as a safety net.
+    
+    Checks run one at a time, so an overlapping call cannot move the
+    watermark past users the other has not enqueued yet.
+    
     Returns:
         Number of users whose jobs were enqueued
     """
+    with _subscription_check_lock:
+        return _check_subscriptions()
+
+
+def _check_subscriptions() -> int:
+    global _subscription_watermark, _last_full_subscription_scan
+    
+    settings = get_settings()
     supabase = get_supabase_client()
     
-    # Find users with active subscriptions who don't have jobs yet
-    # This is a simplified check - in production you might want a more sophisticated approach
-    result = supabase.table("subscriptions").select(
-        "user_id"
-    ).eq(
-        "status", "active"
+    check_started_at = datetime.now(timezone.utc)
+    full_scan = (
+        _subscription_watermark is None
+        or time.monotonic() - _last_full_subscription_scan
+        >= settings.subscription_full_scan_interval_seconds
+    )
+    
+    changed_since = None
+    if not full_scan:
+        # Overlap covers subscriptions whose transaction committed late
+        changed_since = _subscription_watermark - timedelta(
+            seconds=SUBSCRIPTION_CHECK_OVERLAP_SECONDS
+        )
+    
+    result = supabase.rpc(
+        "get_subscribers_without_reading_jobs",
+        {
+            "changed_since": changed_since.isoformat() if changed_since else None,
+            "max_rows": settings.subscription_page_size,
+        }
     ).execute()
     
-    if not result.data:
-        return 0
+    user_ids = [row["user_id"] for row in result.data or []]
+    
+    def user_chunks() -> Iterator[tuple[list[str], list[dict]]]:
+        # A user's rows never straddle two chunks
+        users: list[str] = []
+        rows: list[dict] = []
+        for user_id in user_ids:
+            user_rows = reading_job_rows(user_id)
+            if rows and len(rows) + len(user_rows) > settings.job_enqueue_chunk_size:
+                yield users, rows
+                users, rows = [], []
+            users.append(user_id)
+            rows.extend(user_rows)
+        if users:
+            yield users, rows
     
+    # No jobs yet, enqueue them all in bulk
     total_enqueued = 0
+    failed = 0
+    for users, rows in user_chunks():
+        if _insert_jobs_chunk(supabase, rows) is None:
+            failed += len(users)
+        else:
+            total_enqueued += len(users)
     
-    for sub in result.data:
-        user_id = sub["user_id"]
-        
-        # Check if user already has jobs
-        jobs_result = supabase.table("jobs").select(
-            "id"
-        ).eq(
-            "user_id", user_id
-        ).limit(1).execute()
-        
-        if not jobs_result.data:
-            # No jobs yet, enqueue them
-            enqueue_reading_jobs(user_id)
-            total_enqueued += 1
+    # A full page may have more behind it and failed users must come back:
+    # keep the window until it drains
+    if not failed and len(user_ids) < settings.subscription_page_size:
+        _subscription_watermark = check_started_at
+        if full_scan:
+            _last_full_subscription_scan = time.monotonic()
     
-    if total_enqueued:
-        logger.info("subscriptions_processed", count=total_enqueued)
+    if total_enqueued or failed:
+        logger.info(
+            "subscriptions_processed",
+            count=total_enqueued,
+            failed=failed,
+            mode="full" if full_scan else "incremental",
+        )
     
     return total_enqueued
 
@@ -370,28 +716,25 @@ def check_and_enqueue_for_active_subscriptions() -> int:
 # FORECAST JOB PROCESSING
 # ============================================================
 
-def process_forecast_job(job: dict) -> None:
+async def process_forecast_job(job: dict) -> None:
     """
     Process a forecast generation job.
     
     1. Busca profile
     2. Busca prompt ativo (forecast_weekly/monthly/yearly)
     3. Gera texto via OpenAI
-    4. Gera áudio via Minimax (opcional)
-    5. Upload para Storage
-    6. Insert em forecasts
+    4. Gera áudio via Minimax (opcional) e faz upload para Storage,
+       ou, com forecast_audio_deferred, deixa o áudio para um job
+       generate_forecast_audio de prioridade baixa
+    5. Insert em forecasts (entregue)
     """
-    from app.models.forecast import ForecastType, FORECAST_SECTION_MAP
+    from app.models.forecast import FORECAST_SECTION_MAP
     from app.services.forecast_generator import (
         get_forecast_prompt,
-        generate_forecast_content,
         calculate_forecast_base,
     )
-    from app.services.minimax_service import (
-        synthesize_speech,
-        upload_audio_to_storage,
-        estimate_audio_duration,
-    )
+    from app.services.generation_cache import generate_forecast_cached
+    from app.services.audio_cache import get_or_synthesize_audio
     
     job_id = job["id"]
     user_id = job["user_id"]
@@ -414,7 +757,7 @@ def process_forecast_job(job: dict) -> None:
     
     try:
         # 1. Get profile
-        profile = get_profile(user_id)
+        profile = job.get("profile") or await get_profile(user_id)
         if not profile:
             raise ValueError("Profile not found")
         
@@ -428,73 +771,95 @@ def process_forecast_job(job: dict) -> None:
         nome = profile["full_name"]
         
         # 2. Get prompt
-        prompt = get_forecast_prompt(forecast_type)
+        prompt = job.get("prompt") or await get_forecast_prompt(forecast_type)
         if not prompt:
             raise ValueError(f"No active prompt for: {FORECAST_SECTION_MAP[forecast_type]}")
         
-        # 3. Generate text via OpenAI
-        content = generate_forecast_content(
-            prompt_template=prompt["template"],
+        # 3. Calculate base (users with the same base share one generation)
+        calc_base = calculate_forecast_base(birthdate, forecast_type, period_start)
+        
+        # 4. Generate text via OpenAI, personalized from the base's archetype
+        content, cache_status = await generate_forecast_cached(
+            user_id=user_id,
+            prompt=prompt,
             nome=nome,
-            birthdate=birthdate,
+            calc_base=calc_base,
             forecast_type=forecast_type,
             period_start=period_start,
             period_end=period_end,
         )
         
-        # 4. Calculate base for storage
-        calc_base = calculate_forecast_base(birthdate, forecast_type, period_start)
+        # 5. Calculate expires_at
+        expires_at = forecast_expires_at(forecast_type)
         
-        # 5. Generate audio via Minimax (optional - skip if not configured)
+        # 6. Generate audio via Minimax (optional - skip if not configured).
+        # Content-addressed: a retry or an identical text reuses the stored audio.
+        # Deferred: the text goes out now and a later job voices it
         audio_url = None
         audio_duration = None
+        audio_cache = None
         settings = get_settings()
+        voiced = bool(settings.minimax_api_key and settings.minimax_voice_id)
+        deferred = voiced and settings.forecast_audio_deferred
         
-        if settings.minimax_api_key and settings.minimax_voice_id:
+        if voiced and not deferred:
             try:
-                # Call sync TTS function directly
-                audio_bytes = synthesize_speech(content.conteudo)
-                # Generate a temporary forecast_id for storage path
-                import uuid
-                temp_forecast_id = str(uuid.uuid4())
-                audio_url = upload_audio_to_storage(audio_bytes, user_id, temp_forecast_id)
-                audio_duration = estimate_audio_duration(content.conteudo)
+                audio_url, duration, audio_cache = await get_or_synthesize_audio(
+                    user_id, content.conteudo, expires_at
+                )
+                if audio_url:
+                    audio_duration = round(duration)
             except Exception as audio_err:
                 logger.warning(
                     "audio_generation_skipped",
                     error=str(audio_err)[:100]
                 )
         
-        # 6. Calculate expires_at
-        if forecast_type in [ForecastType.WEEKLY, ForecastType.MONTHLY]:
-            expires_at = datetime.utcnow() + timedelta(days=90)
-        else:
-            expires_at = None  # Yearly não expira
-        
         # 7. Insert into forecasts table
-        supabase = get_supabase_client()
-        supabase.table("forecasts").upsert(
-            {
-                "user_id": user_id,
-                "type": forecast_type.value,
-                "period_start": period_start.isoformat(),
-                "period_end": period_end.isoformat(),
-                "title": content.titulo,
-                "content": content.conteudo,
-                "summary": content.resumo,
-                "audio_url": audio_url,
-                "audio_duration_seconds": audio_duration,
-                "prompt_version": prompt["version"],
-                "model_used": settings.openai_model,
-                "calculation_base": calc_base.model_dump(),
-                "delivered_at": datetime.utcnow().isoformat(),
-                "expires_at": expires_at.isoformat() if expires_at else None,
-            },
+        forecast_row = {
+            "user_id": user_id,
+            "type": forecast_type.value,
+            "period_start": period_start.isoformat(),
+            "period_end": period_end.isoformat(),
+            "title": content.titulo,
+            "content": content.conteudo,
+            "summary": content.resumo,
+            "prompt_version": prompt["version"],
+            "model_used": settings.openai_model,
+            "calculation_base": calc_base.model_dump(),
+            "delivered_at": datetime.utcnow().isoformat(),
+            "expires_at": expires_at.isoformat() if expires_at else None,
+        }
+        supabase = await get_async_supabase_client()
+        if not deferred:
+            forecast_row["audio_url"] = audio_url
+            forecast_row["audio_duration_seconds"] = audio_duration
+        elif await _stored_forecast_content(supabase, user_id, forecast_type, period_start) != content.conteudo:
+            # Deferred audio is written by its own job; a rerun keeps it only
+            # while the text is the same (the audio cache refills it cheaply)
+            forecast_row["audio_url"] = None
+            forecast_row["audio_duration_seconds"] = None
+        
+        await supabase.table("forecasts").upsert(
+            forecast_row,
             on_conflict="user_id,type,period_start"
         ).execute()
         
+        # 8. Queue the audio behind text work
+        if deferred:
+            deferred = await enqueue_forecast_audio_job(
+                user_id, forecast_type.value, period_start, content.conteudo
+            )
+        
         elapsed_ms = int((time.time() - start_time) * 1000)
-        update_job_completed(job_id, {"success": True, "duration_ms": elapsed_ms})
+        await update_job_completed(job_id, {
+            "success": True,
+            "duration_ms": elapsed_ms,
+            "generation_cache": cache_status,
+            "audio_cache": audio_cache,
+            "audio_deferred": deferred,
+            "completions": job_completion_stats().as_result(),
+        })
         
         logger.info(
             "forecast_job_completed",
@@ -502,6 +867,7 @@ def process_forecast_job(job: dict) -> None:
             forecast_type=forecast_type.value,
             has_audio=audio_url is not None,
             duration_ms=elapsed_ms,
+            generation_cache=cache_status,
         )
         
     except Exception as e:
@@ -516,7 +882,211 @@ def process_forecast_job(job: dict) -> None:
             duration_ms=elapsed_ms,
         )
         
-        update_job_failed(job_id, f"{error_type}: {str(e)}", attempts)
+        await update_job_failed(job_id, f"{error_type}: {str(e)}", attempts)
+
+
+async def _stored_forecast_content(
+    supabase,
+    user_id: str,
+    forecast_type: ForecastType,
+    period_start: date,
+) -> Optional[str]:
+    result = await supabase.table("forecasts").select(
+        "content"
+    ).eq(
+        "user_id", user_id
+    ).eq(
+        "type", forecast_type.value
+    ).eq(
+        "period_start", period_start.isoformat()
+    ).limit(1).execute()
+    
+    return result.data[0]["content"] if result.data else None
+
+
+async def process_forecast_audio_job(job: dict) -> None:
+    """
+    Voice a delivered forecast and fill in its audio.
+    
+    1. Busca a previsão (usuário + tipo + período)
+    2. Gera o áudio via Minimax, ou reusa o do cache de áudio
+    3. Update de audio_url e audio_duration_seconds
+    
+    Com o circuito do Minimax aberto o job volta para a fila sem gastar
+    tentativa.
+    """
+    from app.services.audio_cache import get_or_synthesize_audio
+    from app.services.circuit_breaker import OPEN, CircuitOpenError
+    from app.services.minimax_service import get_minimax_breaker
+    
+    job_id = job["id"]
+    user_id = job["user_id"]
+    attempts = job["attempts"]
+    payload = job.get("payload", {})
+    
+    forecast_type = ForecastType(payload.get("forecast_type", "weekly"))
+    period_start = payload.get("period_start")
+    
+    start_time = time.time()
+    settings = get_settings()
+    
+    try:
+        breaker = get_minimax_breaker()
+        if breaker.state == OPEN:
+            raise CircuitOpenError(breaker.name, breaker.stats()["retry_in_seconds"] or 0)
+        
+        # 1. Get the forecast
+        supabase = await get_async_supabase_client()
+        result = await supabase.table("forecasts").select(
+            "id, content, expires_at"
+        ).eq(
+            "user_id", user_id
+        ).eq(
+            "type", forecast_type.value
+        ).eq(
+            "period_start", period_start
+        ).limit(1).execute()
+        
+        forecast = result.data[0] if result.data else None
+        skipped = None
+        if forecast is None:
+            # Expired and cleaned up before its turn came
+            skipped = "forecast_not_found"
+        elif not (settings.minimax_api_key and settings.minimax_voice_id):
+            skipped = "minimax_not_configured"
+        
+        if skipped:
+            logger.info("forecast_audio_job_skipped", job_id=job_id[:8], reason=skipped)
+            await update_job_completed(job_id, {"success": True, "skipped": skipped})
+            return
+        
+        # 2. Generate (or reuse) the audio
+        expires_at = datetime.fromisoformat(forecast["expires_at"]) if forecast.get("expires_at") else None
+        audio_url, duration, audio_cache = await get_or_synthesize_audio(
+            user_id, forecast["content"], expires_at
+        )
+        if not audio_url:
+            raise RuntimeError("Audio upload failed")
+        
+        # 3. Fill in the forecast
+        await supabase.table("forecasts").update({
+            "audio_url": audio_url,
+            "audio_duration_seconds": round(duration),
+        }).eq("id", forecast["id"]).execute()
+        
+        elapsed_ms = int((time.time() - start_time) * 1000)
+        await update_job_completed(job_id, {
+            "success": True,
+            "duration_ms": elapsed_ms,
+            "audio_cache": audio_cache,
+            "audio_duration_seconds": round(duration),
+        })
+        
+        logger.info(
+            "forecast_audio_job_completed",
+            job_id=job_id[:8],
+            forecast_type=forecast_type.value,
+            duration_ms=elapsed_ms,
+            audio_cache=audio_cache,
+        )
+        
+    except CircuitOpenError as e:
+        # Minimax is down: wait for the next probe instead of failing the job
+        await defer_job(job_id, max(e.retry_in, BACKOFF_INTERVALS[0]), attempts)
+        
+    except Exception as e:
+        elapsed_ms = int((time.time() - start_time) * 1000)
+        error_type = type(e).__name__
+        
+        logger.error(
+            "forecast_audio_job_failed",
+            job_id=job_id[:8],
+            forecast_type=forecast_type.value,
+            error_type=error_type,
+            duration_ms=elapsed_ms,
+        )
+        
+        await update_job_failed(job_id, f"{error_type}: {str(e)}", attempts)
+
+
+def forecast_expires_at(forecast_type: ForecastType) -> Optional[datetime]:
+    """Expiração de uma previsão gerada agora (90 dias; anual não expira)."""
+    if forecast_type in (ForecastType.WEEKLY, ForecastType.MONTHLY):
+        return datetime.utcnow() + timedelta(days=90)
+    return None
+
+
+def forecast_job_row(
+    user_id: str,
+    forecast_type: str,
+    period_start: date,
+    period_end: date,
+) -> dict:
+    """Job row de previsão (idempotency key: usuário + tipo + período)."""
+    return {
+        "user_id": user_id,
+        "type": "generate_forecast",
+        "payload": {
+            "forecast_type": forecast_type,
+            "period_start": period_start.isoformat(),
+            "period_end": period_end.isoformat(),
+        },
+        "idempotency_key": f"{user_id}:{forecast_type}:{period_start.isoformat()}",
+    }
+
+
+def forecast_audio_job_row(
+    user_id: str,
+    forecast_type: str,
+    period_start: date,
+    content: str,
+) -> dict:
+    """
+    Job row do áudio de uma previsão, atrás do trabalho de texto.
+    
+    A idempotency key inclui a chave do áudio (texto + voz): um texto
+    regenerado ganha um job novo, o mesmo texto não.
+    """
+    from app.services.audio_cache import audio_cache_key
+    
+    return {
+        "user_id": user_id,
+        "type": "generate_forecast_audio",
+        "priority": AUDIO_JOB_PRIORITY,
+        "payload": {
+            "forecast_type": forecast_type,
+            "period_start": period_start.isoformat(),
+        },
+        "idempotency_key": (
+            f"audio:{user_id}:{forecast_type}:{period_start.isoformat()}:{audio_cache_key(content)[:16]}"
+        ),
+    }
+
+
+async def enqueue_forecast_audio_job(
+    user_id: str,
+    forecast_type: str,
+    period_start: date,
+    content: str,
+) -> bool:
+    """
+    Enfileira o áudio de uma previsão já entregue.
+    
+    Returns:
+        False se não foi possível enfileirar (a previsão fica sem áudio)
+    """
+    supabase = await get_async_supabase_client()
+    
+    try:
+        await supabase.table("jobs").upsert(
+            forecast_audio_job_row(user_id, forecast_type, period_start, content),
+            on_conflict="idempotency_key",
+            ignore_duplicates=True,
+        ).execute()
+        return True
+    except Exception as e:
+        logger.warning("forecast_audio_enqueue_failed", user_id=user_id[:8], error=str(e)[:200])
+        return False
 
 
 def enqueue_forecast_jobs_for_all_users(
@@ -527,102 +1097,186 @@ def enqueue_forecast_jobs_for_all_users(
     """
     Enfileira jobs de previsão para todos os usuários com assinatura ativa.
     
+    Assinantes são lidos página a página e inseridos em lotes (bulk).
+    
     Returns:
         Number of jobs created
     """
-    supabase = get_supabase_client()
+    subscribers = 0
     
-    # Get all active subscriptions
-    result = supabase.table("subscriptions").select(
-        "user_id"
-    ).eq(
-        "status", "active"
-    ).execute()
+    def job_rows() -> Iterator[dict]:
+        nonlocal subscribers
+        
+        for user_id in iter_active_subscriber_ids():
+            subscribers += 1
+            yield forecast_job_row(user_id, forecast_type, period_start, period_end)
+    
+    created = enqueue_jobs_bulk(job_rows())
     
-    if not result.data:
+    if not subscribers:
         logger.info("no_active_subscriptions_for_forecast")
         return 0
     
-    created = 0
+    logger.info(
+        "forecast_jobs_enqueued",
+        forecast_type=forecast_type,
+        count=created,
+        subscribers=subscribers,
+    )
+    return created
+
+
+def audio_storage_path(audio_url: str) -> Optional[str]:
+    """
+    Extract the forecasts-audio object path from a public audio URL.
+    
+    Format: https://xxx.supabase.co/storage/v1/object/public/forecasts-audio/{user_id}/{forecast_id}.mp3
+    """
+    parts = audio_url.split("/forecasts-audio/")
+    if len(parts) < 2:
+        return None
+    return parts[1].split("?")[0] or None
+
+
+def _cleanup_expired_audio_cache(supabase, now_iso: str, batch_size: int) -> int:
+    """Remove áudios do cache cujas previsões já expiraram (objeto + linha)."""
+    removed = 0
     
-    for sub in result.data:
-        user_id = sub["user_id"]
+    while True:
+        result = supabase.table("audio_cache").select(
+            "audio_key, storage_path"
+        ).lt(
+            "expires_at", now_iso
+        ).limit(batch_size).execute()
         
-        # Idempotency key: user + type + period
-        idempotency_key = f"{user_id}:{forecast_type}:{period_start.isoformat()}"
+        rows = result.data or []
+        if not rows:
+            break
         
-        try:
-            supabase.table("jobs").insert({
-                "user_id": user_id,
-                "type": "generate_forecast",
-                "payload": {
-                    "forecast_type": forecast_type,
-                    "period_start": period_start.isoformat(),
-                    "period_end": period_end.isoformat(),
-                },
-                "idempotency_key": idempotency_key,
-            }).execute()
-            
-            created += 1
-            logger.debug("forecast_job_enqueued", user_id=user_id[:8], forecast_type=forecast_type)
-            
-        except Exception as e:
-            if "duplicate" in str(e).lower() or "unique" in str(e).lower():
-                logger.debug("forecast_job_exists", user_id=user_id[:8])
-            else:
-                logger.error("forecast_enqueue_failed", error=str(e)[:100])
+        supabase.storage.from_("forecasts-audio").remove([row["storage_path"] for row in rows])
+        supabase.table("audio_cache").delete().in_(
+            "audio_key", [row["audio_key"] for row in rows]
+        ).execute()
+        removed += len(rows)
+        
+        if len(rows) < batch_size:
+            break
     
-    logger.info("forecast_jobs_enqueued", forecast_type=forecast_type, count=created)
-    return created
+    if removed:
+        logger.info("audio_cache_cleanup_complete", deleted=removed)
+    return removed
 
 
 def cleanup_expired_forecasts() -> int:
     """
-    Remove previsões expiradas do banco de dados.
+    Remove previsões expiradas do banco de dados, em lotes.
+    
+    Cada lote (idx_forecasts_expires) remove os áudios numa única chamada
+    ao Storage e apaga as linhas com um único DELETE ... IN. Para depois de
+    cleanup_time_budget_seconds; o restante fica para a próxima execução.
     
     Returns:
         Number of forecasts removed
     """
+    from app.services.audio_cache import CACHE_PREFIX
+    
+    settings = get_settings()
     supabase = get_supabase_client()
     
+    start_time = time.monotonic()
+    now_iso = datetime.utcnow().isoformat()
+    batch_size = settings.cleanup_batch_size
+    deleted_count = 0
+    batches = 0
+    budget_exhausted = False
+    
     try:
-        # Buscar forecasts expirados
-        result = supabase.table("forecasts").select(
-            "id, audio_url"
-        ).lt(
-            "expires_at", datetime.utcnow().isoformat()
-        ).execute()
-        
-        if not result.data:
-            logger.debug("no_expired_forecasts")
-            return 0
-        
-        deleted_count = 0
-        
-        for forecast in result.data:
-            forecast_id = forecast["id"]
-            audio_url = forecast.get("audio_url")
+        while True:
+            if time.monotonic() - start_time >= settings.cleanup_time_budget_seconds:
+                budget_exhausted = True
+                break
             
-            # Delete audio from storage if exists
-            if audio_url:
+            # Buscar próximo lote de forecasts expirados
+            result = supabase.table("forecasts").select(
+                "id, audio_url"
+            ).lt(
+                "expires_at", now_iso
+            ).order("expires_at").limit(batch_size).execute()
+            
+            rows = result.data or []
+            if not rows:
+                break
+            
+            # Delete audio from storage in one call
+            paths = [
+                path for path in (
+                    audio_storage_path(row["audio_url"])
+                    for row in rows if row.get("audio_url")
+                )
+                # Shared cached audio goes with its audio_cache row instead
+                if path and not path.startswith(CACHE_PREFIX)
+            ]
+            if paths:
                 try:
-                    # Extract path from URL
-                    # Format: https://xxx.supabase.co/storage/v1/object/public/forecasts-audio/{user_id}/{forecast_id}.mp3
-                    parts = audio_url.split("/forecasts-audio/")
-                    if len(parts) > 1:
-                        storage_path = parts[1]
-                        supabase.storage.from_("forecasts-audio").remove([storage_path])
+                    supabase.storage.from_("forecasts-audio").remove(paths)
                 except Exception as storage_err:
-                    logger.warning("audio_delete_failed", error=str(storage_err)[:50])
+                    logger.warning(
+                        "audio_delete_failed",
+                        count=len(paths),
+                        error=str(storage_err)[:100],
+                    )
             
-            # Delete forecast record
-            supabase.table("forecasts").delete().eq("id", forecast_id).execute()
-            deleted_count += 1
-        
-        logger.info("forecasts_cleanup_complete", deleted=deleted_count)
-        return deleted_count
+            # Delete forecast records
+            ids = [row["id"] for row in rows]
+            supabase.table("forecasts").delete().in_("id", ids).execute()
+            
+            deleted_count += len(ids)
+            batches += 1
+            
+            if len(rows) < batch_size:
+                break
         
     except Exception as e:
-        logger.error("forecast_cleanup_failed", error=str(e))
+        logger.error("forecast_cleanup_failed", error=str(e), deleted=deleted_count)
+        return deleted_count
+    
+    if not budget_exhausted:
+        try:
+            _cleanup_expired_audio_cache(supabase, now_iso, batch_size)
+        except Exception as e:
+            logger.warning("audio_cache_cleanup_failed", error=str(e)[:200])
+    
+    if not deleted_count:
+        logger.debug("no_expired_forecasts")
         return 0
+    
+    logger.info(
+        "forecasts_cleanup_complete",
+        deleted=deleted_count,
+        batches=batches,
+        duration_ms=int((time.monotonic() - start_time) * 1000),
+        budget_exhausted=budget_exhausted,
+    )
+    return deleted_count
+
 
+def cleanup_expired_generations() -> int:
+    """
+    Remove entradas expiradas do cache de gerações (arquétipos de previsão).
+    
+    Returns:
+        Number of entries deleted
+    """
+    supabase = get_supabase_client()
+    now = datetime.now(timezone.utc).isoformat()
+    
+    try:
+        result = supabase.table("generation_cache").delete().lt("expires_at", now).execute()
+    except Exception as e:
+        logger.error("generation_cache_cleanup_failed", error=str(e))
+        return 0
+    
+    deleted = len(result.data or [])
+    if deleted:
+        logger.info("generation_cache_cleanup_complete", deleted=deleted)
+    return deleted
@@ -0,0 +1,145 @@
+"""
+Push-based job wakeup - Postgres LISTEN/NOTIFY on the `jobs_pending` channel.
+
+Triggers on `jobs` and `subscriptions` (migration 014) notify the worker
+when there is something to claim, so it does not wait for the next poll.
+Polling stays as a slow safety net for missed notifications.
+"""
+
+import asyncio
+import json
+from datetime import datetime, timezone
+from typing import Optional
+
+import structlog
+
+logger = structlog.get_logger()
+
+JOBS_CHANNEL = "jobs_pending"
+
+# Reconnect backoff in seconds
+RECONNECT_INTERVALS = [1, 5, 15, 30]
+
+
+class JobWakeup:
+    """
+    Wakes the job loop on NOTIFY, or when the poll timeout expires.
+
+    Without a database URL it behaves as a plain interval timer.
+    """
+
+    def __init__(self, database_url: str = ""):
+        self.database_url = database_url
+        self.notifications = 0
+        self._event = asyncio.Event()
+        self._conn = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def listening(self) -> bool:
+        """True while a LISTEN connection is open."""
+        return self._conn is not None and not self._conn.is_closed()
+
+    async def start(self) -> None:
+        """Start listening in the background (no-op without a database URL)."""
+        if not self.database_url or self._task:
+            return
+        self._task = asyncio.create_task(self._listen_forever())
+
+    async def stop(self) -> None:
+        """Stop listening and close the connection."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._close()
+
+    async def wait(self, timeout: float) -> bool:
+        """
+        Wait for a notification or the timeout.
+
+        Returns:
+            True if woken by a notification, False on timeout
+        """
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self._event.clear()
+
+    def notify(self, payload: str = "") -> None:
+        """
+        Handle a notification payload.
+
+        Retries scheduled in the future wake the loop when they become due.
+        """
+        self.notifications += 1
+        delay = _seconds_until_due(payload)
+
+        if delay > 0:
+            asyncio.get_running_loop().call_later(delay, self._event.set)
+        else:
+            self._event.set()
+
+    async def _listen_forever(self) -> None:
+        import asyncpg
+
+        attempt = 0
+        while True:
+            try:
+                self._conn = await asyncpg.connect(self.database_url)
+                lost = asyncio.Event()
+                self._conn.add_termination_listener(lambda _conn: lost.set())
+                await self._conn.add_listener(
+                    JOBS_CHANNEL,
+                    lambda _conn, _pid, _channel, payload: self.notify(payload),
+                )
+                logger.info("job_wakeup_listening", channel=JOBS_CHANNEL)
+                attempt = 0
+
+                # Catch up on anything inserted while we were disconnected
+                self._event.set()
+                await lost.wait()
+                logger.warning("job_wakeup_connection_lost")
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("job_wakeup_connect_failed", error=str(e)[:200])
+
+            await self._close()
+            delay = RECONNECT_INTERVALS[min(attempt, len(RECONNECT_INTERVALS) - 1)]
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def _close(self) -> None:
+        if self._conn is not None:
+            try:
+                await self._conn.close()
+            except Exception:
+                pass
+            self._conn = None
+
+
+def _seconds_until_due(payload: str) -> float:
+    """Seconds until a notified job is due (0 if due now or unknown)."""
+    if not payload:
+        return 0.0
+
+    try:
+        scheduled_at = json.loads(payload).get("scheduled_at")
+        if not scheduled_at:
+            return 0.0
+        due = datetime.fromisoformat(scheduled_at)
+    except (ValueError, AttributeError, TypeError):
+        return 0.0
+
+    if due.tzinfo is None:
+        due = due.replace(tzinfo=timezone.utc)
+
+    return max(0.0, (due - datetime.now(timezone.utc)).total_seconds())
@@ -0,0 +1,113 @@
+"""
+Micro-batcher - packs concurrent requests into one batched call.
+
+Callers submit items and await their own result. Items that arrive within
+a short window (or until the batch is full) go out together through
+run_batch; any element the batch could not produce is retried on its own
+through run_single, so one bad element never fails its neighbours.
+"""
+
+import asyncio
+from typing import Awaitable, Callable, Generic, TypeVar
+
+import structlog
+
+logger = structlog.get_logger()
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class MicroBatcher(Generic[T, R]):
+    """Collects submit() calls on one event loop into batches of up to batch_size."""
+
+    def __init__(
+        self,
+        name: str,
+        batch_size: int,
+        window_seconds: float,
+        run_batch: Callable[[list[T]], Awaitable[list]],
+        run_single: Callable[[T], Awaitable[R]],
+    ):
+        self.name = name
+        self.batch_size = max(1, batch_size)
+        self.window_seconds = window_seconds
+        self.run_batch = run_batch
+        self.run_single = run_single
+        self.batches = 0
+        self.items = 0
+        self.fallbacks = 0
+        self._pending: list[tuple[T, asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+
+    async def submit(self, item: T) -> R:
+        """Queue an item and wait for its result."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_seconds, self._flush)
+
+        return await future
+
+    def stats(self) -> dict:
+        """Counters for the metrics endpoint."""
+        return {
+            "batch_size": self.batch_size,
+            "batches": self.batches,
+            "items": self.items,
+            "fallbacks": self.fallbacks,
+            "avg_batch": round(self.items / self.batches, 2) if self.batches else 0.0,
+        }
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        while self._pending:
+            batch = self._pending[:self.batch_size]
+            del self._pending[:self.batch_size]
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: list[tuple[T, asyncio.Future]]) -> None:
+        items = [item for item, _ in batch]
+        self.batches += 1
+        self.items += len(items)
+
+        if len(items) == 1:
+            results: list = [None]
+            retry = [0]
+        else:
+            try:
+                results = await self.run_batch(items)
+            except Exception as e:
+                logger.warning("batch_call_failed", batcher=self.name, size=len(items), error=str(e)[:200])
+                results = [e] * len(items)
+            retry = [i for i, result in enumerate(results) if isinstance(result, Exception)]
+
+        for i, (_, future) in enumerate(batch):
+            if i not in retry and not future.done():
+                future.set_result(results[i])
+
+        if retry and len(items) > 1:
+            self.fallbacks += len(retry)
+            logger.info("batch_elements_retried_single", batcher=self.name, count=len(retry))
+
+        await asyncio.gather(*(self._run_single(*batch[i]) for i in retry))
+
+    async def _run_single(self, item: T, future: asyncio.Future) -> None:
+        try:
+            result = await self.run_single(item)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+            return
+        if not future.done():
+            future.set_result(result)
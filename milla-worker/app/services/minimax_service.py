@@ -2,30 +2,125 @@
 Minimax TTS service - Text-to-Speech with cloned voice.
 """
 
+import asyncio
+import json
+import re
+import weakref
 import structlog
 import httpx
-from typing import Optional
+from functools import lru_cache
+from typing import AsyncIterable, AsyncIterator, Optional
 
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
+from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception
 
 from app.config import get_settings
-from app.services.supabase_client import get_supabase_client
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.supabase_client import get_async_supabase_client
+from app.services.http_transport import get_http_client
+from app.services.mp3 import Mp3FrameStream, join_mp3
 
 logger = structlog.get_logger()
 
 # Minimax API endpoint
 MINIMAX_TTS_URL = "https://api.minimax.chat/v1/t2a_v2"
 
+AUDIO_BUCKET = "forecasts-audio"
+
+# Modelo e parâmetros de voz/áudio (também entram na chave do cache de áudio)
+TTS_MODEL = "speech-2.5-hd-preview"
+VOICE_SETTING = {"speed": 1, "vol": 1, "pitch": 0}
+AUDIO_SETTING = {"sample_rate": 32000, "bitrate": 128000, "format": "mp3", "channel": 1}
+
+# Maior texto aceito numa chamada (recomendação da API)
+TTS_MAX_CHARS = 2000
+
+# Frase (com o espaço que a segue) e, para frases longas, pedaços menores
+SENTENCE_PATTERN = re.compile(r".+?(?:[.!?…]+[\"'”»)]*(?=\s|$)|$)\s*", re.DOTALL)
+CLAUSE_PATTERN = re.compile(r".+?(?:[,;:](?=\s)|$)\s*", re.DOTALL)
+WORD_PATTERN = re.compile(r"\S+\s*")
+
+# Falhas temporárias (vale tentar de novo); o resto (400, 401, saldo...) é permanente
+TRANSIENT_HTTP_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+# base_resp.status_code: erro desconhecido, timeout, rate limit, erro interno, limite de tokens
+TRANSIENT_API_CODES = {1000, 1001, 1002, 1013, 1039}
+
+# Tentativas do stream_speech_async (mesma espera exponencial do synthesize_speech_async)
+STREAM_RETRY_ATTEMPTS = 3
+STREAM_RETRY_WAIT_SECONDS = 4.0
+STREAM_RETRY_MAX_WAIT_SECONDS = 60.0
+
+
+class MinimaxAPIError(ValueError):
+    """Erro reportado pela API em base_resp (HTTP 200)."""
+    
+    def __init__(self, status_code: Optional[int], message: str):
+        super().__init__(f"Minimax API error: {message}")
+        self.status_code = status_code
+
+
+def is_transient_error(exc: BaseException) -> bool:
+    """True para erros em que outra tentativa pode dar certo (timeout, 429, 5xx...)."""
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code in TRANSIENT_HTTP_STATUSES
+    if isinstance(exc, MinimaxAPIError):
+        return exc.status_code in TRANSIENT_API_CODES
+    # Timeouts e falhas de conexão
+    return isinstance(exc, httpx.TransportError)
+
+
+@lru_cache
+def get_minimax_breaker() -> CircuitBreaker:
+    """Circuit breaker das chamadas ao Minimax, compartilhado pelo processo."""
+    settings = get_settings()
+    return CircuitBreaker(
+        "minimax",
+        failure_threshold=settings.minimax_breaker_failure_threshold,
+        recovery_seconds=settings.minimax_breaker_recovery_seconds,
+        is_failure=is_transient_error,
+    )
+
+
+# Vagas de chamadas ao Minimax por event loop: minimax_concurrency vale para
+# o processo todo, não para cada job
+_tts_slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_tts_slots() -> asyncio.Semaphore:
+    """Semáforo das chamadas ao Minimax do event loop atual (criado no primeiro uso)."""
+    loop = asyncio.get_running_loop()
+    slots = _tts_slots.get(loop)
+    
+    if slots is None:
+        slots = asyncio.Semaphore(max(1, get_settings().minimax_concurrency))
+        _tts_slots[loop] = slots
+    
+    return slots
+
+
+def synthesize_speech(text: str) -> bytes:
+    """
+    Sintetiza texto em áudio (wrapper síncrono para scripts e testes).
+    
+    Ver synthesize_speech_async.
+    """
+    return asyncio.run(synthesize_speech_async(text))
+
 
 @retry(
     stop=stop_after_attempt(3),
     wait=wait_exponential(multiplier=1, min=4, max=60),
-    retry=retry_if_exception_type((httpx.HTTPStatusError, httpx.TimeoutException))
+    retry=retry_if_exception(is_transient_error),
+    reraise=True,
 )
-def synthesize_speech(text: str) -> bytes:
+async def synthesize_speech_async(text: str) -> bytes:
     """
     Sintetiza texto em áudio usando a API Minimax T2A v2.
     
+    Só erros temporários são repetidos, e com o circuito aberto (Minimax
+    fora do ar) a chamada falha na hora.
+    
     Args:
         text: Texto para sintetizar (máx ~2000 caracteres recomendado)
         
@@ -35,6 +130,7 @@ def synthesize_speech(text: str) -> bytes:
     Raises:
         httpx.HTTPStatusError: Se a API retornar erro
         httpx.TimeoutException: Se a requisição exceder o timeout
+        CircuitOpenError: Se o circuito do Minimax estiver aberto
         ValueError: Se a resposta não contiver áudio válido
     """
     settings = get_settings()
@@ -43,11 +139,270 @@ def synthesize_speech(text: str) -> bytes:
         logger.warning("minimax_not_configured", message="Minimax API key, voice ID, or group ID not set")
         raise ValueError("Minimax not configured - check MINIMAX_API_KEY, MINIMAX_VOICE_ID, and MINIMAX_GROUP_ID")
     
-    # Truncar texto se muito longo (recomendação da API)
-    truncated_text = text[:2000] if len(text) > 2000 else text
+    # Truncar texto se muito longo (textos longos passam por synthesize_long_speech_async)
+    truncated_text = text[:TTS_MAX_CHARS] if len(text) > TTS_MAX_CHARS else text
+    api_url, headers, payload = _tts_request(truncated_text, stream=False)
+    
+    timeout = httpx.Timeout(settings.minimax_timeout_seconds)
+    client = get_http_client()
+    
+    logger.info("minimax_request_start", text_length=len(truncated_text))
+    
+    async with get_tts_slots():
+        with get_minimax_breaker().guard():
+            response = await client.post(
+                api_url,
+                headers=headers,
+                json=payload,
+                timeout=timeout,
+            )
+            response.raise_for_status()
+            
+            # Parse JSON response
+            try:
+                json_response = response.json()
+            except Exception as e:
+                logger.error("minimax_json_parse_failed", error=str(e))
+                raise ValueError(f"Failed to parse Minimax response as JSON: {e}")
+            
+            # Check for API errors
+            _raise_for_base_resp(json_response)
+    
+    # Extract hex audio from response
+    data = json_response.get("data", {})
+    hex_audio = data.get("audio")
+    
+    if not hex_audio:
+        logger.error("minimax_no_audio_in_response", 
+            response_keys=list(json_response.keys()),
+            data_keys=list(data.keys()) if data else []
+        )
+        raise ValueError("No audio data in Minimax response")
+    
+    # Convert hex string to bytes
+    try:
+        audio_bytes = bytes.fromhex(hex_audio)
+    except ValueError as e:
+        logger.error("minimax_hex_decode_failed", error=str(e), hex_preview=hex_audio[:50])
+        raise ValueError(f"Failed to decode hex audio: {e}")
+    
+    logger.info("minimax_request_success", audio_size=len(audio_bytes))
+    
+    return audio_bytes
+
+
+async def stream_speech_async(text: str) -> AsyncIterator[bytes]:
+    """
+    Sintetiza texto em áudio com stream: true, entregando o MP3 em pedaços.
+    
+    Cada evento SSE traz um trecho do áudio em hex, decodificado assim que
+    chega; nem a resposta inteira nem o áudio inteiro ficam em memória.
+    
+    Erros temporários são repetidos como em synthesize_speech_async, mas só
+    antes do primeiro pedaço: depois dele o início do áudio já foi entregue e
+    repetir duplicaria esse trecho, então o erro sobe para quem consome.
+    
+    Raises:
+        httpx.HTTPStatusError: Se a API retornar erro
+        CircuitOpenError: Se o circuito do Minimax estiver aberto
+        ValueError: Se a API reportar erro ou o stream não trouxer áudio
+    """
+    attempt = 1
+    
+    while True:
+        received = 0
+        try:
+            async for audio in _stream_speech_once(text):
+                received += len(audio)
+                yield audio
+            return
+        except Exception as e:
+            if received or attempt >= STREAM_RETRY_ATTEMPTS or not is_transient_error(e):
+                raise
+            wait = min(STREAM_RETRY_MAX_WAIT_SECONDS, STREAM_RETRY_WAIT_SECONDS * 2 ** (attempt - 1))
+            logger.warning("minimax_stream_retry", attempt=attempt, wait_seconds=wait, error=str(e)[:100])
+            await asyncio.sleep(wait)
+            attempt += 1
+
+
+async def _stream_speech_once(text: str) -> AsyncIterator[bytes]:
+    settings = get_settings()
+    
+    if not settings.minimax_api_key or not settings.minimax_voice_id or not settings.minimax_group_id:
+        raise ValueError("Minimax not configured - check MINIMAX_API_KEY, MINIMAX_VOICE_ID, and MINIMAX_GROUP_ID")
+    
+    api_url, headers, payload = _tts_request(text[:TTS_MAX_CHARS], stream=True)
+    received = 0
+    
+    async with get_tts_slots():
+        with get_minimax_breaker().guard():
+            async with get_http_client().stream(
+                "POST",
+                api_url,
+                headers=headers,
+                json=payload,
+                timeout=httpx.Timeout(settings.minimax_timeout_seconds),
+            ) as response:
+                response.raise_for_status()
+                
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    event = json.loads(line[5:])
+                    _raise_for_base_resp(event)
+                    
+                    data = event.get("data") or {}
+                    # status 2 encerra o stream; o áudio agregado que pode vir junto já foi entregue
+                    if data.get("status") == 2 and received:
+                        break
+                    if data.get("audio"):
+                        audio = bytes.fromhex(data["audio"])
+                        received += len(audio)
+                        yield audio
+    
+    if not received:
+        raise ValueError("No audio data in Minimax stream")
+
+
+def split_text_for_speech(text: str, max_chars: int = TTS_MAX_CHARS) -> list[str]:
+    """
+    Divide o texto em trechos de até max_chars, cortando entre frases.
+    
+    Frases maiores que max_chars são cortadas em vírgulas/ponto e vírgula e,
+    em último caso, entre palavras.
+    """
+    max_chars = min(max_chars, TTS_MAX_CHARS)
+    chunks: list[str] = []
+    current = ""
+    
+    for piece in _speech_pieces(text.strip(), max_chars):
+        if current and len(current) + len(piece.rstrip()) > max_chars:
+            chunks.append(current.strip())
+            current = ""
+        current += piece
+    
+    if current.strip():
+        chunks.append(current.strip())
+    
+    return chunks
+
+
+async def synthesize_long_speech_async(text: str) -> tuple[bytes, float]:
+    """
+    Sintetiza um texto de qualquer tamanho.
+    
+    O texto é dividido entre frases (split_text_for_speech), os trechos são
+    sintetizados em paralelo (até minimax_concurrency chamadas ao Minimax por
+    vez, somando todos os jobs do processo) e os frames MP3
+    são unidos na ordem do texto. Se um trecho falha, os demais são cancelados
+    e o erro sobe.
+    
+    Returns:
+        (bytes do MP3 completo, duração em segundos medida nos frames)
+    """
+    settings = get_settings()
+    chunks = split_text_for_speech(text, settings.minimax_chunk_max_chars)
+    
+    # Cada chamada espera por uma vaga em get_tts_slots()
+    tasks = [asyncio.create_task(synthesize_speech_async(chunk)) for chunk in chunks]
+    try:
+        audio_chunks = await asyncio.gather(*tasks)
+    except BaseException:
+        # Sem um trecho o áudio não serve: cancela os que ainda estão na fila ou no ar
+        for task in tasks:
+            task.cancel()
+        raise
+    audio_bytes, duration = join_mp3(list(audio_chunks))
+    
+    logger.info(
+        "minimax_long_speech_synthesized",
+        text_length=len(text),
+        chunks=len(chunks),
+        audio_size=len(audio_bytes),
+        duration_seconds=round(duration, 1),
+    )
+    
+    return audio_bytes, duration
+
+
+class SpeechStream:
+    """
+    Áudio de um texto longo em pedaços, na ordem, enquanto é sintetizado.
+    
+    Versão em streaming de synthesize_long_speech_async: os trechos são
+    sintetizados com stream_speech_async, até minimax_concurrency ao mesmo
+    tempo, e um trecho só libera sua vaga quando foi todo consumido; assim no
+    máximo minimax_concurrency trechos de áudio ficam em memória. As chamadas
+    ao Minimax ainda disputam as vagas do processo (get_tts_slots). Depois de
+    consumido, duration tem a duração medida nos frames.
+    """
+    
+    def __init__(self, text: str):
+        settings = get_settings()
+        self.chunks = split_text_for_speech(text, settings.minimax_chunk_max_chars)
+        self.concurrency = max(1, settings.minimax_concurrency)
+        self.duration = 0.0
+        self.size = 0
+        self._iterator: Optional[AsyncIterator[bytes]] = None
+    
+    def __aiter__(self) -> AsyncIterator[bytes]:
+        self._iterator = self._frames()
+        return self._iterator
+    
+    async def aclose(self) -> None:
+        """Cancela as sínteses em andamento (se o consumo parou antes do fim)."""
+        if self._iterator is not None:
+            await self._iterator.aclose()
+    
+    async def _frames(self) -> AsyncIterator[bytes]:
+        slots = asyncio.Semaphore(self.concurrency)
+        queues: list[asyncio.Queue] = [asyncio.Queue() for _ in self.chunks]
+        tasks: list[asyncio.Task] = []
+        
+        async def produce(chunk: str, queue: asyncio.Queue) -> None:
+            try:
+                async for piece in stream_speech_async(chunk):
+                    queue.put_nowait(piece)
+                queue.put_nowait(None)
+            except Exception as e:
+                queue.put_nowait(e)
+        
+        async def start_in_order() -> None:
+            for chunk, queue in zip(self.chunks, queues):
+                await slots.acquire()
+                tasks.append(asyncio.create_task(produce(chunk, queue)))
+        
+        starter = asyncio.create_task(start_in_order())
+        try:
+            for queue in queues:
+                frames = Mp3FrameStream()
+                while (piece := await queue.get()) is not None:
+                    if isinstance(piece, Exception):
+                        raise piece
+                    audio = frames.feed(piece)
+                    if audio:
+                        self.size += len(audio)
+                        yield audio
+                self.duration += frames.seconds
+                slots.release()
+        finally:
+            starter.cancel()
+            for task in tasks:
+                task.cancel()
+        
+        logger.info(
+            "minimax_speech_streamed",
+            chunks=len(self.chunks),
+            audio_size=self.size,
+            duration_seconds=round(self.duration, 1),
+        )
+
+
+def _tts_request(text: str, stream: bool) -> tuple[str, dict, dict]:
+    settings = get_settings()
     
     # API URL includes group_id - using minimax.io domain
-    api_url = f"https://api.minimax.io/v1/t2a_v2?GroupId={settings.minimax_group_id}"
+    api_url = f"{settings.minimax_base_url}/v1/t2a_v2?GroupId={settings.minimax_group_id}"
     
     headers = {
         "Authorization": f"Bearer {settings.minimax_api_key}",
@@ -56,75 +411,44 @@ def synthesize_speech(text: str) -> bytes:
     
     # Payload format matching working N8N flow
     payload = {
-        "model": "speech-2.5-hd-preview",
-        "text": truncated_text,
-        "stream": False,
-        "voice_setting": {
-            "voice_id": settings.minimax_voice_id,
-            "speed": 1,
-            "vol": 1,
-            "pitch": 0
-        },
-        "audio_setting": {
-            "sample_rate": 32000,
-            "bitrate": 128000,
-            "format": "mp3",
-            "channel": 1
-        }
+        "model": TTS_MODEL,
+        "text": text,
+        "stream": stream,
+        "voice_setting": {"voice_id": settings.minimax_voice_id, **VOICE_SETTING},
+        "audio_setting": AUDIO_SETTING,
     }
+    if stream:
+        # Sem o áudio completo repetido no último evento
+        payload["stream_options"] = {"exclude_aggregated_audio": True}
     
-    timeout = httpx.Timeout(settings.minimax_timeout_seconds)
-    
-    # Use synchronous client instead of async
-    with httpx.Client(timeout=timeout) as client:
-        logger.info("minimax_request_start", text_length=len(truncated_text))
-        
-        response = client.post(
-            api_url,
-            headers=headers,
-            json=payload
+    return api_url, headers, payload
+
+
+def _raise_for_base_resp(body: dict) -> None:
+    base_resp = body.get("base_resp")
+    if base_resp is not None and base_resp.get("status_code") != 0:
+        error_msg = base_resp.get("status_msg", "Unknown error")
+        logger.error("minimax_api_error", 
+            status_code=base_resp.get("status_code"), 
+            message=error_msg
         )
-        response.raise_for_status()
-        
-        # Parse JSON response
-        try:
-            json_response = response.json()
-        except Exception as e:
-            logger.error("minimax_json_parse_failed", error=str(e))
-            raise ValueError(f"Failed to parse Minimax response as JSON: {e}")
-        
-        # Check for API errors
-        if "base_resp" in json_response:
-            base_resp = json_response["base_resp"]
-            if base_resp.get("status_code") != 0:
-                error_msg = base_resp.get("status_msg", "Unknown error")
-                logger.error("minimax_api_error", 
-                    status_code=base_resp.get("status_code"), 
-                    message=error_msg
-                )
-                raise ValueError(f"Minimax API error: {error_msg}")
-        
-        # Extract hex audio from response
-        data = json_response.get("data", {})
-        hex_audio = data.get("audio")
-        
-        if not hex_audio:
-            logger.error("minimax_no_audio_in_response", 
-                response_keys=list(json_response.keys()),
-                data_keys=list(data.keys()) if data else []
-            )
-            raise ValueError("No audio data in Minimax response")
-        
-        # Convert hex string to bytes
-        try:
-            audio_bytes = bytes.fromhex(hex_audio)
-        except ValueError as e:
-            logger.error("minimax_hex_decode_failed", error=str(e), hex_preview=hex_audio[:50])
-            raise ValueError(f"Failed to decode hex audio: {e}")
-        
-        logger.info("minimax_request_success", audio_size=len(audio_bytes))
-        
-        return audio_bytes
+        raise MinimaxAPIError(base_resp.get("status_code"), error_msg)
+
+
+def _speech_pieces(text: str, max_chars: int) -> list[str]:
+    pieces = []
+    for sentence in SENTENCE_PATTERN.findall(text):
+        if len(sentence.rstrip()) <= max_chars:
+            pieces.append(sentence)
+            continue
+        for clause in CLAUSE_PATTERN.findall(sentence):
+            if len(clause.rstrip()) <= max_chars:
+                pieces.append(clause)
+                continue
+            for word in WORD_PATTERN.findall(clause):
+                # Uma "palavra" maior que o trecho inteiro só pode ser cortada
+                pieces += [word[i:i + max_chars] for i in range(0, len(word), max_chars)]
+    return pieces
 
 
 
@@ -132,6 +456,20 @@ def upload_audio_to_storage(
     audio_bytes: bytes, 
     user_id: str, 
     forecast_id: str
+) -> Optional[str]:
+    """
+    Upload do áudio (wrapper síncrono para scripts e testes).
+    
+    Ver upload_audio_to_storage_async.
+    """
+    return asyncio.run(upload_audio_to_storage_async(audio_bytes, user_id, forecast_id))
+
+
+async def upload_audio_to_storage_async(
+    audio_bytes: bytes, 
+    user_id: str, 
+    forecast_id: str,
+    storage_path: Optional[str] = None,
 ) -> Optional[str]:
     """
     Upload do áudio para Supabase Storage.
@@ -140,26 +478,31 @@ def upload_audio_to_storage(
         audio_bytes: Conteúdo do áudio em MP3
         user_id: ID do usuário
         forecast_id: ID do forecast
+        storage_path: Caminho fixo no bucket (sobrescrito se já existir, ex.: cache de áudio)
         
     Returns:
         URL pública do áudio ou None se falhar
     """
-    supabase = get_supabase_client()
+    supabase = await get_async_supabase_client()
     
     # Path no bucket: {user_id}/{forecast_id}.mp3
-    storage_path = f"{user_id}/{forecast_id}.mp3"
-    bucket_name = "forecasts-audio"
+    file_options = {"content-type": "audio/mpeg"}
+    if storage_path:
+        file_options["upsert"] = "true"
+    else:
+        storage_path = f"{user_id}/{forecast_id}.mp3"
+    bucket_name = AUDIO_BUCKET
     
     try:
         # Upload para o bucket
-        result = supabase.storage.from_(bucket_name).upload(
+        result = await supabase.storage.from_(bucket_name).upload(
             path=storage_path,
             file=audio_bytes,
-            file_options={"content-type": "audio/mpeg"}
+            file_options=file_options
         )
         
         # Gerar URL pública
-        public_url = supabase.storage.from_(bucket_name).get_public_url(storage_path)
+        public_url = await supabase.storage.from_(bucket_name).get_public_url(storage_path)
         
         logger.info(
             "audio_uploaded",
@@ -179,6 +522,84 @@ def upload_audio_to_storage(
         return None
 
 
+async def upload_audio_stream_async(
+    audio: AsyncIterable[bytes],
+    user_id: str,
+    forecast_id: str,
+    storage_path: Optional[str] = None,
+) -> Optional[str]:
+    """
+    Upload do áudio para Supabase Storage à medida que ele é gerado.
+    
+    O corpo vai em chunked transfer encoding direto para a API do Storage
+    (o cliente storage3 só envia corpos inteiros), então o upload termina
+    logo depois do último pedaço do áudio.
+    
+    Args:
+        audio: Pedaços do MP3, na ordem (ex.: SpeechStream)
+        user_id: ID do usuário
+        forecast_id: ID do forecast
+        storage_path: Caminho fixo no bucket (sobrescrito se já existir, ex.: cache de áudio)
+        
+    Returns:
+        URL pública do áudio ou None se o upload falhar
+        
+    Raises:
+        Exception: O erro da síntese, se audio falhar (ex.: CircuitOpenError)
+    """
+    settings = get_settings()
+    upsert = storage_path is not None
+    storage_path = storage_path or f"{user_id}/{forecast_id}.mp3"
+    synthesis_errors: list[Exception] = []
+    
+    async def body() -> AsyncIterator[bytes]:
+        try:
+            async for piece in audio:
+                yield piece
+        except Exception as e:
+            synthesis_errors.append(e)
+            raise
+    
+    try:
+        response = await get_http_client().post(
+            f"{settings.supabase_url}/storage/v1/object/{AUDIO_BUCKET}/{storage_path}",
+            content=body(),
+            headers={
+                "Authorization": f"Bearer {settings.supabase_service_role_key}",
+                "apikey": settings.supabase_service_role_key,
+                "Content-Type": "audio/mpeg",
+                "Cache-Control": "max-age=3600",
+                "x-upsert": "true" if upsert else "false",
+            },
+            timeout=httpx.Timeout(settings.minimax_timeout_seconds),
+        )
+        response.raise_for_status()
+        
+        supabase = await get_async_supabase_client()
+        public_url = await supabase.storage.from_(AUDIO_BUCKET).get_public_url(storage_path)
+        
+        logger.info(
+            "audio_uploaded",
+            user_id=user_id[:8],
+            forecast_id=forecast_id[:8],
+            streamed=True,
+        )
+        
+        return public_url
+        
+    except Exception as e:
+        # Falha na síntese (Minimax fora, circuito aberto) sobe para o job
+        # decidir (adiar, repetir); só falhas do upload viram None
+        if synthesis_errors:
+            raise synthesis_errors[0]
+        logger.error(
+            "audio_upload_failed",
+            user_id=user_id[:8],
+            error=str(e)
+        )
+        return None
+
+
 def estimate_audio_duration(text: str) -> int:
     """
     Estima duração do áudio baseado no tamanho do texto.
@@ -0,0 +1,159 @@
+"""
+MPEG audio Layer III frame parsing, enough to join TTS chunks.
+
+Each Minimax response is a standalone MP3: possibly an ID3v2 tag, a
+Xing/Info frame describing that file alone, then audio frames. join_mp3()
+(and Mp3FrameStream, for audio that is still arriving) keeps only the
+audio frames of every chunk, in order, so players see one continuous
+stream, and returns the exact duration from the frame headers.
+"""
+
+from dataclasses import dataclass
+from typing import Iterator, Optional
+
+# kbps by bitrate index, Layer III
+BITRATES = {
+    "mpeg1": (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    "mpeg2": (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+ID3V1_SIZE = 128
+
+
+@dataclass
+class Frame:
+    """One audio frame: where it is and how much audio it holds."""
+
+    offset: int
+    length: int
+    samples: int
+    sample_rate: int
+    side_info_end: int  # where a Xing/Info tag would start, relative to offset
+
+    @property
+    def seconds(self) -> float:
+        return self.samples / self.sample_rate
+
+
+def parse_header(header: bytes, offset: int = 0) -> Optional[Frame]:
+    """Frame described by a 4-byte header, or None if it is not a Layer III header."""
+    if len(header) < 4 or header[0] != 0xFF or header[1] & 0xE0 != 0xE0:
+        return None
+
+    version = (header[1] >> 3) & 0x3
+    layer = (header[1] >> 1) & 0x3
+    bitrate_index = header[2] >> 4
+    rate_index = (header[2] >> 2) & 0x3
+    if version == 1 or layer != 1 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+
+    mpeg1 = version == 3
+    bitrate = BITRATES["mpeg1" if mpeg1 else "mpeg2"][bitrate_index] * 1000
+    sample_rate = SAMPLE_RATES[version][rate_index]
+    padding = (header[2] >> 1) & 0x1
+    mono = header[3] >> 6 == 0x3
+    crc = 2 if not header[1] & 0x1 else 0
+
+    if mpeg1:
+        length, samples, side_info = 144 * bitrate // sample_rate + padding, 1152, 17 if mono else 32
+    else:
+        length, samples, side_info = 72 * bitrate // sample_rate + padding, 576, 9 if mono else 17
+
+    return Frame(offset, length, samples, sample_rate, 4 + crc + side_info)
+
+
+def iter_frames(data: bytes) -> Iterator[Frame]:
+    """Audio frames of an MP3 file, skipping ID3 tags and junk between frames."""
+    pos = _id3v2_size(data)
+
+    while pos + 4 <= len(data):
+        frame = parse_header(data[pos:pos + 4], pos)
+        if frame is not None and pos + frame.length <= len(data):
+            yield frame
+            pos += frame.length
+        elif data[pos:pos + 3] == b"TAG" and len(data) - pos == ID3V1_SIZE:
+            return
+        else:
+            pos += 1
+
+
+def is_info_frame(data: bytes, frame: Frame) -> bool:
+    """True for a Xing/Info/VBRI header frame (metadata, no audio)."""
+    start = frame.offset + frame.side_info_end
+    return data[start:start + 4] in (b"Xing", b"Info") or data[frame.offset + 36:frame.offset + 40] == b"VBRI"
+
+
+def mp3_duration(data: bytes) -> float:
+    """Seconds of audio in an MP3 file."""
+    return sum(frame.seconds for frame in iter_frames(data) if not is_info_frame(data, frame))
+
+
+def join_mp3(chunks: list[bytes]) -> tuple[bytes, float]:
+    """
+    Concatenate the audio frames of several MP3 files, in order.
+
+    Returns:
+        (joined MP3 bytes, duration in seconds)
+    """
+    parts: list[bytes] = []
+    seconds = 0.0
+
+    for data in chunks:
+        frames = Mp3FrameStream()
+        parts.append(frames.feed(data))
+        seconds += frames.seconds
+
+    return b"".join(parts), seconds
+
+
+class Mp3FrameStream:
+    """
+    join_mp3() for one MP3 file that arrives in pieces.
+
+    feed() returns the complete audio frames seen so far (tags and info
+    frames dropped); a frame split across pieces is held until its end
+    arrives, so memory stays at one piece plus one frame.
+    """
+
+    def __init__(self):
+        self.seconds = 0.0
+        self._buffer = b""
+        self._skip: Optional[int] = None  # bytes of leading ID3v2 tag left to drop
+
+    def feed(self, data: bytes) -> bytes:
+        buffer = self._buffer + data
+        pos = 0
+
+        if self._skip is None:
+            if len(buffer) < 10 and b"ID3".startswith(buffer[:3]):
+                self._buffer = buffer
+                return b""
+            self._skip = _id3v2_size(buffer)
+        skipped = min(self._skip, len(buffer))
+        self._skip -= skipped
+        pos = skipped
+
+        out = []
+        while pos + 4 <= len(buffer):
+            frame = parse_header(buffer[pos:pos + 4], pos)
+            if frame is None:
+                pos += 1
+                continue
+            if pos + frame.length > len(buffer):
+                break
+            if not is_info_frame(buffer, frame):
+                out.append(buffer[pos:pos + frame.length])
+                self.seconds += frame.seconds
+            pos += frame.length
+
+        self._buffer = buffer[pos:]
+        return b"".join(out)
+
+
+def _id3v2_size(data: bytes) -> int:
+    if data[:3] != b"ID3" or len(data) < 10:
+        return 0
+    # Synchsafe size (7 bits per byte), plus the header and optional footer
+    size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+    return 10 + size + (10 if data[5] & 0x10 else 0)
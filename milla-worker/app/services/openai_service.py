@@ -2,18 +2,33 @@
 OpenAI service for generating reading content.
 """
 
+import asyncio
 import json
 import structlog
-from openai import OpenAI
+from functools import lru_cache
+from openai import OpenAI, AsyncOpenAI
 from openai import APITimeoutError, RateLimitError, APIError
 from app.config import get_settings
+from app.services.http_transport import get_http_client
+from pydantic import ValidationError
 from app.models.reading import ReadingContent
+from app.services.content_repair import repair_content, response_tokens
+from app.services.hedging import hedged
+from app.services.streaming_completions import create_completion
+from app.services.structured_outputs import (
+    json_schema_format,
+    model_response_format,
+    object_schema,
+    record_completion,
+    strict_json_schema,
+)
 
 logger = structlog.get_logger()
 
 
+@lru_cache
 def get_openai_client() -> OpenAI:
-    """Get OpenAI client."""
+    """Get OpenAI client (cached so scripts keep one connection pool)."""
     settings = get_settings()
     return OpenAI(
         api_key=settings.openai_api_key,
@@ -21,12 +36,99 @@ def get_openai_client() -> OpenAI:
     )
 
 
+def get_async_openai_client() -> AsyncOpenAI:
+    """Get async OpenAI client on the shared pooled transport."""
+    settings = get_settings()
+    return AsyncOpenAI(
+        api_key=settings.openai_api_key,
+        timeout=settings.openai_timeout_seconds,
+        http_client=get_http_client(),
+    )
+
+
+SYSTEM_PROMPT = "Você é Milla, uma mentora espiritual. Responda APENAS em JSON válido."
+
+BUNDLE_INSTRUCTIONS = (
+    "Gere as leituras das seções abaixo numa única resposta: um objeto JSON com "
+    "uma chave por seção ({keys}), cujo valor é o objeto JSON pedido naquela seção."
+)
+
+
+def fill_reading_prompt(
+    prompt_template: str,
+    nome: str,
+    ponto_nome: str,
+    ponto_valor: int,
+    arcano: str,
+) -> str:
+    """Fill a reading prompt template."""
+    return prompt_template.format(
+        nome=nome,
+        ponto_nome=ponto_nome,
+        ponto_valor=ponto_valor,
+        arcano=arcano,
+    )
+
+
+def normalize_reading(data: dict) -> dict:
+    """Map the legacy 'carta' key to 'arcano'."""
+    if "carta" in data and "arcano" not in data:
+        data = {**data, "arcano": data["carta"]}
+        del data["carta"]
+    return data
+
+
+def parse_reading(data: dict) -> ReadingContent:
+    """Validate one reading object (accepts 'carta' as alias for 'arcano')."""
+    if not isinstance(data, dict):
+        raise ValueError("Reading is not a JSON object")
+    
+    return ReadingContent.model_validate(normalize_reading(data))
+
+
+async def parse_or_repair_reading(data: dict, full_tokens: int, client: AsyncOpenAI) -> ReadingContent:
+    """
+    parse_reading, rewriting fields with forbidden terms instead of failing.
+    
+    Raises:
+        ValueError: If the reading is invalid and cannot be repaired
+    """
+    try:
+        return parse_reading(data)
+    except ValidationError:
+        repaired = await repair_content(ReadingContent, normalize_reading(data), full_tokens, client)
+        if repaired is None:
+            raise
+        return repaired
+
+
 def generate_reading(
     prompt_template: str,
     nome: str,
     ponto_nome: str,
     ponto_valor: int,
     arcano: str,
+) -> ReadingContent:
+    """
+    Generate a reading using OpenAI (sync wrapper for scripts and tests).
+    
+    See generate_reading_async.
+    """
+    return asyncio.run(generate_reading_async(
+        prompt_template=prompt_template,
+        nome=nome,
+        ponto_nome=ponto_nome,
+        ponto_valor=ponto_valor,
+        arcano=arcano,
+    ))
+
+
+async def generate_reading_async(
+    prompt_template: str,
+    nome: str,
+    ponto_nome: str,
+    ponto_valor: int,
+    arcano: str,
 ) -> ReadingContent:
     """
     Generate a reading using OpenAI.
@@ -47,15 +149,10 @@ def generate_reading(
         RateLimitError: If rate limited
     """
     settings = get_settings()
-    client = get_openai_client()
+    client = get_async_openai_client()
     
     # Format prompt
-    prompt = prompt_template.format(
-        nome=nome,
-        ponto_nome=ponto_nome,
-        ponto_valor=ponto_valor,
-        arcano=arcano,
-    )
+    prompt = fill_reading_prompt(prompt_template, nome, ponto_nome, ponto_valor, arcano)
     
     # Note: We don't log full prompt to avoid exposing PII
     logger.info("generating_reading", section=ponto_nome, ponto_valor=ponto_valor)
@@ -65,29 +162,28 @@ def generate_reading(
     
     for attempt in range(max_retries):
         try:
-            response = client.chat.completions.create(
+            completion = await create_completion(
+                client,
+                ReadingContent,
                 model=settings.openai_model,
                 messages=[
-                    {"role": "system", "content": "Você é Milla, uma mentora espiritual. Responda APENAS em JSON válido."},
+                    {"role": "system", "content": SYSTEM_PROMPT},
                     {"role": "user", "content": prompt}
                 ],
-                response_format={"type": "json_object"},
+                response_format=model_response_format(ReadingContent, "reading"),
                 temperature=0.7,
             )
             
-            content = response.choices[0].message.content
+            if completion.aborted:
+                raise ValueError(f"Stream aborted early: {completion.aborted}")
+            
+            content = completion.content
             if not content:
                 raise ValueError("Empty response from OpenAI")
             
-            # Parse JSON
-            data = json.loads(content)
-            
-            # Handle 'carta' alias -> 'arcano'
-            if "carta" in data and "arcano" not in data:
-                data["arcano"] = data.pop("carta")
-            
-            # Validate with Pydantic
-            reading = ReadingContent.model_validate(data)
+            # Parse JSON and validate with Pydantic
+            reading = await parse_or_repair_reading(json.loads(content), response_tokens(completion), client)
+            record_completion("reading", valid=True)
             
             logger.info(
                 "reading_generated",
@@ -100,6 +196,7 @@ def generate_reading(
             
         except json.JSONDecodeError as e:
             last_error = e
+            record_completion("reading", valid=False)
             logger.warning(
                 "invalid_json_response",
                 attempt=attempt + 1,
@@ -108,6 +205,7 @@ def generate_reading(
             
         except ValueError as e:
             last_error = e
+            record_completion("reading", valid=False)
             logger.warning(
                 "validation_error",
                 attempt=attempt + 1,
@@ -116,3 +214,83 @@ def generate_reading(
     
     # All retries failed
     raise ValueError(f"Failed to generate valid reading after {max_retries} attempts: {last_error}")
+
+
+async def generate_reading_bundle_async(
+    nome: str,
+    sections: dict[str, dict],
+    max_rounds: int = 2,
+) -> tuple[dict[str, ReadingContent], dict[str, str]]:
+    """
+    Generate several reading sections with one chat completion.
+    
+    Each section is validated on its own; only the sections that fail are
+    asked for again in the next round.
+    
+    Args:
+        nome: Client's name
+        sections: section -> {prompt_template, ponto_nome, ponto_valor, arcano}
+        max_rounds: Completions to spend before giving up on a section
+    
+    Returns:
+        (valid readings by section, last error by failed section)
+    """
+    settings = get_settings()
+    client = get_async_openai_client()
+    
+    readings: dict[str, ReadingContent] = {}
+    errors: dict[str, str] = {}
+    pending = list(sections)
+    
+    for round_number in range(max_rounds):
+        parts = [BUNDLE_INSTRUCTIONS.format(keys=", ".join(pending))]
+        for section in pending:
+            data = sections[section]
+            filled = fill_reading_prompt(
+                data["prompt_template"], nome, data["ponto_nome"], data["ponto_valor"], data["arcano"]
+            )
+            parts.append(f"### {section}\n{filled}")
+        
+        logger.info("generating_reading_bundle", sections=len(pending), round=round_number + 1)
+        
+        try:
+            response = await hedged("reading_bundle", lambda: client.chat.completions.create(
+                model=settings.openai_model,
+                messages=[
+                    {"role": "system", "content": SYSTEM_PROMPT},
+                    {"role": "user", "content": "\n\n".join(parts)},
+                ],
+                response_format=json_schema_format(
+                    "reading_bundle",
+                    object_schema({section: strict_json_schema(ReadingContent) for section in pending}),
+                ),
+                temperature=0.7,
+            ))
+            payload = json.loads(response.choices[0].message.content or "")
+            if not isinstance(payload, dict):
+                raise ValueError("Bundle response is not a JSON object")
+        except (json.JSONDecodeError, ValueError) as e:
+            record_completion("reading_bundle", valid=False)
+            logger.warning("invalid_bundle_response", round=round_number + 1, error=str(e)[:200])
+            errors.update({section: str(e) for section in pending})
+            continue
+        
+        failed = []
+        section_tokens = response_tokens(response) // len(pending)
+        for section in pending:
+            try:
+                readings[section] = await parse_or_repair_reading(payload.get(section), section_tokens, client)
+                errors.pop(section, None)
+            except ValueError as e:
+                errors[section] = str(e)
+                failed.append(section)
+        
+        record_completion("reading_bundle", valid=not failed)
+        if failed:
+            logger.warning("bundle_sections_invalid", sections=failed, round=round_number + 1)
+        
+        pending = failed
+        if not pending:
+            break
+    
+    return readings, errors
@@ -0,0 +1,283 @@
+"""
+Streaming completions with early abort on output that is certain to fail.
+
+With streaming_validation_enabled, single reading and forecast completions
+are streamed and the JSON object is parsed as it arrives. Each string field
+is checked against its model's length limits (and forbidden terms, when
+content repair is off) while it is still being generated; the stream is
+closed as soon as the output can no longer validate, so the caller goes
+straight to its retry instead of paying for the rest of the completion.
+
+Saved time and tokens are estimated from the average full completion of
+the same model and reported by streaming_stats().
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Any, Optional
+
+import structlog
+from openai import AsyncOpenAI
+from pydantic import BaseModel
+
+from app.config import get_settings
+from app.models.forecast import ForecastContent
+from app.models.reading import ReadingContent
+from app.services.content_repair import REPAIRABLE_FIELDS
+from app.services.hedging import hedged
+from app.services.structured_outputs import record_early_abort
+
+logger = structlog.get_logger()
+
+# Kind of each single completion (latency class for hedging)
+COMPLETION_KINDS = {ReadingContent: "reading", ForecastContent: "forecast"}
+
+JSON_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+_stats = {"streams": 0, "aborts": 0, "tokens_saved": 0, "seconds_saved": 0.0}
+_abort_reasons: dict[str, int] = {}
+# Full (not aborted) streams per model: count, seconds, completion tokens
+_full_streams: dict[str, dict[str, float]] = {}
+
+
+@dataclass
+class Completion:
+    """Content of a (possibly aborted) completion; quacks like a response for usage."""
+
+    content: Optional[str]
+    usage: Optional[Any] = None
+    aborted: Optional[str] = None
+    seconds: float = 0.0
+
+
+class StreamingJsonValidator:
+    """Incremental checks of a flat JSON object of string fields."""
+
+    def __init__(self, model: type[BaseModel], check_forbidden_terms: bool):
+        properties = model.model_json_schema()["properties"]
+        self._limits = {name: (prop.get("minLength"), prop.get("maxLength")) for name, prop in properties.items()}
+        terms, checked = REPAIRABLE_FIELDS.get(model, ([], ()))
+        self._terms = {name: terms for name in checked} if check_forbidden_terms else {}
+        self.fields: dict[str, str] = {}
+        self._buffer = ""
+        self._pos = 0
+        self._state = "start"
+        self._key: list[str] = []
+        self._value: list[str] = []
+
+    def feed(self, text: str) -> Optional[str]:
+        """
+        Consume the next piece of the completion.
+
+        Returns:
+            Why the output is certain to fail ("<rule>: <detail>"), or None
+        """
+        self._buffer += text
+
+        while self._pos < len(self._buffer) and self._state not in ("done", "passive"):
+            char = self._buffer[self._pos]
+
+            if self._state == "value":
+                if char == "\\":
+                    if not self._read_escape():
+                        break  # rest of the escape is in the next piece
+                    continue
+                if char == '"':
+                    self._pos += 1
+                    self._state = "after_value"
+                    name = "".join(self._key)
+                    self.fields[name] = "".join(self._value)
+                    reason = self._check(name, self.fields[name], final=True)
+                    if reason:
+                        return reason
+                    continue
+                self._value.append(char)
+            else:
+                self._advance_structure(char)
+            self._pos += 1
+
+        if self._state == "value":
+            return self._check("".join(self._key), "".join(self._value), final=False)
+        return None
+
+    def _advance_structure(self, char: str) -> None:
+        state = self._state
+
+        if state == "key":
+            if char == '"':
+                self._state = "colon"
+            elif char == "\\":
+                self._state = "passive"
+            else:
+                self._key.append(char)
+        elif char.isspace():
+            return
+        elif state == "start":
+            self._state = "before_key" if char == "{" else "passive"
+        elif state == "before_key" and char == '"':
+            self._key = []
+            self._state = "key"
+        elif state == "before_key" and char == "}":
+            self._state = "done"
+        elif state == "colon" and char == ":":
+            self._state = "value_start"
+        elif state == "value_start" and char == '"':
+            self._value = []
+            self._state = "value"
+        elif state == "after_value" and char == ",":
+            self._state = "before_key"
+        elif state == "after_value" and char == "}":
+            self._state = "done"
+        else:
+            # Not a flat object of strings: leave it to the final validation
+            self._state = "passive"
+
+    def _read_escape(self) -> bool:
+        if self._pos + 1 >= len(self._buffer):
+            return False
+        code = self._buffer[self._pos + 1]
+        if code == "u":
+            if self._pos + 6 > len(self._buffer):
+                return False
+            unit = int(self._buffer[self._pos + 2:self._pos + 6], 16)
+            if 0xD800 <= unit < 0xDC00:
+                # High surrogate: one character (e.g. an emoji) with the low one after it,
+                # as pydantic counts it
+                follows = self._buffer[self._pos + 6:self._pos + 12]
+                if len(follows) < 6 and "\\u".startswith(follows[:2]):
+                    return False
+                low = _low_surrogate(follows)
+                if low is not None:
+                    self._value.append(chr(0x10000 + ((unit - 0xD800) << 10) + (low - 0xDC00)))
+                    self._pos += 12
+                    return True
+            self._value.append(chr(unit))
+            self._pos += 6
+        else:
+            self._value.append(JSON_ESCAPES.get(code, code))
+            self._pos += 2
+        return True
+
+    def _check(self, name: str, value: str, final: bool) -> Optional[str]:
+        min_length, max_length = self._limits.get(name, (None, None))
+        if max_length is not None and len(value) > max_length:
+            return f"max_length: {name} > {max_length}"
+        if final and min_length is not None and len(value) < min_length:
+            return f"min_length: {name} < {min_length}"
+        lowered = value.lower()
+        for term in self._terms.get(name, ()):
+            if term in lowered:
+                return f"forbidden_term: {name} '{term}'"
+        return None
+
+
+def _low_surrogate(escape: str) -> Optional[int]:
+    if not escape.startswith("\\u"):
+        return None
+    try:
+        unit = int(escape[2:6], 16)
+    except ValueError:
+        return None
+    return unit if 0xDC00 <= unit < 0xE000 else None
+
+
+async def create_completion(client: AsyncOpenAI, content_model: type[BaseModel], **kwargs) -> Completion:
+    """
+    Chat completion whose content should validate as content_model.
+
+    Streams with early abort when streaming_validation_enabled, otherwise
+    makes a regular request; either way the request is hedged when
+    hedging_enabled.
+    """
+    kind = COMPLETION_KINDS.get(content_model, content_model.__name__)
+    return await hedged(kind, lambda: _complete(client, content_model, kwargs))
+
+
+async def _complete(client: AsyncOpenAI, content_model: type[BaseModel], kwargs: dict) -> Completion:
+    settings = get_settings()
+    start = time.monotonic()
+
+    if not settings.streaming_validation_enabled:
+        response = await client.chat.completions.create(**kwargs)
+        return Completion(
+            response.choices[0].message.content,
+            getattr(response, "usage", None),
+            seconds=time.monotonic() - start,
+        )
+
+    validator = StreamingJsonValidator(content_model, check_forbidden_terms=not settings.content_repair_enabled)
+    stream = await client.chat.completions.create(
+        **kwargs, stream=True, stream_options={"include_usage": True}
+    )
+    _stats["streams"] += 1
+    parts: list[str] = []
+    usage = None
+
+    try:
+        async for chunk in stream:
+            if chunk.usage is not None:
+                usage = chunk.usage
+            if not chunk.choices or not chunk.choices[0].delta.content:
+                continue
+
+            piece = chunk.choices[0].delta.content
+            parts.append(piece)
+            reason = validator.feed(piece)
+            if reason:
+                seconds = time.monotonic() - start
+                _record_abort(content_model.__name__, reason, "".join(parts), seconds)
+                return Completion("".join(parts), aborted=reason, seconds=seconds)
+    finally:
+        await stream.close()
+
+    seconds = time.monotonic() - start
+    _record_full(content_model.__name__, seconds, usage)
+    return Completion("".join(parts), usage, seconds=seconds)
+
+
+def streaming_stats() -> dict:
+    """Streams, early aborts and their estimated savings (metrics endpoint)."""
+    return {
+        "enabled": get_settings().streaming_validation_enabled,
+        **_stats,
+        "seconds_saved": round(_stats["seconds_saved"], 3),
+        "abort_reasons": dict(_abort_reasons),
+    }
+
+
+def reset_streaming_stats() -> None:
+    """Zero the counters (tests and benchmarks)."""
+    _stats.update(streams=0, aborts=0, tokens_saved=0, seconds_saved=0.0)
+    _abort_reasons.clear()
+    _full_streams.clear()
+
+
+def _record_full(model_name: str, seconds: float, usage) -> None:
+    full = _full_streams.setdefault(model_name, {"count": 0, "seconds": 0.0, "completion_tokens": 0})
+    full["count"] += 1
+    full["seconds"] += seconds
+    full["completion_tokens"] += getattr(usage, "completion_tokens", 0) or 0
+
+
+def _record_abort(model_name: str, reason: str, partial: str, seconds: float) -> None:
+    # Savings vs the average full completion of this model (none until one finished)
+    full = _full_streams.get(model_name)
+    tokens_saved, seconds_saved = 0, 0.0
+    if full and full["count"]:
+        tokens_saved = max(0, int(full["completion_tokens"] / full["count"]) - len(partial) // 4)
+        seconds_saved = max(0.0, full["seconds"] / full["count"] - seconds)
+
+    _stats["aborts"] += 1
+    _stats["tokens_saved"] += tokens_saved
+    _stats["seconds_saved"] += seconds_saved
+    rule = reason.split(":", 1)[0]
+    _abort_reasons[rule] = _abort_reasons.get(rule, 0) + 1
+    record_early_abort(tokens_saved)
+
+    logger.info(
+        "completion_aborted_early",
+        model=model_name,
+        reason=reason,
+        seconds=round(seconds, 3),
+        tokens_saved=tokens_saved,
+    )
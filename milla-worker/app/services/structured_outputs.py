@@ -0,0 +1,193 @@
+"""
+Strict structured outputs - JSON schemas derived from the content models.
+
+Completions are requested with response_format json_schema (strict), built
+from ReadingContent / ForecastContent, so the model can only answer with the
+expected keys and types. Length limits go into each field's description and,
+with structured_output_length_keywords, also as minLength/maxLength for
+models that accept them in strict mode. Rules no schema can express (the
+forbidden-term validators) are still checked by pydantic.
+
+Every validated completion is counted per kind; completions_stats() exposes
+how many had to be asked again (the retry rate) and how many were repaired
+instead (content_repair). Inside track_job_completions() the same counts
+are also kept for the running job, for its result.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+from typing import Iterator, Optional
+
+from pydantic import BaseModel
+
+from app.config import get_settings
+
+JSON_OBJECT_FORMAT = {"type": "json_object"}
+
+
+@dataclass
+class JobCompletionStats:
+    """Completions spent by one job (stored in its result)."""
+
+    completions: int = 0
+    retries: int = 0
+    local_repairs: int = 0
+    model_repairs: int = 0
+    repair_tokens: int = 0
+    early_aborts: int = 0
+    tokens_saved: int = 0
+
+    def as_result(self) -> dict:
+        return asdict(self)
+
+
+_completions: dict[str, dict[str, int]] = {}
+_repairs = {"local": 0, "model": 0, "repair_tokens": 0, "tokens_saved": 0}
+_job_stats: ContextVar[Optional[JobCompletionStats]] = ContextVar("job_completion_stats", default=None)
+
+
+def strict_json_schema(model: type[BaseModel]) -> dict:
+    """Strict-mode schema of a flat model of string fields (all required, no extras)."""
+    length_keywords = get_settings().structured_output_length_keywords
+    properties = {}
+
+    for name, field_schema in model.model_json_schema()["properties"].items():
+        properties[name] = _strict_field(field_schema, length_keywords)
+
+    return object_schema(properties)
+
+
+def object_schema(properties: dict[str, dict]) -> dict:
+    """Strict object schema requiring every property."""
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False,
+    }
+
+
+def array_schema(items: dict, size: int) -> dict:
+    """Array of exactly size items."""
+    return {"type": "array", "items": items, "minItems": size, "maxItems": size}
+
+
+def json_schema_format(name: str, schema: dict) -> dict:
+    """response_format for a schema (plain JSON mode if structured outputs are off)."""
+    if not get_settings().structured_outputs_enabled:
+        return JSON_OBJECT_FORMAT
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": name, "strict": True, "schema": schema},
+    }
+
+
+def model_response_format(model: type[BaseModel], name: Optional[str] = None) -> dict:
+    """response_format that makes the completion match model."""
+    return json_schema_format(name or model.__name__, strict_json_schema(model))
+
+
+@contextmanager
+def track_job_completions() -> Iterator[JobCompletionStats]:
+    """Collect the completions and repairs of the job running in this context."""
+    stats = JobCompletionStats()
+    token = _job_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _job_stats.reset(token)
+
+
+def job_completion_stats() -> JobCompletionStats:
+    """Stats of the running job (a detached, empty one outside a job)."""
+    return _job_stats.get() or JobCompletionStats()
+
+
+def record_completion(kind: str, valid: bool) -> None:
+    """Count a completion; invalid ones are asked again (or fail the job)."""
+    stats = _completions.setdefault(kind, {"completions": 0, "invalid": 0})
+    stats["completions"] += 1
+    if not valid:
+        stats["invalid"] += 1
+
+    job = _job_stats.get()
+    if job is not None:
+        job.completions += 1
+        job.retries += not valid
+
+
+def record_repair(local: bool, repair_tokens: int, tokens_saved: int) -> None:
+    """Count a response fixed by content_repair instead of regenerated."""
+    _repairs["local" if local else "model"] += 1
+    _repairs["repair_tokens"] += repair_tokens
+    _repairs["tokens_saved"] += tokens_saved
+
+    job = _job_stats.get()
+    if job is not None:
+        if local:
+            job.local_repairs += 1
+        else:
+            job.model_repairs += 1
+        job.repair_tokens += repair_tokens
+        job.tokens_saved += tokens_saved
+
+
+def record_early_abort(tokens_saved: int) -> None:
+    """Count a streamed completion closed early for the running job."""
+    job = _job_stats.get()
+    if job is not None:
+        job.early_aborts += 1
+        job.tokens_saved += tokens_saved
+
+
+def completions_stats() -> dict:
+    """Completions, invalid completions and retry rate per kind (metrics endpoint)."""
+    by_kind = {
+        kind: {
+            **stats,
+            "retry_rate": round(stats["invalid"] / stats["completions"], 3) if stats["completions"] else 0.0,
+        }
+        for kind, stats in _completions.items()
+    }
+    return {
+        "structured_outputs": get_settings().structured_outputs_enabled,
+        "by_kind": by_kind,
+        "repairs": dict(_repairs),
+    }
+
+
+def reset_completions_stats() -> None:
+    """Zero the counters (tests and benchmarks)."""
+    _completions.clear()
+    for key in _repairs:
+        _repairs[key] = 0
+
+
+def _strict_field(field_schema: dict, length_keywords: bool) -> dict:
+    strict = {"type": field_schema["type"]}
+
+    min_length = field_schema.get("minLength")
+    max_length = field_schema.get("maxLength")
+    if min_length and max_length:
+        limit = f"{min_length} a {max_length} caracteres"
+    elif max_length:
+        limit = f"até {max_length} caracteres"
+    elif min_length:
+        limit = f"mínimo {min_length} caracteres"
+    else:
+        limit = ""
+
+    description = field_schema.get("description", "")
+    if limit:
+        description = f"{description} ({limit})" if description else limit.capitalize()
+    if description:
+        strict["description"] = description
+
+    if length_keywords:
+        if min_length is not None:
+            strict["minLength"] = min_length
+        if max_length is not None:
+            strict["maxLength"] = max_length
+
+    return strict
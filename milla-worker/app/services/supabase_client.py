@@ -1,13 +1,24 @@
-from supabase import create_client, Client
+import asyncio
+import weakref
+
+from supabase import create_client, acreate_client, Client, AsyncClient
+from supabase.lib.client_options import AsyncClientOptions
 from functools import lru_cache
 from app.config import get_settings
+from app.services.http_transport import get_http_client
+
+
+# Async clients hold connections bound to the loop that created them
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncClient]" = (
+    weakref.WeakKeyDictionary()
+)
 
 
 @lru_cache
 def get_supabase_client() -> Client:
     """
     Get Supabase client with service_role key.
-    
+
     SECURITY: This client has full database access and bypasses RLS.
     Only use for worker operations, never expose to frontend.
     """
@@ -16,3 +27,26 @@ def get_supabase_client() -> Client:
         settings.supabase_url,
         settings.supabase_service_role_key
     )
+
+
+async def get_async_supabase_client() -> AsyncClient:
+    """
+    Get async Supabase client with service_role key for the running loop.
+
+    PostgREST and Storage requests go through the shared pooled transport.
+
+    SECURITY: Same access as get_supabase_client - worker use only.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+
+    if client is None:
+        settings = get_settings()
+        client = await acreate_client(
+            settings.supabase_url,
+            settings.supabase_service_role_key,
+            options=AsyncClientOptions(httpx_client=get_http_client()),
+        )
+        _async_clients[loop] = client
+
+    return client
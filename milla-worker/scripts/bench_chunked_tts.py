@@ -0,0 +1,83 @@
+"""
+Benchmark: forecast audio latency vs text length, sequential vs parallel chunks.
+
+Runs synthesize_long_speech_async against a local Minimax stand-in whose
+latency grows with the characters it voices. "single" is the old behaviour
+(one call, text truncated at 2,000 characters) for reference.
+
+Run from the milla-worker directory:
+    python scripts/bench_chunked_tts.py --lengths 1000 2500 5000 10000 --concurrency 4
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "bench")
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+os.environ.setdefault("MINIMAX_API_KEY", "bench")
+os.environ.setdefault("MINIMAX_VOICE_ID", "bench")
+os.environ.setdefault("MINIMAX_GROUP_ID", "bench")
+
+import structlog  # noqa: E402
+
+from app.config import get_settings  # noqa: E402
+from app.services.http_transport import close_http_client  # noqa: E402
+from app.services.minimax_service import synthesize_long_speech_async, synthesize_speech_async  # noqa: E402
+from app.services.mp3 import mp3_duration  # noqa: E402
+from tests.fake_servers import fake_minimax_app, serve  # noqa: E402
+
+structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(logging.WARNING))
+
+SENTENCE = "Esta fase convida a observar os próprios ritmos e a escolher com calma. "
+
+
+async def timed(call) -> tuple[float, float]:
+    start = time.perf_counter()
+    result = await call
+    wall = time.perf_counter() - start
+    await close_http_client()
+    audio_seconds = result[1] if isinstance(result, tuple) else mp3_duration(result)
+    return wall, audio_seconds
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--lengths", type=int, nargs="+", default=[1000, 2500, 5000, 10000])
+    parser.add_argument("--concurrency", type=int, default=4, help="MINIMAX_CONCURRENCY for the parallel run")
+    parser.add_argument("--chunk-chars", type=int, default=1000, help="MINIMAX_CHUNK_MAX_CHARS")
+    parser.add_argument("--base-latency", type=float, default=0.3)
+    parser.add_argument("--ms-per-char", type=float, default=1.0)
+    args = parser.parse_args()
+
+    os.environ["MINIMAX_CHUNK_MAX_CHARS"] = str(args.chunk_chars)
+    app = fake_minimax_app(args.base_latency, args.ms_per_char / 1000)
+
+    with serve(app) as base_url:
+        os.environ["MINIMAX_BASE_URL"] = base_url
+        print(f"{'chars':>6} {'mode':>10} {'wall s':>7} {'audio s':>8}")
+
+        for length in args.lengths:
+            text = (SENTENCE * (length // len(SENTENCE) + 1))[:length]
+            runs = [("single", None), ("sequential", 1), ("parallel", args.concurrency)]
+
+            for mode, concurrency in runs:
+                if concurrency is None:
+                    get_settings.cache_clear()
+                    wall, audio_seconds = asyncio.run(timed(synthesize_speech_async(text)))
+                else:
+                    os.environ["MINIMAX_CONCURRENCY"] = str(concurrency)
+                    get_settings.cache_clear()
+                    wall, audio_seconds = asyncio.run(timed(synthesize_long_speech_async(text)))
+                print(f"{length:>6} {mode:>10} {wall:>7.2f} {audio_seconds:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
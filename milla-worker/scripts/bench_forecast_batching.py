@@ -0,0 +1,98 @@
+"""
+Benchmark: tokens and wall time per forecast at different batch sizes.
+
+Runs N forecast generations through generate_forecast_from_base_async (the
+real template fill + batcher) against a local OpenAI stand-in whose latency
+grows with the tokens it returns.
+
+Run from the milla-worker directory:
+    python scripts/bench_forecast_batching.py --forecasts 48 --sizes 1 2 4 6
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "bench")
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+import structlog  # noqa: E402
+
+from app.config import get_settings  # noqa: E402
+from app.models.forecast import ForecastCalculationBase, ForecastType  # noqa: E402
+from app.services.forecast_generator import (  # noqa: E402
+    forecast_batching_stats,
+    generate_forecast_from_base_async,
+    reset_forecast_usage,
+)
+from app.services.http_transport import close_http_client  # noqa: E402
+from tests.fake_servers import fake_openai_app, serve  # noqa: E402
+
+structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(logging.WARNING))
+
+TEMPLATE = (
+    "Você é a Milla. Escreva a previsão semanal de {nome} para {period_start} a "
+    "{period_end}. Ano Pessoal {ano_pessoal}, número da semana {numero_semana}. "
+    "Responda em JSON com titulo, resumo e conteudo. "
+) + "Contexto da metodologia Milla. " * 40
+
+
+async def run(forecasts: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int) -> None:
+        async with semaphore:
+            await generate_forecast_from_base_async(
+                prompt_template=TEMPLATE,
+                nome=f"Cliente {i}",
+                calc_base=ForecastCalculationBase(ano_pessoal=i % 9 + 1, numero_semana=i % 22 + 1),
+                forecast_type=ForecastType.WEEKLY,
+                period_start=date(2026, 3, 1),
+                period_end=date(2026, 3, 7),
+            )
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(forecasts)))
+    wall = time.perf_counter() - start
+    await close_http_client()
+    return wall
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--forecasts", type=int, default=48)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 2, 4, 6])
+    parser.add_argument("--concurrency", type=int, default=25, help="Jobs in flight (JOB_TYPE_CONCURRENCY)")
+    parser.add_argument("--base-latency", type=float, default=0.4)
+    parser.add_argument("--ms-per-token", type=float, default=1.0)
+    args = parser.parse_args()
+
+    app = fake_openai_app(args.base_latency, args.ms_per_token / 1000)
+    with serve(app) as base_url:
+        os.environ["OPENAI_BASE_URL"] = f"{base_url}/v1"
+        print(f"{'batch':>5} {'requests':>8} {'prompt tok/fc':>13} {'compl tok/fc':>12} {'wall s':>7} {'ms/fc':>7}")
+
+        for size in args.sizes:
+            os.environ["FORECAST_BATCH_SIZE"] = str(size)
+            get_settings.cache_clear()
+            reset_forecast_usage()
+
+            wall = asyncio.run(run(args.forecasts, args.concurrency))
+            stats = forecast_batching_stats()
+            n = stats["forecasts"] or 1
+            print(
+                f"{size:>5} {stats['requests']:>8} {stats['prompt_tokens'] / n:>13.0f} "
+                f"{stats['completion_tokens'] / n:>12.0f} {wall:>7.2f} {wall * 1000 / args.forecasts:>7.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Benchmark: forecast latency percentiles with and without hedged requests.
+
+Runs N forecasts through generate_forecast_from_prompt_async against a
+local OpenAI stand-in where a small share of requests is very slow (the
+same seeded tail in both runs), and reports latency percentiles next to
+the extra requests hedging cost.
+
+Run from the milla-worker directory:
+    python scripts/bench_hedging.py --forecasts 300 --tail-probability 0.03 --tail-latency 5
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "bench")
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+import structlog  # noqa: E402
+
+from app.config import get_settings  # noqa: E402
+from app.services.forecast_generator import generate_forecast_from_prompt_async  # noqa: E402
+from app.services.hedging import hedging_stats, reset_hedging_stats  # noqa: E402
+from app.services.http_transport import close_http_client  # noqa: E402
+from tests.fake_servers import fake_openai_app, serve  # noqa: E402
+
+structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(logging.WARNING))
+
+
+def percentile(values: list[float], p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+
+async def run(forecasts: int, concurrency: int) -> list[float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one() -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            await generate_forecast_from_prompt_async("Previsão semanal em JSON.")
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(one() for _ in range(forecasts)))
+    await close_http_client()
+    return latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--forecasts", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--base-latency", type=float, default=0.2)
+    parser.add_argument("--ms-per-token", type=float, default=0.5)
+    parser.add_argument("--tail-probability", type=float, default=0.03)
+    parser.add_argument("--tail-latency", type=float, default=5.0)
+    parser.add_argument("--percentile", type=float, default=95, help="HEDGE_PERCENTILE")
+    parser.add_argument("--max-rate", type=float, default=0.1, help="HEDGE_MAX_RATE")
+    args = parser.parse_args()
+
+    os.environ["HEDGE_PERCENTILE"] = str(args.percentile)
+    os.environ["HEDGE_MAX_RATE"] = str(args.max_rate)
+    os.environ["HEDGE_INITIAL_DELAY_SECONDS"] = str(args.tail_latency / 2)
+
+    print(f"{'mode':>7} {'p50 s':>6} {'p95 s':>6} {'p99 s':>6} {'max s':>6} {'requests':>8} {'hedged':>6} {'wins':>5}")
+
+    for hedging in (False, True):
+        app = fake_openai_app(
+            args.base_latency,
+            args.ms_per_token / 1000,
+            tail_probability=args.tail_probability,
+            tail_latency=args.tail_latency,
+        )
+        with serve(app) as base_url:
+            os.environ["OPENAI_BASE_URL"] = f"{base_url}/v1"
+            os.environ["HEDGING_ENABLED"] = str(hedging).lower()
+            get_settings.cache_clear()
+            reset_hedging_stats()
+
+            latencies = asyncio.run(run(args.forecasts, args.concurrency))
+
+        stats = hedging_stats()["by_kind"].get("forecast", {})
+        print(
+            f"{'hedged' if hedging else 'plain':>7} {percentile(latencies, 50):>6.2f} "
+            f"{percentile(latencies, 95):>6.2f} {percentile(latencies, 99):>6.2f} {max(latencies):>6.2f} "
+            f"{app.state.chat_requests:>8} {stats.get('hedged', 0):>6} {stats.get('hedge_wins', 0):>5}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Benchmark: per-job HTTP latency with a fresh client per call vs the shared pool.
+
+Each simulated job makes the same calls a reading job does (claim context is
+already in hand): LLM completion, reading upsert, job update. A local HTTPS
+server with a self-signed certificate stands in for the upstreams so the
+TLS handshake cost is included.
+
+Run from the milla-worker directory:
+    python scripts/bench_http_transport.py --jobs 200 --concurrency 20
+    python scripts/bench_http_transport.py --url https://api.openai.com/v1/models
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import nullcontext
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "bench")
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+from app.services.http_transport import (  # noqa: E402
+    close_http_client,
+    get_http_client,
+    reset_transport_stats,
+    transport_stats,
+)
+from tests.fake_servers import json_app, serve  # noqa: E402
+
+CALLS_PER_JOB = 3
+
+
+def self_signed_cert(directory: str) -> tuple[str, str]:
+    cert, key = f"{directory}/cert.pem", f"{directory}/key.pem"
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-subj", "/CN=127.0.0.1", "-addext", "subjectAltName=IP:127.0.0.1",
+         "-keyout", key, "-out", cert],
+        check=True, capture_output=True,
+    )
+    return cert, key
+
+
+async def run(url: str, jobs: int, concurrency: int, shared: bool, verify) -> list[float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def call() -> None:
+        if shared:
+            await get_http_client().get(url)
+            return
+        async with httpx.AsyncClient(verify=verify) as client:
+            await client.get(url)
+
+    async def job() -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            for _ in range(CALLS_PER_JOB):
+                await call()
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    await asyncio.gather(*(job() for _ in range(jobs)))
+    return latencies
+
+
+def report(label: str, latencies: list[float], wall: float) -> None:
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(
+        f"{label:8s} jobs={len(latencies)} wall={wall:.2f}s "
+        f"p50={statistics.median(latencies):.1f}ms p95={p95:.1f}ms"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--jobs", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--url", help="Real endpoint instead of the local HTTPS server")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.url:
+            server, verify = nullcontext(args.url), True
+        else:
+            cert, key = self_signed_cert(tmp)
+            server, verify = serve(json_app({"ok": True}), cert, key), cert
+
+        with server as base_url:
+            url = args.url or f"{base_url}/v1/chat/completions"
+
+            start = time.perf_counter()
+            fresh = await run(url, args.jobs, args.concurrency, False, verify)
+            report("fresh", fresh, time.perf_counter() - start)
+
+            # The shared pool verifies with the system store; trust the test cert
+            if not args.url:
+                os.environ["SSL_CERT_FILE"] = cert
+            reset_transport_stats()
+            start = time.perf_counter()
+            pooled = await run(url, args.jobs, args.concurrency, True, verify)
+            report("shared", pooled, time.perf_counter() - start)
+
+            stats = transport_stats()
+            print(
+                f"shared pool: requests={stats['requests']} "
+                f"connections_opened={stats['connections_opened']} "
+                f"reuse_rate={stats['reuse_rate']}"
+            )
+            await close_http_client()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,78 @@
+"""
+Benchmark: wall time and tokens with and without streaming early abort.
+
+Runs N forecasts through generate_forecast_from_prompt_async against a
+local OpenAI stand-in that makes every k-th response invalid (titulo too
+long, so it fails in the first deltas). Without streaming each invalid
+response is paid in full before the retry; with streaming it is closed as
+soon as the titulo passes its limit.
+
+Run from the milla-worker directory:
+    python scripts/bench_streaming_abort.py --forecasts 40 --overlong-every 4
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "bench")
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+import structlog  # noqa: E402
+
+from app.config import get_settings  # noqa: E402
+from app.services.forecast_generator import generate_forecast_from_prompt_async  # noqa: E402
+from app.services.http_transport import close_http_client  # noqa: E402
+from app.services.streaming_completions import reset_streaming_stats, streaming_stats  # noqa: E402
+from tests.fake_servers import fake_openai_app, serve  # noqa: E402
+
+structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(logging.ERROR))
+
+
+async def run(forecasts: int) -> float:
+    # Sequential, so the invalid responses land on the same requests in both modes
+    start = time.perf_counter()
+    for _ in range(forecasts):
+        await generate_forecast_from_prompt_async("Previsão semanal em JSON.")
+    wall = time.perf_counter() - start
+    await close_http_client()
+    return wall
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--forecasts", type=int, default=40)
+    parser.add_argument("--overlong-every", type=int, default=4, help="Every k-th response is invalid")
+    parser.add_argument("--base-latency", type=float, default=0.2)
+    parser.add_argument("--ms-per-token", type=float, default=2.0)
+    args = parser.parse_args()
+
+    print(f"{'mode':>9} {'wall s':>7} {'ms/fc':>7} {'tokens sent':>11} {'aborts':>6} {'est. tok saved':>14} {'est. s saved':>12}")
+
+    for streaming in (False, True):
+        app = fake_openai_app(args.base_latency, args.ms_per_token / 1000, overlong_every=args.overlong_every)
+        with serve(app) as base_url:
+            os.environ["OPENAI_BASE_URL"] = f"{base_url}/v1"
+            os.environ["STREAMING_VALIDATION_ENABLED"] = str(streaming).lower()
+            get_settings.cache_clear()
+            reset_streaming_stats()
+
+            wall = asyncio.run(run(args.forecasts))
+
+        stats = streaming_stats()
+        sent = app.state.sent_tokens
+        print(
+            f"{'stream' if streaming else 'full':>9} {wall:>7.2f} {wall * 1000 / args.forecasts:>7.1f} "
+            f"{sent:>11} {stats['aborts']:>6} {stats['tokens_saved']:>14} {stats['seconds_saved']:>12.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
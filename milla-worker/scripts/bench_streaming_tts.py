@@ -0,0 +1,100 @@
+"""
+Benchmark: forecast audio upload, buffered vs streamed.
+
+Buffered synthesizes every chunk with synthesize_long_speech_async and
+uploads the joined MP3; streamed sends SpeechStream to Storage as the audio
+arrives (upload_audio_stream_async). Both run against local Minimax and
+Storage stand-ins in child processes, so tracemalloc sees only the worker's
+allocations.
+
+Run from the milla-worker directory:
+    python scripts/bench_streaming_tts.py --chars 10000 --concurrency 2
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "bench")
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+os.environ.setdefault("MINIMAX_API_KEY", "bench")
+os.environ.setdefault("MINIMAX_VOICE_ID", "bench")
+os.environ.setdefault("MINIMAX_GROUP_ID", "bench")
+
+import structlog  # noqa: E402
+
+from app.config import get_settings  # noqa: E402
+from app.services.http_transport import close_http_client  # noqa: E402
+from app.services.minimax_service import (  # noqa: E402
+    SpeechStream,
+    synthesize_long_speech_async,
+    upload_audio_stream_async,
+    upload_audio_to_storage_async,
+)
+from tests.fake_servers import fake_minimax_app, fake_storage_app, serve_process  # noqa: E402
+
+structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(logging.WARNING))
+
+SENTENCE = "Trecho da previsão, com calma e atenção ao ritmo. "
+
+
+async def buffered(text: str) -> None:
+    audio, _ = await synthesize_long_speech_async(text)
+    assert await upload_audio_to_storage_async(audio, "bench", "buffered")
+
+
+async def streamed(text: str) -> None:
+    speech = SpeechStream(text)
+    try:
+        assert await upload_audio_stream_async(speech, "bench", "streamed")
+    finally:
+        await speech.aclose()
+
+
+async def measure(run, text: str) -> tuple[float, float]:
+    tracemalloc.start()
+    start = time.perf_counter()
+    await run(text)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    await close_http_client()
+    return peak / 1e6, elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--chars", type=int, nargs="+", default=[2500, 5000, 10000])
+    parser.add_argument("--concurrency", type=int, default=2, help="MINIMAX_CONCURRENCY")
+    parser.add_argument("--chunk-chars", type=int, default=1000, help="MINIMAX_CHUNK_MAX_CHARS")
+    parser.add_argument("--ms-per-char", type=float, default=0.2, help="Minimax synthesis time")
+    parser.add_argument("--upload-mbps", type=float, default=10.0, help="Storage bandwidth, MB/s")
+    args = parser.parse_args()
+
+    os.environ["MINIMAX_CONCURRENCY"] = str(args.concurrency)
+    os.environ["MINIMAX_CHUNK_MAX_CHARS"] = str(args.chunk_chars)
+
+    with serve_process(fake_minimax_app, seconds_per_char=args.ms_per_char / 1000) as minimax_url, \
+            serve_process(fake_storage_app, bytes_per_second=args.upload_mbps * 1e6) as storage_url:
+        os.environ["MINIMAX_BASE_URL"] = minimax_url
+        os.environ["SUPABASE_URL"] = storage_url
+        get_settings.cache_clear()
+        print(f"{'chars':>6} {'mode':>9} {'peak MB':>8} {'upload done s':>14}")
+
+        for length in args.chars:
+            text = (SENTENCE * (length // len(SENTENCE) + 1))[:length]
+            for mode, run in (("buffered", buffered), ("streamed", streamed)):
+                peak, elapsed = asyncio.run(measure(run, text))
+                print(f"{length:>6} {mode:>9} {peak:>8.1f} {elapsed:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
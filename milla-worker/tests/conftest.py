@@ -0,0 +1,37 @@
+"""
+Shared test configuration.
+"""
+import pytest
+
+from app.config import get_settings
+from app.services.cache import (
+    get_audio_cache,
+    get_generation_cache,
+    get_profile_cache,
+    get_prompt_cache,
+)
+from app.services.minimax_service import get_minimax_breaker
+from app.services.openai_service import get_openai_client
+
+
+@pytest.fixture(autouse=True)
+def worker_env(monkeypatch):
+    """Provide the required settings so get_settings() works in tests."""
+    monkeypatch.setenv("SUPABASE_URL", "http://localhost:54321")
+    monkeypatch.setenv("SUPABASE_SERVICE_ROLE_KEY", "test-service-role-key")
+    monkeypatch.setenv("OPENAI_API_KEY", "test-openai-key")
+    get_settings.cache_clear()
+    get_prompt_cache.cache_clear()
+    get_profile_cache.cache_clear()
+    get_generation_cache.cache_clear()
+    get_audio_cache.cache_clear()
+    get_openai_client.cache_clear()
+    get_minimax_breaker.cache_clear()
+    yield
+    get_settings.cache_clear()
+    get_prompt_cache.cache_clear()
+    get_profile_cache.cache_clear()
+    get_generation_cache.cache_clear()
+    get_audio_cache.cache_clear()
+    get_openai_client.cache_clear()
+    get_minimax_breaker.cache_clear()
@@ -0,0 +1,452 @@
+"""
+Local stand-in servers for integration tests and benchmarks.
+
+serve(app) runs an ASGI app on 127.0.0.1 in a background thread and
+yields its base URL, e.g.:
+
+    with serve(app) as base_url:
+        httpx.get(f"{base_url}/ping")
+"""
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+import uvicorn
+
+
+@contextmanager
+def serve(
+    app,
+    ssl_certfile: Optional[str] = None,
+    ssl_keyfile: Optional[str] = None,
+) -> Iterator[str]:
+    """Serve app until the block exits; yields http(s)://127.0.0.1:<port>."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+
+    config = uvicorn.Config(
+        app,
+        log_level="warning",
+        lifespan="off",
+        ssl_certfile=ssl_certfile,
+        ssl_keyfile=ssl_keyfile,
+        timeout_keep_alive=60,
+    )
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True)
+    thread.start()
+
+    deadline = time.monotonic() + 10
+    while not server.started:
+        if time.monotonic() > deadline:
+            raise RuntimeError("fake server did not start")
+        time.sleep(0.01)
+
+    scheme = "https" if ssl_certfile else "http"
+    try:
+        yield f"{scheme}://127.0.0.1:{port}"
+    finally:
+        server.should_exit = True
+        thread.join(timeout=5)
+        sock.close()
+
+
+def json_app(body: dict, status: int = 200):
+    """ASGI app answering every request with the same JSON body."""
+    import json
+
+    payload = json.dumps(body).encode()
+
+    async def app(scope, receive, send):
+        if scope["type"] != "http":
+            return
+        # Drain the request body so keep-alive stays usable
+        more = True
+        while more:
+            message = await receive()
+            more = message.get("more_body", False)
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json")],
+        })
+        await send({"type": "http.response.body", "body": payload})
+
+    return app
+
+
+def fake_openai_app(
+    base_latency: float = 0.0,
+    seconds_per_token: float = 0.0,
+    invalid_items: frozenset[int] = frozenset(),
+    invalid_custom_ids: frozenset[str] = frozenset(),
+    batch_polls: int = 1,
+    overlong_every: int = 0,
+    tail_probability: float = 0.0,
+    tail_latency: float = 0.0,
+):
+    """
+    Minimal OpenAI chat-completions + Batch API stand-in for forecast prompts.
+
+    A prompt with "### Item N" sections gets {"previsoes": [...]} with one
+    forecast per item (1-based indexes in invalid_items come back too
+    short); any other prompt gets a single forecast object, whose titulo is
+    too long on every overlong_every-th request. Latency is base_latency +
+    seconds_per_token * completion tokens, and usage is estimated at 4
+    characters per token. With "stream": true the content is sent as SSE
+    deltas of a few tokens each, paced at seconds_per_token. Completion
+    tokens actually sent (streamed or not) add up in app.state.sent_tokens.
+    A tail_probability share of chat requests (seeded, so runs repeat)
+    waits tail_latency seconds more; app.state.chat_requests counts them all.
+
+    Uploaded batch files are answered line by line the same way once the
+    batch has been retrieved batch_polls times; requests whose custom_id is
+    in invalid_custom_ids get a too-short forecast. Uploads, batches and
+    cancellations are kept on app.state for assertions.
+    """
+    import asyncio
+    import json
+    import random
+    import re
+    from email.parser import BytesParser
+    from email.policy import default as default_policy
+
+    from fastapi import FastAPI, HTTPException, Request, Response
+    from fastapi.responses import StreamingResponse
+
+    app = FastAPI()
+    app.state.files = {}
+    app.state.batches = {}
+    app.state.requests = 0
+    app.state.sent_tokens = 0
+    app.state.chat_requests = 0
+    tail = random.Random(0)
+
+    def forecast(i: int, invalid: bool = False, overlong: bool = False) -> dict:
+        titulo = f"Semana {i}" * (20 if overlong else 1)
+        conteudo = f"Previsão {i}: esta fase convida a observar os próprios ritmos. " * 20
+        if invalid or i in invalid_items:
+            conteudo = "curto"
+        return {"titulo": titulo, "resumo": "Um período de ajustes.", "conteudo": conteudo}
+
+    def completion(body: dict, invalid: bool = False) -> dict:
+        prompt = body["messages"][-1]["content"]
+        items = len(re.findall(r"^### Item \d+", prompt, flags=re.MULTILINE))
+
+        if items:
+            content = json.dumps({"previsoes": [forecast(i + 1) for i in range(items)]})
+        else:
+            app.state.requests += 1
+            overlong = bool(overlong_every) and app.state.requests % overlong_every == 0
+            content = json.dumps(forecast(1, invalid, overlong))
+
+        completion_tokens = len(content) // 4
+        return {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": 0,
+            "model": body.get("model", "gpt-4o"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": len(prompt) // 4,
+                "completion_tokens": completion_tokens,
+                "total_tokens": len(prompt) // 4 + completion_tokens,
+            },
+        }
+
+    async def stream_events(result: dict, latency: float):
+        def event(delta: dict, usage: Optional[dict] = None) -> bytes:
+            chunk = {
+                "id": result["id"],
+                "object": "chat.completion.chunk",
+                "created": 0,
+                "model": result["model"],
+                "choices": [{"index": 0, "delta": delta, "finish_reason": None}] if delta else [],
+                "usage": usage,
+            }
+            return f"data: {json.dumps(chunk)}\n\n".encode()
+
+        await asyncio.sleep(latency)
+        content = result["choices"][0]["message"]["content"]
+        step = 4 * 4  # four tokens per delta
+        for start in range(0, len(content), step):
+            yield event({"content": content[start:start + step]})
+            app.state.sent_tokens += 4
+            await asyncio.sleep(seconds_per_token * 4)
+        yield event({}, result["usage"])
+        yield b"data: [DONE]\n\n"
+
+    @app.post("/v1/chat/completions")
+    async def completions(request: Request):
+        body = await request.json()
+        result = completion(body)
+        app.state.chat_requests += 1
+        latency = base_latency + (tail_latency if tail.random() < tail_probability else 0.0)
+        if body.get("stream"):
+            return StreamingResponse(stream_events(result, latency), media_type="text/event-stream")
+        await asyncio.sleep(latency + seconds_per_token * result["usage"]["completion_tokens"])
+        app.state.sent_tokens += result["usage"]["completion_tokens"]
+        return result
+
+    @app.post("/v1/files")
+    async def upload_file(request: Request):
+        # Multipart parsed by hand (no python-multipart dependency)
+        raw = b"Content-Type: " + request.headers["content-type"].encode() + b"\r\n\r\n"
+        message = BytesParser(policy=default_policy).parsebytes(raw + await request.body())
+        fields = {
+            part.get_param("name", header="content-disposition"): part
+            for part in message.iter_parts()
+        }
+        file_id = f"file-{len(app.state.files) + 1}"
+        app.state.files[file_id] = fields["file"].get_payload(decode=True)
+        return {
+            "id": file_id,
+            "object": "file",
+            "bytes": len(app.state.files[file_id]),
+            "created_at": 0,
+            "filename": fields["file"].get_filename(),
+            "purpose": fields["purpose"].get_content(),
+            "status": "processed",
+        }
+
+    @app.get("/v1/files/{file_id}/content")
+    async def file_content(file_id: str):
+        if file_id not in app.state.files:
+            raise HTTPException(404)
+        return Response(app.state.files[file_id], media_type="application/octet-stream")
+
+    def run_batch(batch: dict) -> None:
+        lines = []
+        for line in app.state.files[batch["input_file_id"]].decode().splitlines():
+            request = json.loads(line)
+            body = completion(request["body"], request["custom_id"] in invalid_custom_ids)
+            lines.append(json.dumps({
+                "id": f"batch_req_{len(lines) + 1}",
+                "custom_id": request["custom_id"],
+                "response": {"status_code": 200, "request_id": "req-fake", "body": body},
+                "error": None,
+            }))
+        output_id = f"file-{len(app.state.files) + 1}"
+        app.state.files[output_id] = "\n".join(lines).encode()
+        batch.update(
+            status="completed",
+            output_file_id=output_id,
+            request_counts={"total": len(lines), "completed": len(lines), "failed": 0},
+        )
+
+    @app.post("/v1/batches")
+    async def create_batch(request: Request):
+        body = await request.json()
+        batch_id = f"batch-{len(app.state.batches) + 1}"
+        app.state.batches[batch_id] = {
+            "id": batch_id,
+            "object": "batch",
+            "endpoint": body["endpoint"],
+            "input_file_id": body["input_file_id"],
+            "completion_window": body["completion_window"],
+            "metadata": body.get("metadata"),
+            "status": "in_progress",
+            "created_at": 0,
+            "output_file_id": None,
+            "error_file_id": None,
+            "request_counts": {"total": 0, "completed": 0, "failed": 0},
+            "polls": 0,
+        }
+        return app.state.batches[batch_id]
+
+    @app.get("/v1/batches/{batch_id}")
+    async def retrieve_batch(batch_id: str):
+        batch = app.state.batches[batch_id]
+        batch["polls"] += 1
+        if batch["status"] == "in_progress" and batch["polls"] >= batch_polls:
+            run_batch(batch)
+        return batch
+
+    @app.post("/v1/batches/{batch_id}/cancel")
+    async def cancel_batch(batch_id: str):
+        batch = app.state.batches[batch_id]
+        batch["status"] = "cancelled"
+        return batch
+
+    return app
+
+
+# MPEG-1 Layer III, 128 kbps, 32 kHz, mono: 576-byte frames of 1152 samples
+MP3_FRAME_HEADER = b"\xff\xfb\x98\xc4"
+MP3_FRAME_SIZE = 576
+MP3_FRAME_SECONDS = 1152 / 32000
+
+
+def fake_mp3(seconds: float) -> bytes:
+    """Standalone MP3 like a TTS response: ID3v2 tag, Info frame, silent audio frames."""
+    id3 = b"ID3\x04\x00\x00\x00\x00\x00\x10" + b"\x00" * 16
+    info = MP3_FRAME_HEADER + b"\x00" * 17 + b"Info"
+    info += b"\x00" * (MP3_FRAME_SIZE - len(info))
+    frame = MP3_FRAME_HEADER + b"\x00" * (MP3_FRAME_SIZE - 4)
+    return id3 + info + frame * max(1, round(seconds / MP3_FRAME_SECONDS))
+
+
+def fake_minimax_app(
+    base_latency: float = 0.0,
+    seconds_per_char: float = 0.0,
+    chars_per_audio_second: float = 15.0,
+    stream_piece_bytes: int = 16 * 1024,
+):
+    """
+    Minimal Minimax T2A v2 stand-in.
+
+    Answers with hex MP3 audio of len(text) / chars_per_audio_second seconds
+    after base_latency + seconds_per_char * len(text). With "stream": true
+    the audio goes out as SSE events of stream_piece_bytes, the synthesis
+    time spread between them, and a final status 2 event that repeats the
+    whole audio unless stream_options.exclude_aggregated_audio is set.
+    Texts received are kept in app.state.texts, in arrival order; while
+    app.state.fail_status is set every request gets that HTTP status (only
+    the next app.state.fail_count requests, if that is set). The most
+    requests ever in flight at once is kept in app.state.max_in_flight.
+    """
+    import asyncio
+    import json
+
+    from fastapi import FastAPI, Request
+    from fastapi.responses import JSONResponse, StreamingResponse
+
+    app = FastAPI()
+    app.state.texts = []
+    app.state.fail_status = None
+    app.state.fail_count = None
+    app.state.in_flight = 0
+    app.state.max_in_flight = 0
+
+    def started() -> None:
+        app.state.in_flight += 1
+        app.state.max_in_flight = max(app.state.max_in_flight, app.state.in_flight)
+
+    def extra_info(text: str) -> dict:
+        return {"audio_length": int(len(text) / chars_per_audio_second * 1000), "audio_format": "mp3"}
+
+    async def events(text: str, audio: bytes, aggregated: bool):
+        try:
+            await asyncio.sleep(base_latency)
+            pieces = range(0, len(audio), stream_piece_bytes)
+            for start in pieces:
+                await asyncio.sleep(seconds_per_char * len(text) / len(pieces))
+                event = {"data": {"audio": audio[start:start + stream_piece_bytes].hex(), "status": 1}}
+                yield f"data: {json.dumps(event)}\n\n".encode()
+            final = {
+                "data": {"audio": audio.hex() if aggregated else "", "status": 2},
+                "extra_info": extra_info(text),
+                "base_resp": {"status_code": 0, "status_msg": "success"},
+            }
+            yield f"data: {json.dumps(final)}\n\n".encode()
+        finally:
+            app.state.in_flight -= 1
+
+    @app.post("/v1/t2a_v2")
+    async def t2a(request: Request):
+        body = await request.json()
+        text = body["text"]
+        app.state.texts.append(text)
+        if app.state.fail_status and app.state.fail_count != 0:
+            if app.state.fail_count:
+                app.state.fail_count -= 1
+            return JSONResponse({"error": "unavailable"}, status_code=app.state.fail_status)
+        audio = fake_mp3(len(text) / chars_per_audio_second)
+
+        started()
+        if body.get("stream"):
+            aggregated = not (body.get("stream_options") or {}).get("exclude_aggregated_audio")
+            return StreamingResponse(events(text, audio, aggregated), media_type="text/event-stream")
+
+        try:
+            await asyncio.sleep(base_latency + seconds_per_char * len(text))
+        finally:
+            app.state.in_flight -= 1
+        return {
+            "data": {"audio": audio.hex(), "status": 2},
+            "extra_info": extra_info(text),
+            "base_resp": {"status_code": 0, "status_msg": "success"},
+        }
+
+    return app
+
+
+def fake_storage_app(bytes_per_second: float = 0.0):
+    """
+    Supabase Storage upload stand-in, optionally bandwidth-limited.
+
+    Accepts POST /storage/v1/object/{bucket}/{path}, raw or multipart, and
+    keeps each body in app.state.uploads by "bucket/path"; bytes received so
+    far, finished uploads or not, add up in app.state.received.
+    """
+    import asyncio
+
+    from fastapi import FastAPI, Request
+
+    app = FastAPI()
+    app.state.uploads = {}
+    app.state.received = 0
+
+    @app.post("/storage/v1/object/{bucket}/{path:path}")
+    async def upload(bucket: str, path: str, request: Request):
+        parts = []
+        async for piece in request.stream():
+            parts.append(piece)
+            app.state.received += len(piece)
+            if bytes_per_second:
+                await asyncio.sleep(len(piece) / bytes_per_second)
+        app.state.uploads[f"{bucket}/{path}"] = b"".join(parts)
+        return {"Key": f"{bucket}/{path}", "Id": "fake"}
+
+    return app
+
+
+@contextmanager
+def serve_process(factory, **kwargs) -> Iterator[str]:
+    """
+    serve(factory(**kwargs)) in a child process; yields its base URL.
+
+    Keeps the server's allocations out of the test process, e.g. when
+    measuring memory with tracemalloc. App state is not visible here.
+    """
+    import multiprocessing
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+
+    process = multiprocessing.get_context("fork").Process(
+        target=_run_app, args=(factory, kwargs, sock), daemon=True
+    )
+    process.start()
+
+    deadline = time.monotonic() + 10
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            break
+        except OSError:
+            if time.monotonic() > deadline:
+                raise RuntimeError("fake server process did not start")
+            time.sleep(0.02)
+
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        process.terminate()
+        process.join(timeout=5)
+        sock.close()
+
+
+def _run_app(factory, kwargs: dict, sock) -> None:
+    config = uvicorn.Config(factory(**kwargs), log_level="warning", lifespan="off")
+    uvicorn.Server(config).run(sockets=[sock])
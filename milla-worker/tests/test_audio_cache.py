@@ -0,0 +1,154 @@
+"""
+Tests for the content-addressed forecast audio cache.
+"""
+import asyncio
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.config import get_settings
+from app.services.audio_cache import audio_cache_key, audio_cache_path, get_or_synthesize_audio
+from app.services.cache import get_audio_cache
+
+
+class FakeTable:
+    """In-memory audio_cache table behind _fetch_entry/_store_entry/_extend_entry."""
+
+    def __init__(self):
+        self.rows: dict[str, dict] = {}
+
+    async def fetch(self, audio_key):
+        row = self.rows.get(audio_key)
+        return dict(row) if row else None
+
+    async def store(self, audio_key, entry, size_bytes):
+        self.rows[audio_key] = {**entry, "size_bytes": size_bytes}
+
+    async def extend(self, audio_key, entry, expires_at):
+        if expires_at and entry["expires_at"] and expires_at.isoformat() > entry["expires_at"]:
+            entry["expires_at"] = expires_at.isoformat()
+            self.rows[audio_key]["expires_at"] = entry["expires_at"]
+
+
+@pytest.fixture
+def audio_env():
+    table = FakeTable()
+    synthesize = AsyncMock(side_effect=_uploaded)
+    supabase = MagicMock()
+    supabase.storage.from_.return_value.get_public_url = AsyncMock(
+        side_effect=lambda path: f"https://storage/{path}"
+    )
+
+    with patch.multiple(
+        "app.services.audio_cache",
+        _fetch_entry=AsyncMock(side_effect=table.fetch),
+        _store_entry=AsyncMock(side_effect=table.store),
+        _extend_entry=AsyncMock(side_effect=table.extend),
+        _synthesize_and_upload=synthesize,
+        get_async_supabase_client=AsyncMock(return_value=supabase),
+    ):
+        yield table, synthesize
+
+
+async def _uploaded(text, user_id, path):
+    await asyncio.sleep(0.01)
+    return f"https://storage/{path or 'user/forecast.mp3'}", 42.5, 1000
+
+
+class TestAudioCacheKey:
+    """Tests for audio_cache_key."""
+
+    def test_same_inputs_same_key(self):
+        assert audio_cache_key("Texto da previsão.") == audio_cache_key("Texto da previsão.")
+
+    def test_text_changes_key(self):
+        assert audio_cache_key("Texto A") != audio_cache_key("Texto B")
+
+    def test_voice_changes_key(self, monkeypatch):
+        before = audio_cache_key("Texto")
+        monkeypatch.setenv("MINIMAX_VOICE_ID", "other-voice")
+        get_settings.cache_clear()
+
+        assert audio_cache_key("Texto") != before
+
+    def test_path_under_cache_prefix(self):
+        assert audio_cache_path("abc") == "cache/abc.mp3"
+
+
+class TestGetOrSynthesizeAudio:
+    """Tests for get_or_synthesize_audio."""
+
+    async def test_miss_then_hit(self, audio_env):
+        table, synthesize = audio_env
+
+        first = await get_or_synthesize_audio("user-1", "Texto", datetime(2026, 1, 1))
+        second = await get_or_synthesize_audio("user-2", "Texto", datetime(2026, 1, 1))
+
+        path = audio_cache_path(audio_cache_key("Texto"))
+        assert first == (f"https://storage/{path}", 42.5, "miss")
+        assert second == (f"https://storage/{path}", 42.5, "hit")
+        assert synthesize.await_count == 1
+        assert table.rows[audio_cache_key("Texto")]["size_bytes"] == 1000
+
+    async def test_hit_from_table_after_process_restart(self, audio_env):
+        # A retried job on another worker finds the row written by the first attempt
+        table, synthesize = audio_env
+        table.rows[audio_cache_key("Texto")] = {
+            "storage_path": "cache/x.mp3",
+            "duration_seconds": 10.0,
+            "expires_at": None,
+        }
+
+        assert await get_or_synthesize_audio("user-1", "Texto") == ("https://storage/cache/x.mp3", 10.0, "hit")
+        synthesize.assert_not_awaited()
+
+    async def test_concurrent_callers_share_synthesis(self, audio_env):
+        _, synthesize = audio_env
+
+        results = await asyncio.gather(*(get_or_synthesize_audio("user", "Texto") for _ in range(5)))
+
+        assert synthesize.await_count == 1
+        assert {url for url, _, _ in results} == {results[0][0]}
+
+    async def test_hit_extends_expiry(self, audio_env):
+        table, _ = audio_env
+        await get_or_synthesize_audio("user", "Texto", datetime(2026, 1, 1))
+        # Another worker: nothing in this process's cache
+        get_audio_cache().invalidate()
+
+        await get_or_synthesize_audio("user", "Texto", datetime(2026, 2, 1))
+
+        assert table.rows[audio_cache_key("Texto")]["expires_at"] == datetime(2026, 2, 1).isoformat()
+
+    async def test_in_process_hit_extends_expiry(self, audio_env):
+        table, synthesize = audio_env
+        await get_or_synthesize_audio("user-1", "Texto", datetime(2026, 1, 1))
+
+        _, _, status = await get_or_synthesize_audio("user-2", "Texto", datetime(2026, 3, 1))
+        await get_or_synthesize_audio("user-3", "Texto", datetime(2026, 2, 1))
+
+        assert status == "hit"
+        assert synthesize.await_count == 1
+        assert table.rows[audio_cache_key("Texto")]["expires_at"] == datetime(2026, 3, 1).isoformat()
+        assert get_audio_cache().get(audio_cache_key("Texto"))["expires_at"] == datetime(2026, 3, 1).isoformat()
+
+    async def test_failed_upload_not_cached(self, audio_env):
+        table, synthesize = audio_env
+        synthesize.side_effect = None
+        synthesize.return_value = (None, 42.5, 1000)
+
+        assert await get_or_synthesize_audio("user", "Texto") == (None, None, "miss")
+        assert table.rows == {}
+
+    async def test_disabled_bypasses_cache(self, audio_env, monkeypatch):
+        table, synthesize = audio_env
+        monkeypatch.setenv("AUDIO_CACHE_ENABLED", "false")
+        get_settings.cache_clear()
+
+        url, _, status = await get_or_synthesize_audio("user", "Texto")
+
+        assert status == "bypass"
+        assert url == "https://storage/user/forecast.mp3"
+        synthesize.assert_awaited_once_with("Texto", "user", None)
+        assert table.rows == {}
@@ -0,0 +1,176 @@
+"""
+Tests for the hot-path TTL cache.
+"""
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.services.cache import TTLCache, cache_stats, get_prompt_cache, invalidate_caches
+from app.services.job_processor import get_active_prompt, get_profile
+
+
+class TestTTLCache:
+    """Tests for TTLCache."""
+
+    def test_hit_and_miss_counters(self):
+        cache = TTLCache("t", ttl_seconds=60, max_size=10)
+        assert cache.get("a") is None
+        cache.set("a", 1)
+        assert cache.get("a") == 1
+
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["hit_rate"] == 0.5
+
+    def test_entries_expire(self):
+        cache = TTLCache("t", ttl_seconds=60, max_size=10)
+        with patch("app.services.cache.time.monotonic", return_value=1000.0):
+            cache.set("a", 1)
+        with patch("app.services.cache.time.monotonic", return_value=1061.0):
+            assert cache.get("a") is None
+        assert cache.stats()["size"] == 0
+
+    def test_evicts_least_recently_used(self):
+        cache = TTLCache("t", ttl_seconds=60, max_size=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+        assert cache.stats()["evictions"] == 1
+
+    def test_zero_ttl_disables(self):
+        cache = TTLCache("t", ttl_seconds=0, max_size=10)
+        cache.set("a", 1)
+        assert cache.get("a") is None
+
+    def test_invalidate_with_predicate(self):
+        cache = TTLCache("t", ttl_seconds=60, max_size=10)
+        cache.set(("destino", True), 1)
+        cache.set(("personalidade", True), 2)
+
+        assert cache.invalidate(lambda key: key[0] == "destino") == 1
+        assert cache.get(("destino", True)) is None
+        assert cache.get(("personalidade", True)) == 2
+        assert cache.invalidate() == 1
+
+    async def test_concurrent_loads_share_one_call(self):
+        cache = TTLCache("t", ttl_seconds=60, max_size=10)
+        calls = 0
+
+        async def loader():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return {"id": 1}
+
+        results = await asyncio.gather(*(cache.get_or_load("k", loader) for _ in range(5)))
+
+        assert calls == 1
+        assert all(r == {"id": 1} for r in results)
+        assert cache.stats()["coalesced"] == 4
+
+    async def test_none_and_errors_are_not_cached(self):
+        cache = TTLCache("t", ttl_seconds=60, max_size=10)
+        assert await cache.get_or_load("k", AsyncMock(return_value=None)) is None
+        with pytest.raises(RuntimeError):
+            await cache.get_or_load("k", AsyncMock(side_effect=RuntimeError("db down")))
+        assert cache.stats()["size"] == 0
+
+    async def test_cancelled_load_does_not_strand_waiters(self):
+        cache = TTLCache("t", ttl_seconds=60, max_size=10)
+        started = asyncio.Event()
+        calls = 0
+
+        async def loader():
+            nonlocal calls
+            calls += 1
+            started.set()
+            await asyncio.sleep(0.05)
+            return {"id": calls}
+
+        first = asyncio.create_task(cache.get_or_load("k", loader))
+        await started.wait()
+        waiter = asyncio.create_task(cache.get_or_load("k", loader))
+        await asyncio.sleep(0)
+        first.cancel()
+
+        # The waiter takes over the load instead of hanging
+        assert await asyncio.wait_for(waiter, timeout=1) == {"id": 2}
+        assert first.cancelled()
+        assert cache.get("k") == {"id": 2}
+
+
+class TestCachedLookups:
+    """Prompt/profile lookups hit the database once per TTL."""
+
+    async def test_active_prompt_cached_by_section(self):
+        prompt = {"section": "destino", "version": "1.0.0", "template": "x"}
+        with patch(
+            "app.services.job_processor._fetch_active_prompt",
+            new_callable=AsyncMock,
+            return_value=prompt,
+        ) as fetch:
+            assert await get_active_prompt("destino") == prompt
+            assert await get_active_prompt("destino") == prompt
+            assert fetch.await_count == 1
+
+            invalidate_caches(section="destino")
+            await get_active_prompt("destino")
+            assert fetch.await_count == 2
+
+        assert cache_stats()["prompts"]["hits"] == 1
+
+    async def test_profile_cached_and_invalidated_per_user(self):
+        with patch(
+            "app.services.job_processor._fetch_profile",
+            new_callable=AsyncMock,
+            return_value={"full_name": "Fabio"},
+        ) as fetch:
+            await get_profile("user-1")
+            await get_profile("user-1")
+            assert fetch.await_count == 1
+
+            removed = invalidate_caches(user_id="user-1")
+            assert removed == {"prompts": 0, "profiles": 1}
+            await get_profile("user-1")
+            assert fetch.await_count == 2
+
+    async def test_forecast_prompt_shares_prompt_cache(self):
+        from app.services.forecast_generator import get_forecast_prompt
+
+        get_prompt_cache().set(("forecast_weekly", True), {"version": "2.0.0"})
+        assert await get_forecast_prompt("weekly") == {"version": "2.0.0"}
+
+
+class TestInvalidateEndpoint:
+    """Tests for POST /cache/invalidate."""
+
+    @pytest.fixture
+    def client(self):
+        from fastapi.testclient import TestClient
+
+        from app.main import app
+
+        # No context manager: the lifespan (scheduler, job loop) stays off
+        return TestClient(app)
+
+    def test_disabled_without_token(self, client):
+        assert client.post("/cache/invalidate").status_code == 404
+
+    def test_requires_admin_token(self, client, monkeypatch):
+        monkeypatch.setenv("CACHE_INVALIDATE_TOKEN", "s3cret")
+        get_prompt_cache().set(("destino", True), {"version": "1"})
+
+        assert client.post("/cache/invalidate").status_code == 401
+        assert client.post("/cache/invalidate", headers={"X-Admin-Token": "wrong"}).status_code == 401
+        assert get_prompt_cache().get(("destino", True)) is not None
+
+        response = client.post("/cache/invalidate", headers={"X-Admin-Token": "s3cret"})
+        assert response.status_code == 200
+        assert get_prompt_cache().get(("destino", True)) is None
@@ -0,0 +1,138 @@
+"""
+Tests for the circuit breaker.
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.services.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+
+class Transient(Exception):
+    pass
+
+
+def breaker(threshold=2, recovery=0.05) -> CircuitBreaker:
+    return CircuitBreaker("test", threshold, recovery, is_failure=lambda exc: isinstance(exc, Transient))
+
+
+def fail(cb: CircuitBreaker, exc: Exception = None) -> None:
+    with pytest.raises(type(exc or Transient())):
+        with cb.guard():
+            raise exc or Transient()
+
+
+def succeed(cb: CircuitBreaker) -> None:
+    with cb.guard():
+        pass
+
+
+class TestCircuitBreaker:
+    """Tests for CircuitBreaker."""
+
+    def test_opens_after_consecutive_failures(self):
+        cb = breaker()
+        fail(cb)
+        assert cb.state == CLOSED
+        fail(cb)
+
+        assert cb.state == OPEN
+        with pytest.raises(CircuitOpenError):
+            succeed(cb)
+        assert cb.stats()["rejected"] == 1
+
+    def test_success_resets_failure_count(self):
+        cb = breaker()
+        fail(cb)
+        succeed(cb)
+        fail(cb)
+
+        assert cb.state == CLOSED
+
+    def test_permanent_errors_do_not_count(self):
+        cb = breaker()
+        for _ in range(3):
+            fail(cb, ValueError("bad request"))
+
+        assert cb.state == CLOSED
+        assert cb.stats()["failures"] == 0
+
+    def test_probe_success_closes(self):
+        cb = breaker()
+        fail(cb)
+        fail(cb)
+        time.sleep(0.06)
+
+        assert cb.state == HALF_OPEN
+        succeed(cb)
+        assert cb.state == CLOSED
+
+    def test_probe_failure_reopens(self):
+        cb = breaker()
+        fail(cb)
+        fail(cb)
+        time.sleep(0.06)
+
+        fail(cb)
+        assert cb.state == OPEN
+        assert cb.stats()["opened"] == 2
+
+    async def test_single_probe_while_half_open(self):
+        cb = breaker()
+        fail(cb)
+        fail(cb)
+        time.sleep(0.06)
+        release = asyncio.Event()
+
+        async def probe():
+            with cb.guard():
+                await release.wait()
+
+        task = asyncio.create_task(probe())
+        await asyncio.sleep(0)
+        with pytest.raises(CircuitOpenError):
+            succeed(cb)
+
+        release.set()
+        await task
+        assert cb.state == CLOSED
+
+    async def test_cancelled_probe_lets_another_through(self):
+        cb = breaker()
+        fail(cb)
+        fail(cb)
+        time.sleep(0.06)
+
+        async def probe():
+            with cb.guard():
+                await asyncio.sleep(10)
+
+        task = asyncio.create_task(probe())
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        succeed(cb)
+        assert cb.state == CLOSED
+
+    def test_shared_across_threads(self):
+        cb = breaker(threshold=10)
+        threads = [threading.Thread(target=fail, args=(cb,)) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert cb.state == OPEN
+        assert cb.stats()["failures"] == 10
+
+    def test_disabled(self):
+        cb = breaker(threshold=0)
+        for _ in range(5):
+            fail(cb)
+
+        succeed(cb)
+        assert cb.state == CLOSED
@@ -0,0 +1,150 @@
+"""
+Tests for targeted repair of forbidden terms.
+"""
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.models.forecast import ForecastContent
+from app.models.reading import ReadingContent
+from app.services.content_repair import find_forbidden_terms, repair_content, rewrite_locally
+from app.services.openai_service import generate_reading_async
+from app.services.structured_outputs import reset_completions_stats, track_job_completions
+
+
+@pytest.fixture(autouse=True)
+def clean_stats():
+    reset_completions_stats()
+    yield
+    reset_completions_stats()
+
+
+def valid_reading(**overrides):
+    return {
+        "arcano": "O Mago",
+        "titulo": "O Início",
+        "interpretacao": "Este arcano sugere potencial e iniciativa para novos caminhos. " * 4,
+        "sombra": "A insegurança pode atrasar decisões importantes para o seu crescimento.",
+        "conselho": "Escolha um pequeno passo concreto hoje e observe o que ele desperta.",
+        **overrides,
+    }
+
+
+def completion(payload, prompt_tokens=300, completion_tokens=700):
+    message = MagicMock(content=json.dumps(payload))
+    usage = MagicMock(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+    return MagicMock(choices=[MagicMock(message=message)], usage=usage)
+
+
+@pytest.fixture
+def client():
+    client = MagicMock()
+    client.chat.completions.create = AsyncMock()
+    return client
+
+
+class TestLocalRewrite:
+    """Tests for find_forbidden_terms and rewrite_locally."""
+
+    def test_finds_terms_per_field(self):
+        data = valid_reading(sombra="Você sempre adia o que importa e isso pesa no seu caminho diário.")
+        assert find_forbidden_terms(ReadingContent, data) == {"sombra": ["sempre"]}
+
+    def test_keeps_case_and_whole_words(self):
+        text = "Certamente há luz. Isso vai acontecer, sem dúvida."
+        assert rewrite_locally(text, ["certamente", "vai acontecer", "sem dúvida"]) == (
+            "Provavelmente há luz. Isso pode acontecer, muito provavelmente."
+        )
+
+    @pytest.mark.parametrize(
+        "text,term",
+        [
+            ("Esse vínculo fica com você para sempre.", "sempre"),
+            ("Nunca mais aceite menos do que merece.", "nunca"),
+            ("Com certeza de si, você avança.", "com certeza"),
+            ("Você vai perceber a mudança aos poucos.", "você vai"),
+            ("Garanto a mim mesma um tempo de descanso.", "garanto"),
+            ("Esse ciclo se encerra definitivamente.", "definitivamente"),
+        ],
+    )
+    def test_context_dependent_terms_left_to_model(self, text, term):
+        assert rewrite_locally(text, [term]) == text
+
+
+class TestRepairContent:
+    """Tests for repair_content."""
+
+    async def test_local_repair_needs_no_call(self, client):
+        data = valid_reading(conselho="Certamente um pequeno passo concreto a cada manhã vai ajudar você.")
+
+        with track_job_completions() as stats:
+            reading = await repair_content(ReadingContent, data, 1000, client)
+
+        assert reading.conselho.startswith("Provavelmente um pequeno")
+        client.chat.completions.create.assert_not_awaited()
+        assert stats.local_repairs == 1
+        assert stats.tokens_saved == 1000
+
+    async def test_model_rewrites_only_failing_fields(self, client):
+        # "sem dúvidas" contains a forbidden term but no whole-word match
+        conteudo = "Este período traz mudanças, sem dúvidas, no trabalho e em casa. " * 4
+        data = {"titulo": "Semana", "resumo": "Ajustes.", "conteudo": conteudo}
+        rewritten = "Este período pode trazer mudanças no trabalho, com espaço para escolhas. " * 4
+        client.chat.completions.create.return_value = completion(
+            {"conteudo": rewritten}, prompt_tokens=120, completion_tokens=80
+        )
+
+        with track_job_completions() as stats:
+            forecast = await repair_content(ForecastContent, data, 1000, client)
+
+        assert forecast.conteudo == rewritten
+        sent = client.chat.completions.create.call_args.kwargs
+        assert json.loads(sent["messages"][0]["content"].split("\n\n", 1)[1]) == {"conteudo": data["conteudo"]}
+        assert sent["response_format"]["json_schema"]["schema"]["required"] == ["conteudo"]
+        assert stats.model_repairs == 1
+        assert stats.repair_tokens == 200
+        assert stats.tokens_saved == 800
+
+    async def test_ambiguous_term_goes_to_model(self, client):
+        data = valid_reading(sombra="O medo de perder algo para sempre pode travar suas escolhas diárias.")
+        rewritten = "O medo de perder algo de vez pode travar suas escolhas diárias."
+        client.chat.completions.create.return_value = completion({"sombra": rewritten})
+
+        with track_job_completions() as stats:
+            reading = await repair_content(ReadingContent, data, 1000, client)
+
+        assert reading.sombra == rewritten
+        assert stats.local_repairs == 0
+        assert stats.model_repairs == 1
+
+    async def test_other_errors_not_repaired(self, client):
+        data = valid_reading(interpretacao="Curta e sempre igual.")
+
+        assert await repair_content(ReadingContent, data, 1000, client) is None
+        client.chat.completions.create.assert_not_awaited()
+
+
+class TestGenerateReadingRepair:
+    """Forbidden terms no longer cost a full regeneration."""
+
+    async def test_reading_repaired_instead_of_retried(self, client):
+        client.chat.completions.create.return_value = completion(
+            valid_reading(sombra="Certamente você adia o que importa e isso pesa no seu caminho diário.")
+        )
+
+        with patch("app.services.openai_service.get_async_openai_client", return_value=client):
+            with track_job_completions() as stats:
+                reading = await generate_reading_async("{nome}", "Ana", "Destino", 1, "O Mago")
+
+        assert reading.sombra.startswith("Provavelmente você adia")
+        assert client.chat.completions.create.await_count == 1
+        assert stats.as_result() == {
+            "completions": 1,
+            "retries": 0,
+            "local_repairs": 1,
+            "model_repairs": 0,
+            "repair_tokens": 0,
+            "early_aborts": 0,
+            "tokens_saved": 1000,
+        }
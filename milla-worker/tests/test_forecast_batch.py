@@ -0,0 +1,198 @@
+"""
+Tests for offline forecast generation through the Batch API.
+
+OpenAI calls go to the local fake server; database helpers are mocked.
+"""
+import json
+from datetime import date
+from unittest.mock import DEFAULT, MagicMock, patch
+
+import pytest
+
+from app.models.forecast import ForecastType
+from app.services.forecast_batch import (
+    _read_results,
+    build_batch_requests,
+    deliver_batched_forecasts,
+    poll_forecast_batches,
+    submit_forecast_batch,
+)
+from app.services.generation_cache import NAME_PLACEHOLDER
+from tests.fake_servers import fake_openai_app, serve
+
+WEEK_START = date(2026, 10, 18)
+WEEK_END = date(2026, 10, 24)
+PROMPT = {"version": "1.0.0", "template": "Previsão de {nome}: ano {ano_pessoal}, semana {numero_semana}"}
+
+PROFILES = [
+    {"id": "user-ana", "full_name": "Ana", "birthdate": "1990-09-14"},
+    {"id": "user-bia", "full_name": "Bia", "birthdate": "1990-09-14"},
+    {"id": "user-caio", "full_name": "Caio", "birthdate": "1977-06-25"},
+    {"id": "user-dani", "full_name": "Dani", "birthdate": None},
+]
+
+
+@pytest.fixture(autouse=True)
+def single_variant(monkeypatch):
+    # Same base -> same archetype for every user
+    monkeypatch.setenv("GENERATION_CACHE_VARIANTS", "1")
+
+
+@pytest.fixture
+def batch_db():
+    with patch.multiple(
+        "app.services.forecast_batch",
+        iter_subscriber_profiles=DEFAULT,
+        _fetch_prompt=DEFAULT,
+        _find_batch=DEFAULT,
+        _insert_batch=DEFAULT,
+        _update_batch=DEFAULT,
+        _submitted_batches=DEFAULT,
+        _store_archetypes=DEFAULT,
+        _upsert_forecasts=DEFAULT,
+        enqueue_jobs_bulk=DEFAULT,
+        enqueue_forecast_jobs_for_all_users=DEFAULT,
+    ) as mocks:
+        mocks["iter_subscriber_profiles"].side_effect = lambda: iter(PROFILES)
+        mocks["_fetch_prompt"].return_value = PROMPT
+        mocks["_find_batch"].return_value = None
+        mocks["_upsert_forecasts"].side_effect = lambda rows: rows
+        mocks["enqueue_jobs_bulk"].side_effect = lambda rows: len(list(rows))
+        yield mocks
+
+
+class TestBuildBatchRequests:
+    """Tests for build_batch_requests."""
+
+    def test_one_request_per_archetype(self, batch_db):
+        requests, users = build_batch_requests(ForecastType.WEEKLY, WEEK_START, WEEK_END, PROMPT)
+
+        # Ana and Bia share a base; Dani has no birthdate
+        assert users == 3
+        assert len(requests) == 2
+        assert all(request["custom_id"].startswith("a:0:2026-10-18:") for request in requests)
+        assert all(NAME_PLACEHOLDER in request["body"]["messages"][0]["content"] for request in requests)
+        assert requests[0]["url"] == "/v1/chat/completions"
+
+    def test_one_request_per_user_without_cache(self, batch_db, monkeypatch):
+        monkeypatch.setenv("GENERATION_CACHE_ENABLED", "false")
+
+        requests, users = build_batch_requests(ForecastType.WEEKLY, WEEK_START, WEEK_END, PROMPT)
+
+        assert [request["custom_id"] for request in requests] == ["u:user-ana", "u:user-bia", "u:user-caio"]
+        assert requests[1]["body"]["messages"][0]["content"].startswith("Previsão de Bia")
+
+
+class TestForecastBatchFlow:
+    """Submit, poll and ingest against the fake Batch API."""
+
+    @pytest.mark.parametrize("voiced", [False, True])
+    def test_submit_poll_ingest(self, batch_db, monkeypatch, voiced):
+        if voiced:
+            monkeypatch.setenv("MINIMAX_API_KEY", "test-key")
+            monkeypatch.setenv("MINIMAX_VOICE_ID", "voice")
+        caio_requests, _ = build_batch_requests(ForecastType.WEEKLY, WEEK_START, WEEK_END, PROMPT)
+        caio_id = caio_requests[1]["custom_id"]
+        app = fake_openai_app(invalid_custom_ids=frozenset({caio_id}), batch_polls=2)
+
+        with serve(app) as base_url:
+            monkeypatch.setenv("OPENAI_BASE_URL", f"{base_url}/v1")
+            batch_id = submit_forecast_batch(ForecastType.WEEKLY, WEEK_START, WEEK_END)
+
+            row = batch_db["_insert_batch"].call_args.args[0]
+            assert row["openai_batch_id"] == batch_id
+            assert row["request_count"] == 2
+            uploaded = app.state.files[app.state.batches[batch_id]["input_file_id"]]
+            assert len(uploaded.decode().splitlines()) == 2
+
+            batch_db["_submitted_batches"].return_value = [{"id": "row-1", **row}]
+            assert poll_forecast_batches() == 0  # still in progress
+            assert poll_forecast_batches() == 1
+
+        forecasts = batch_db["_upsert_forecasts"].call_args.args[0]
+        assert [f["user_id"] for f in forecasts] == ["user-ana", "user-bia"]
+        assert all(f["delivered_at"] is None for f in forecasts)
+        assert forecasts[0]["content"] == forecasts[1]["content"]
+
+        # Stored forecasts get audio jobs; Caio's archetype came back invalid -> realtime job
+        assert batch_db["enqueue_jobs_bulk"].call_count == (2 if voiced else 1)
+        changes = batch_db["_update_batch"].call_args.args[1]
+        assert changes["status"] == "ingested"
+        assert changes["result"] == {
+            "results": 2,
+            "forecasts": 2,
+            "audio_jobs": 2 if voiced else 0,
+            "fallback_users": 1,
+            "fallback_jobs": 1,
+        }
+
+        # Both archetypes are shared with realtime jobs through the cache
+        entries = batch_db["_store_archetypes"].call_args.args[0]
+        assert {entry["kind"] for entry in entries} == {"forecast_weekly"}
+        assert len(entries) == 2
+
+    def test_existing_batch_not_resubmitted(self, batch_db):
+        batch_db["_find_batch"].return_value = {"status": "submitted"}
+
+        assert submit_forecast_batch(ForecastType.WEEKLY, WEEK_START, WEEK_END) is None
+        batch_db["_insert_batch"].assert_not_called()
+
+
+class TestReadResults:
+    """Tests for _read_results."""
+
+    @staticmethod
+    def output_line(custom_id: str, content: dict) -> str:
+        body = {"choices": [{"message": {"content": json.dumps(content)}}]}
+        return json.dumps({"custom_id": custom_id, "response": {"status_code": 200, "body": body}, "error": None})
+
+    def test_corrupt_line_counted_not_fatal(self):
+        lines = [
+            self.output_line("a:0:one", {"titulo": "Um"}),
+            self.output_line("a:0:two", {"titulo": "Dois"})[:40],  # truncated
+            "[1, 2]",
+            self.output_line("a:0:three", {"titulo": "Três"}),
+        ]
+        client = MagicMock()
+        client.files.content.return_value.text = "\n".join(lines)
+
+        with patch("app.services.forecast_batch.get_openai_client", return_value=client), \
+                patch("app.services.forecast_batch.logger") as logger:
+            results = _read_results("file-1")
+
+        assert results == {"a:0:one": {"titulo": "Um"}, "a:0:three": {"titulo": "Três"}}
+        logger.warning.assert_called_once_with("forecast_batch_items_failed", count=2)
+
+
+class TestDeliverBatchedForecasts:
+    """Tests for the batch-mode delivery cron."""
+
+    def test_releases_ingested_batch(self, batch_db):
+        batch_db["_find_batch"].return_value = {"status": "ingested"}
+
+        with patch("app.services.forecast_batch.release_forecasts", return_value=3) as release:
+            assert deliver_batched_forecasts(ForecastType.WEEKLY, WEEK_START, WEEK_END) == 3
+
+        release.assert_called_once_with(ForecastType.WEEKLY, WEEK_START)
+        batch_db["enqueue_forecast_jobs_for_all_users"].assert_not_called()
+
+    def test_unfinished_batch_cancelled_and_generated_realtime(self, batch_db, monkeypatch):
+        app = fake_openai_app(batch_polls=99)
+        batch_db["enqueue_forecast_jobs_for_all_users"].return_value = 3
+
+        with serve(app) as base_url:
+            monkeypatch.setenv("OPENAI_BASE_URL", f"{base_url}/v1")
+            batch_id = submit_forecast_batch(ForecastType.WEEKLY, WEEK_START, WEEK_END)
+            row = {"id": "row-1", **batch_db["_insert_batch"].call_args.args[0]}
+            batch_db["_find_batch"].return_value = row
+
+            assert deliver_batched_forecasts(ForecastType.WEEKLY, WEEK_START, WEEK_END) == 3
+
+        assert app.state.batches[batch_id]["status"] == "cancelled"
+        assert batch_db["_update_batch"].call_args.args[1]["status"] == "cancelled"
+        batch_db["enqueue_forecast_jobs_for_all_users"].assert_called_once_with("weekly", WEEK_START, WEEK_END)
+
+    def test_no_batch_falls_back_to_realtime(self, batch_db):
+        batch_db["enqueue_forecast_jobs_for_all_users"].return_value = 4
+
+        assert deliver_batched_forecasts(ForecastType.WEEKLY, WEEK_START, WEEK_END) == 4
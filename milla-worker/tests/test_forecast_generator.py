@@ -3,13 +3,16 @@ Tests for forecast_generator service.
 """
 import pytest
 from datetime import date
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 
 from app.services.forecast_generator import (
     calculate_ano_pessoal,
     calculate_numero_semana,
     calculate_ciclo_mensal,
     get_arcano_regente,
+    calculate_forecast_base,
+    forecast_base_key,
+    forecast_period,
     generate_forecast_content,
 )
 from app.models.forecast import ForecastType, ForecastCalculationBase
@@ -99,6 +102,48 @@ class TestGetArcanoRegente:
         assert isinstance(get_arcano_regente(5), str)
 
 
+class TestForecastBaseKey:
+    """Tests for forecast_base_key function."""
+    
+    def test_same_base_same_key(self):
+        """Users with equal numbers share the archetype key."""
+        week = date(2026, 3, 1)
+        a = calculate_forecast_base(date(1990, 5, 15), ForecastType.WEEKLY, week)
+        b = calculate_forecast_base(date(1985, 5, 15), ForecastType.WEEKLY, week)
+        
+        assert forecast_base_key(a) == forecast_base_key(b)
+    
+    def test_key_ignores_unset_fields(self):
+        base = ForecastCalculationBase(ano_pessoal=6, numero_semana=9)
+        assert forecast_base_key(base) == "ano_pessoal=6:numero_semana=9"
+
+
+class TestForecastPeriod:
+    """Tests for forecast_period function."""
+    
+    def test_weekly_is_next_sunday_to_saturday(self):
+        # Sunday delivery covers the following week
+        assert forecast_period(ForecastType.WEEKLY, date(2026, 10, 18)) == (
+            date(2026, 10, 25), date(2026, 10, 31)
+        )
+        assert forecast_period(ForecastType.WEEKLY, date(2026, 10, 17)) == (
+            date(2026, 10, 18), date(2026, 10, 24)
+        )
+    
+    def test_monthly_is_reference_month(self):
+        assert forecast_period(ForecastType.MONTHLY, date(2026, 2, 1)) == (
+            date(2026, 2, 1), date(2026, 2, 28)
+        )
+        assert forecast_period(ForecastType.MONTHLY, date(2026, 12, 1)) == (
+            date(2026, 12, 1), date(2026, 12, 31)
+        )
+    
+    def test_yearly_is_reference_year(self):
+        assert forecast_period(ForecastType.YEARLY, date(2027, 1, 1)) == (
+            date(2027, 1, 1), date(2027, 12, 31)
+        )
+
+
 class TestGenerateForecastContent:
     """Tests for generate_forecast_content function."""
     
@@ -112,10 +157,10 @@ class TestGenerateForecastContent:
         )
     
     @patch("app.services.forecast_generator.get_settings")
-    @patch("openai.OpenAI")
+    @patch("app.services.forecast_generator.get_async_openai_client")
     def test_generate_weekly_forecast(
         self, 
-        mock_openai_class, 
+        mock_openai_factory, 
         mock_settings,
         mock_calculation_base,
     ):
@@ -124,11 +169,13 @@ class TestGenerateForecastContent:
         settings = MagicMock()
         settings.openai_api_key = "test-key"
         settings.openai_model = "gpt-4o"
+        settings.forecast_batch_size = 1
         mock_settings.return_value = settings
         
         # Setup OpenAI mock with valid Pydantic data (resumo required, content >= 200 chars)
         mock_openai = MagicMock()
-        mock_openai_class.return_value = mock_openai
+        mock_openai.chat.completions.create = AsyncMock()
+        mock_openai_factory.return_value = mock_openai
         
         long_content = "Texto da previsão " * 20 # Make it > 200 chars
         
@@ -0,0 +1,227 @@
+"""
+Tests for the shared (name-neutral) generation cache.
+"""
+import asyncio
+from datetime import date
+from unittest.mock import DEFAULT, AsyncMock, patch
+
+import pytest
+
+from app.models.forecast import ForecastCalculationBase, ForecastContent, ForecastType
+from app.models.reading import ReadingContent
+from app.services.generation_cache import (
+    NAME_PLACEHOLDER,
+    generate_forecast_cached,
+    generate_reading_bundle_cached,
+    generate_reading_cached,
+    get_or_generate,
+    personalize,
+    variant_index,
+)
+
+PROMPT = {"version": "1.0.0", "template": "{nome} {ponto_nome} {ponto_valor} {arcano}"}
+
+
+@pytest.fixture
+def neutral_reading():
+    return ReadingContent(
+        arcano="A Sacerdotisa",
+        titulo=f"{NAME_PLACEHOLDER}, a voz interior",
+        interpretacao=f"{NAME_PLACEHOLDER}, este arcano sugere intuição e escuta profunda. " * 4,
+        sombra="A tendência ao isolamento pode afastar pessoas que desejam se aproximar.",
+        conselho="Reserve momentos de silêncio e confie nas percepções que surgem neles.",
+    )
+
+
+@pytest.fixture
+def cache_db():
+    with patch.multiple(
+        "app.services.generation_cache",
+        _fetch_entry=DEFAULT,
+        _store_entry=DEFAULT,
+        generate_reading_async=DEFAULT,
+        generate_reading_bundle_async=DEFAULT,
+        generate_forecast_from_base_async=DEFAULT,
+        new_callable=AsyncMock,
+    ) as mocks:
+        mocks["_fetch_entry"].return_value = None
+        yield mocks
+
+
+class TestHelpers:
+    """Tests for variant_index and personalize."""
+
+    def test_variant_index_is_stable_and_in_range(self):
+        assert variant_index("user-1", 3) == variant_index("user-1", 3)
+        assert {variant_index(f"user-{i}", 3) for i in range(100)} == {0, 1, 2}
+
+    def test_personalize_nested(self):
+        content = {"a": "Olá {nome}", "b": ["{nome}!", 1], "c": {"d": "{nome}"}}
+        assert personalize(content, "Ana") == {"a": "Olá Ana", "b": ["Ana!", 1], "c": {"d": "Ana"}}
+
+
+class TestGetOrGenerate:
+    """Tests for get_or_generate function."""
+
+    async def test_stored_entry_skips_generation(self, cache_db):
+        cache_db["_fetch_entry"].return_value = {"titulo": "x"}
+        generate = AsyncMock()
+
+        content, generated = await get_or_generate("reading", "k", 0, generate, "1.0.0", "gpt-4o")
+
+        assert content == {"titulo": "x"}
+        assert generated is False
+        generate.assert_not_awaited()
+
+    async def test_concurrent_misses_generate_once(self, cache_db):
+        async def generate():
+            await asyncio.sleep(0.01)
+            return {"titulo": "novo"}
+
+        generate = AsyncMock(side_effect=generate)
+        results = await asyncio.gather(
+            *(get_or_generate("reading", "k", 0, generate, "1.0.0", "gpt-4o") for _ in range(10))
+        )
+
+        assert generate.await_count == 1
+        cache_db["_store_entry"].assert_awaited_once()
+        assert sum(generated for _, generated in results) == 1
+
+
+class TestGenerateReadingCached:
+    """Tests for generate_reading_cached function."""
+
+    async def call(self, user_id="user-1", nome="Fabio"):
+        return await generate_reading_cached(
+            user_id=user_id,
+            section="destino",
+            prompt=PROMPT,
+            nome=nome,
+            ponto_nome="Destino",
+            ponto_valor=2,
+            arcano="A Sacerdotisa",
+        )
+
+    async def test_miss_then_hit_personalized(self, cache_db, neutral_reading):
+        cache_db["generate_reading_async"].return_value = neutral_reading
+
+        first, status = await self.call(nome="Fabio")
+        assert status == "miss"
+        assert first.titulo == "Fabio, a voz interior"
+        assert cache_db["generate_reading_async"].call_args.kwargs["nome"] == NAME_PLACEHOLDER
+
+        # Same variant for another user -> served from memory, other name
+        user = next(
+            f"user-{i}" for i in range(2, 100)
+            if variant_index(f"user-{i}", 3) == variant_index("user-1", 3)
+        )
+        second, status = await self.call(user_id=user, nome="Ana")
+        assert status == "hit"
+        assert second.titulo == "Ana, a voz interior"
+        assert cache_db["generate_reading_async"].await_count == 1
+
+    async def test_key_includes_prompt_version_and_model(self, cache_db, neutral_reading):
+        cache_db["generate_reading_async"].return_value = neutral_reading
+        await self.call()
+
+        kind, cache_key, _variant = cache_db["_fetch_entry"].call_args.args
+        assert kind == "reading"
+        assert cache_key == "destino:2:1.0.0:gpt-4o"
+
+    async def test_invalid_personalization_falls_back(self, cache_db, neutral_reading):
+        cache_db["generate_reading_async"].return_value = neutral_reading
+
+        _, status = await self.call(nome="N" * 200)
+
+        assert status == "bypass"
+        assert cache_db["generate_reading_async"].await_count == 2
+
+    async def test_disabled(self, cache_db, neutral_reading, monkeypatch):
+        from app.config import get_settings
+
+        monkeypatch.setenv("GENERATION_CACHE_ENABLED", "false")
+        get_settings.cache_clear()
+        cache_db["generate_reading_async"].return_value = neutral_reading
+
+        _, status = await self.call()
+
+        assert status == "bypass"
+        cache_db["_fetch_entry"].assert_not_awaited()
+        assert cache_db["generate_reading_async"].call_args.kwargs["nome"] == "Fabio"
+
+
+class TestGenerateForecastCached:
+    """Tests for generate_forecast_cached function."""
+
+    async def call(self, user_id, nome, base):
+        return await generate_forecast_cached(
+            user_id=user_id,
+            prompt=PROMPT,
+            nome=nome,
+            calc_base=base,
+            forecast_type=ForecastType.WEEKLY,
+            period_start=date(2026, 3, 1),
+            period_end=date(2026, 3, 7),
+        )
+
+    async def test_one_generation_per_distinct_base(self, cache_db, monkeypatch):
+        from app.config import get_settings
+
+        monkeypatch.setenv("GENERATION_CACHE_VARIANTS", "1")
+        get_settings.cache_clear()
+        cache_db["generate_forecast_from_base_async"].return_value = ForecastContent(
+            titulo=f"Semana de {NAME_PLACEHOLDER}",
+            resumo="Uma semana de recomeços.",
+            conteudo=f"{NAME_PLACEHOLDER}, esta semana convida a recomeços. " * 10,
+        )
+        base_a = ForecastCalculationBase(ano_pessoal=6, numero_semana=9)
+        base_b = ForecastCalculationBase(ano_pessoal=7, numero_semana=10)
+
+        results = await asyncio.gather(
+            *(self.call(f"user-{i}", f"Nome{i}", base_a if i % 2 else base_b) for i in range(20))
+        )
+
+        assert cache_db["generate_forecast_from_base_async"].await_count == 2
+        assert results[3][0].titulo == "Semana de Nome3"
+        assert sorted(status for _, status in results).count("miss") == 2
+
+        kind, cache_key, variant, *_rest, expires_at = cache_db["_store_entry"].call_args.args
+        assert kind == "forecast_weekly"
+        assert cache_key.startswith("2026-03-01:ano_pessoal=")
+        assert expires_at.date() == date(2026, 4, 6)
+
+
+class TestGenerateReadingBundleCached:
+    """Tests for generate_reading_bundle_cached function."""
+
+    SECTIONS = {
+        section: {"prompt": PROMPT, "ponto_nome": section, "ponto_valor": 2, "arcano": "A Sacerdotisa"}
+        for section in ["missao_da_alma", "destino"]
+    }
+
+    async def test_misses_filled_by_one_bundle_call(self, cache_db, neutral_reading):
+        cached = neutral_reading.model_dump_for_db()
+        cache_db["_fetch_entry"].side_effect = lambda kind, key, variant: (
+            cached if key.startswith("missao_da_alma:") else None
+        )
+        cache_db["generate_reading_bundle_async"].return_value = ({"destino": neutral_reading}, {})
+
+        readings, statuses, errors = await generate_reading_bundle_cached("user-1", "Fabio", self.SECTIONS)
+
+        assert statuses == {"missao_da_alma": "hit", "destino": "miss"}
+        assert errors == {}
+        assert readings["destino"].titulo == "Fabio, a voz interior"
+        nome, requested = cache_db["generate_reading_bundle_async"].call_args.args
+        assert nome == NAME_PLACEHOLDER
+        assert list(requested) == ["destino"]
+        cache_db["_store_entry"].assert_awaited_once()
+
+    async def test_failed_sections_reported(self, cache_db, neutral_reading):
+        cache_db["generate_reading_bundle_async"].return_value = (
+            {"destino": neutral_reading}, {"missao_da_alma": "invalid"}
+        )
+
+        readings, statuses, errors = await generate_reading_bundle_cached("user-1", "Fabio", self.SECTIONS)
+
+        assert set(readings) == {"destino"}
+        assert errors == {"missao_da_alma": "invalid"}
@@ -0,0 +1,111 @@
+"""
+Tests for hedged completions.
+"""
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.services.forecast_generator import generate_forecast_from_prompt_async
+from app.services.hedging import hedge_delay, hedged, hedging_stats, reset_hedging_stats
+
+
+@pytest.fixture(autouse=True)
+def hedging_env(monkeypatch):
+    monkeypatch.setenv("HEDGING_ENABLED", "true")
+    monkeypatch.setenv("HEDGE_INITIAL_DELAY_SECONDS", "0.05")
+    monkeypatch.setenv("HEDGE_MIN_SAMPLES", "4")
+    reset_hedging_stats()
+    yield
+    reset_hedging_stats()
+
+
+def scripted(*steps):
+    """call() factory whose n-th attempt sleeps and returns (or raises) steps[n]."""
+    calls = []
+
+    async def call():
+        delay, outcome = steps[len(calls)]
+        calls.append(asyncio.current_task())
+        await asyncio.sleep(delay)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    return call, calls
+
+
+class TestHedged:
+    """Tests for hedged."""
+
+    async def test_fast_request_not_hedged(self):
+        call, calls = scripted((0, "first"))
+
+        assert await hedged("forecast", call) == "first"
+        assert len(calls) == 1
+        assert hedging_stats()["by_kind"]["forecast"]["hedged"] == 0
+
+    async def test_slow_request_hedged_and_loser_cancelled(self):
+        call, calls = scripted((5, "slow"), (0, "hedge"))
+
+        assert await hedged("forecast", call) == "hedge"
+        await asyncio.sleep(0)
+        assert calls[0].cancelled()
+        stats = hedging_stats()["by_kind"]["forecast"]
+        assert (stats["hedged"], stats["hedge_wins"]) == (1, 1)
+
+    async def test_fast_error_not_hedged(self):
+        call, calls = scripted((0, ValueError("bad request")))
+
+        with pytest.raises(ValueError, match="bad request"):
+            await hedged("forecast", call)
+        assert len(calls) == 1
+
+    async def test_failed_primary_falls_back_to_hedge(self):
+        call, _ = scripted((0.1, ValueError("reset")), (0.2, "hedge"))
+
+        assert await hedged("forecast", call) == "hedge"
+
+    async def test_budget_caps_hedges(self, monkeypatch):
+        # 0.05 * 20 = at most one hedge among the last 20 requests
+        monkeypatch.setenv("HEDGE_MAX_RATE", "0.05")
+        monkeypatch.setenv("HEDGE_WINDOW", "20")
+
+        for _ in range(2):
+            call, _ = scripted((0.1, "slow"), (0, "hedge"))
+            await hedged("forecast", call)
+
+        stats = hedging_stats()["by_kind"]["forecast"]
+        assert (stats["hedged"], stats["budget_denied"]) == (1, 1)
+        assert hedging_stats()["hedge_rate"] == 0.5
+
+    async def test_delay_follows_recent_percentile(self, monkeypatch):
+        monkeypatch.setenv("HEDGE_PERCENTILE", "75")
+        assert hedge_delay("reading") == 0.05
+
+        for delay in (0, 0, 0, 0.02):
+            call, _ = scripted((delay, "ok"))
+            await hedged("reading", call)
+
+        assert hedge_delay("reading") < 0.01
+
+    async def test_disabled(self, monkeypatch):
+        monkeypatch.setenv("HEDGING_ENABLED", "false")
+        call, calls = scripted((0.1, "slow"), (0, "hedge"))
+
+        assert await hedged("forecast", call) == "slow"
+        assert len(calls) == 1
+        assert hedging_stats()["by_kind"] == {}
+
+
+async def test_forecast_completions_hedged():
+    valid = {"titulo": "Semana", "resumo": "Ajustes.", "conteudo": "Um período de escuta e ajustes. " * 10}
+    response = MagicMock(choices=[MagicMock(message=MagicMock(content=json.dumps(valid)))], usage=None)
+    client = MagicMock()
+    client.chat.completions.create = AsyncMock(return_value=response)
+
+    with patch("app.services.forecast_generator.get_async_openai_client", return_value=client):
+        await generate_forecast_from_prompt_async("prompt")
+
+    assert hedging_stats()["by_kind"]["forecast"]["requests"] == 1
@@ -0,0 +1,68 @@
+"""
+Tests for the shared pooled HTTP transport.
+"""
+import asyncio
+
+import pytest
+
+from app.services.http_transport import (
+    close_http_client,
+    get_http_client,
+    reset_transport_stats,
+    transport_stats,
+)
+from tests.fake_servers import json_app, serve
+
+
+@pytest.fixture(autouse=True)
+async def fresh_transport():
+    reset_transport_stats()
+    yield
+    await close_http_client()
+
+
+class TestGetHttpClient:
+    """Tests for get_http_client function."""
+
+    async def test_one_client_per_loop(self):
+        assert get_http_client() is get_http_client()
+
+    async def test_recreated_after_close(self):
+        client = get_http_client()
+        await close_http_client()
+        assert get_http_client() is not client
+
+    async def test_clients_share_the_transport(self):
+        from app.services.openai_service import get_async_openai_client
+        from app.services.supabase_client import _async_clients, get_async_supabase_client
+
+        _async_clients.pop(asyncio.get_running_loop(), None)
+        openai_client = get_async_openai_client()
+        supabase = await get_async_supabase_client()
+
+        assert openai_client._client is get_http_client()
+        assert supabase.options.httpx_client is get_http_client()
+        _async_clients.pop(asyncio.get_running_loop(), None)
+
+
+class TestTransportStats:
+    """Connection reuse against a local server."""
+
+    async def test_sequential_requests_reuse_one_connection(self):
+        with serve(json_app({"ok": True})) as base_url:
+            client = get_http_client()
+            for _ in range(5):
+                response = await client.post(f"{base_url}/v1/t2a_v2", json={"text": "x"})
+                assert response.json() == {"ok": True}
+
+            stats = transport_stats()
+
+        assert stats["requests"] == 5
+        assert stats["connections_opened"] == 1
+        assert stats["reuse_rate"] == 0.8
+        assert stats["by_host"]["127.0.0.1"]["requests"] == 5
+
+    async def test_pool_connections_reported(self):
+        with serve(json_app({"ok": True})) as base_url:
+            await get_http_client().get(base_url)
+            assert transport_stats()["pool_connections"] == 1
@@ -0,0 +1,105 @@
+"""
+Tests for the bounded job pool.
+"""
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.services.job_pool import interleave_by_type, run_jobs
+
+
+@pytest.fixture
+def mock_settings():
+    with patch("app.services.job_pool.get_settings") as mock_get:
+        settings = MagicMock()
+        settings.job_concurrency = 4
+        settings.job_type_concurrency = {"generate_reading": 4, "generate_forecast": 1}
+        mock_get.return_value = settings
+        yield settings
+
+
+class ConcurrencyProbe:
+    """Handler that records peak concurrency overall and per type."""
+
+    def __init__(self, delay: float = 0.05):
+        self.delay = delay
+        self.running: dict[str, int] = {}
+        self.peak: dict[str, int] = {}
+        self.total = 0
+        self.peak_total = 0
+
+    async def __call__(self, job: dict) -> None:
+        job_type = job["type"]
+        self.running[job_type] = self.running.get(job_type, 0) + 1
+        self.total += 1
+        self.peak[job_type] = max(self.peak.get(job_type, 0), self.running[job_type])
+        self.peak_total = max(self.peak_total, self.total)
+        await asyncio.sleep(self.delay)
+        self.running[job_type] -= 1
+        self.total -= 1
+
+
+def make_jobs(job_type: str, count: int) -> list[dict]:
+    return [{"id": f"{job_type}-{i:04d}", "type": job_type} for i in range(count)]
+
+
+class TestRunJobs:
+    """Tests for run_jobs function."""
+
+    async def test_runs_jobs_concurrently(self, mock_settings):
+        """Reading jobs should overlap up to the global limit."""
+        probe = ConcurrencyProbe()
+        stats = await run_jobs(make_jobs("generate_reading", 8), probe)
+
+        assert stats.jobs == 8
+        assert probe.peak_total == 4
+        assert stats.parallelism > 1.5
+
+    async def test_per_type_limit(self, mock_settings):
+        """Forecast jobs should respect their own limit."""
+        probe = ConcurrencyProbe()
+        jobs = make_jobs("generate_forecast", 3) + make_jobs("generate_reading", 3)
+        await run_jobs(jobs, probe)
+
+        assert probe.peak["generate_forecast"] == 1
+        assert probe.peak_total == 4
+
+    async def test_handler_errors_do_not_abort_batch(self, mock_settings):
+        """A failing job should not stop the others."""
+        handled = []
+
+        async def handler(job):
+            if job["id"].endswith("0000"):
+                raise RuntimeError("boom")
+            handled.append(job["id"])
+
+        stats = await run_jobs(make_jobs("generate_reading", 3), handler)
+
+        assert stats.jobs == 3
+        assert len(handled) == 2
+
+    async def test_empty_batch(self, mock_settings):
+        """No jobs means no work and zeroed stats."""
+        handler = AsyncMock()
+        stats = await run_jobs([], handler)
+
+        assert stats.jobs == 0
+        assert stats.parallelism == 0.0
+        handler.assert_not_called()
+
+
+class TestInterleaveByType:
+    """Tests for interleave_by_type function."""
+
+    def test_round_robin_keeps_order(self):
+        jobs = make_jobs("generate_forecast", 2) + make_jobs("generate_reading", 3)
+        ordered = [job["id"] for job in interleave_by_type(jobs)]
+
+        assert ordered == [
+            "generate_forecast-0000",
+            "generate_reading-0000",
+            "generate_forecast-0001",
+            "generate_reading-0001",
+            "generate_reading-0002",
+        ]
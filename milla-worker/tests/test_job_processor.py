@@ -0,0 +1,735 @@
+"""
+Tests for job_processor job execution.
+"""
+import threading
+import time
+from datetime import date
+from unittest.mock import DEFAULT, AsyncMock, MagicMock, patch
+
+import httpx
+import pytest
+
+from app.models.reading import ReadingContent
+from app.services.job_processor import (
+    AUDIO_JOB_PRIORITY,
+    audio_storage_path,
+    check_and_enqueue_for_active_subscriptions,
+    cleanup_expired_forecasts,
+    drain_pending_jobs,
+    enqueue_forecast_jobs_for_all_users,
+    enqueue_jobs_bulk,
+    forecast_audio_job_row,
+    iter_active_subscriber_ids,
+    process_forecast_audio_job,
+    process_forecast_job,
+    process_pending_jobs,
+    process_reading_bundle_job,
+    process_reading_job,
+    reading_job_rows,
+)
+
+
+@pytest.fixture
+def reading_job():
+    return {
+        "id": "job-00000001",
+        "user_id": "user-00000001",
+        "type": "generate_reading",
+        "attempts": 1,
+        "payload": {"section": "destino"},
+    }
+
+
+@pytest.fixture
+def reading_content():
+    return ReadingContent(
+        arcano="A Sacerdotisa",
+        titulo="A Voz Interior",
+        interpretacao="Este arcano sugere intuição e escuta profunda. Indica uma fase de recolhimento. " * 3,
+        sombra="A tendência ao isolamento pode afastar pessoas que desejam se aproximar de você.",
+        conselho="Reserve momentos de silêncio e confie nas percepções que surgem nesses momentos.",
+    )
+
+
+@pytest.fixture
+def job_db():
+    """Patch every job_processor database helper with async mocks."""
+    with patch.multiple(
+        "app.services.job_processor",
+        get_profile=DEFAULT,
+        get_active_prompt=DEFAULT,
+        upsert_reading=DEFAULT,
+        update_job_completed=DEFAULT,
+        update_job_failed=DEFAULT,
+        new_callable=AsyncMock,
+    ) as mocks:
+        mocks["get_profile"].return_value = {"full_name": "Fabio", "birthdate": "1982-09-14"}
+        mocks["get_active_prompt"].return_value = {"template": "{nome} {arcano}", "version": "1.0.0"}
+        yield mocks
+
+
+class TestProcessReadingJob:
+    """Tests for process_reading_job function."""
+
+    @patch("app.services.job_processor.generate_reading_cached", new_callable=AsyncMock)
+    async def test_reading_job_success(self, mock_generate, job_db, reading_job, reading_content):
+        """A generated reading should be upserted and the job completed."""
+        mock_generate.return_value = (reading_content, "miss")
+
+        await process_reading_job(reading_job)
+
+        # destino for 14/09/1982 -> 1982 -> 20 -> 2
+        assert mock_generate.call_args.kwargs["ponto_valor"] == 2
+        job_db["upsert_reading"].assert_awaited_once()
+        job_db["update_job_completed"].assert_awaited_once()
+        job_db["update_job_failed"].assert_not_awaited()
+
+    @patch("app.services.job_processor.generate_reading_cached", new_callable=AsyncMock)
+    async def test_reading_job_missing_profile(self, mock_generate, job_db, reading_job):
+        """A missing profile should schedule a retry without calling OpenAI."""
+        job_db["get_profile"].return_value = None
+
+        await process_reading_job(reading_job)
+
+        mock_generate.assert_not_awaited()
+        job_id, error, attempts = job_db["update_job_failed"].call_args.args
+        assert job_id == "job-00000001"
+        assert "Profile not found" in error
+        assert attempts == 1
+
+    @patch("app.services.job_processor.generate_reading_cached", new_callable=AsyncMock)
+    async def test_reading_job_uses_claimed_context(self, mock_generate, job_db, reading_job, reading_content):
+        """Profile and prompt returned with the claim skip the lookups."""
+        mock_generate.return_value = (reading_content, "miss")
+        job = {
+            **reading_job,
+            "profile": {"full_name": "Ana", "birthdate": "1990-01-01"},
+            "prompt": {"section": "destino", "version": "2.0.0", "template": "{nome}"},
+        }
+
+        await process_reading_job(job)
+
+        job_db["get_profile"].assert_not_awaited()
+        job_db["get_active_prompt"].assert_not_awaited()
+        assert mock_generate.call_args.kwargs["nome"] == "Ana"
+        assert job_db["upsert_reading"].call_args.kwargs["prompt_version"] == "2.0.0"
+
+
+class TestProcessReadingBundleJob:
+    """Tests for process_reading_bundle_job function."""
+
+    @pytest.fixture
+    def bundle_job(self):
+        return {
+            "id": "job-00000009",
+            "user_id": "user-00000001",
+            "type": "generate_reading_bundle",
+            "attempts": 1,
+            "payload": {},
+        }
+
+    @pytest.fixture
+    def stored(self):
+        """Rows of the readings table, as (section, prompt_version)."""
+        return []
+
+    @pytest.fixture
+    def readings_table(self, stored):
+        supabase = MagicMock()
+        table = supabase.table.return_value
+
+        def upsert(rows, on_conflict):
+            stored.extend({"section": row["section"], "prompt_version": row["prompt_version"]} for row in rows)
+            return MagicMock(execute=AsyncMock())
+
+        table.upsert.side_effect = upsert
+        table.select.return_value.eq.return_value.execute = AsyncMock(
+            side_effect=lambda: MagicMock(data=list(stored))
+        )
+        with patch(
+            "app.services.job_processor.get_async_supabase_client",
+            new_callable=AsyncMock,
+            return_value=supabase,
+        ):
+            yield supabase.table.return_value.upsert
+
+    @patch("app.services.job_processor.generate_reading_bundle_cached", new_callable=AsyncMock)
+    async def test_all_sections_saved_in_one_upsert(
+        self, mock_bundle, job_db, bundle_job, reading_content, readings_table
+    ):
+        sections = ["missao_da_alma", "personalidade", "destino", "proposito", "manifestacao_material"]
+        mock_bundle.return_value = (
+            {section: reading_content for section in sections},
+            {section: "miss" for section in sections},
+            {},
+        )
+
+        await process_reading_bundle_job(bundle_job)
+
+        requested = mock_bundle.call_args.kwargs["sections"]
+        assert list(requested) == sections
+        assert requested["destino"]["ponto_valor"] == 2
+        rows = readings_table.call_args.args[0]
+        assert [row["section"] for row in rows] == sections
+        job_db["update_job_completed"].assert_awaited_once()
+
+    @patch("app.services.job_processor.generate_reading_bundle_cached", new_callable=AsyncMock)
+    async def test_partial_failure_saves_valid_sections_and_retries(
+        self, mock_bundle, job_db, bundle_job, reading_content, readings_table
+    ):
+        mock_bundle.return_value = ({"destino": reading_content}, {"destino": "miss"}, {"proposito": "x"})
+
+        await process_reading_bundle_job(bundle_job)
+
+        assert [row["section"] for row in readings_table.call_args.args[0]] == ["destino"]
+        _job_id, error, _attempts = job_db["update_job_failed"].call_args.args
+        assert "proposito" in error
+        job_db["update_job_completed"].assert_not_awaited()
+
+
+    async def test_retry_skips_saved_sections_without_cache(
+        self, job_db, bundle_job, reading_content, readings_table, monkeypatch
+    ):
+        monkeypatch.setenv("GENERATION_CACHE_ENABLED", "false")
+        sections = ["missao_da_alma", "personalidade", "destino", "proposito", "manifestacao_material"]
+        generated = {section: reading_content for section in sections if section != "proposito"}
+
+        with patch(
+            "app.services.generation_cache.generate_reading_bundle_async", new_callable=AsyncMock
+        ) as generate:
+            generate.return_value = (generated, {"proposito": "too short"})
+            await process_reading_bundle_job(bundle_job)
+
+            generate.return_value = ({"proposito": reading_content}, {})
+            await process_reading_bundle_job({**bundle_job, "attempts": 2})
+
+        # The retry pays only for the section that failed
+        assert list(generate.call_args_list[1].args[1]) == ["proposito"]
+        assert [row["section"] for row in readings_table.call_args.args[0]] == ["proposito"]
+        statuses = job_db["update_job_completed"].call_args.args[1]["generation_cache"]
+        assert statuses == {"proposito": "bypass", **{section: "saved" for section in generated}}
+
+    @patch("app.services.job_processor.generate_reading_bundle_cached", new_callable=AsyncMock)
+    async def test_sections_from_an_older_prompt_regenerated(
+        self, mock_bundle, job_db, bundle_job, reading_content, readings_table, stored
+    ):
+        stored.append({"section": "destino", "prompt_version": "0.9.0"})
+        mock_bundle.return_value = ({}, {}, {})
+
+        await process_reading_bundle_job(bundle_job)
+
+        assert "destino" in mock_bundle.call_args.kwargs["sections"]
+
+
+class TestReadingJobRows:
+    """Tests for reading_job_rows function."""
+
+    def test_bundle_by_default(self):
+        rows = reading_job_rows("user-1")
+        assert len(rows) == 1
+        assert rows[0]["type"] == "generate_reading_bundle"
+        assert rows[0]["idempotency_key"] == "user-1:bundle:v1"
+
+    def test_per_section_jobs_when_disabled(self, monkeypatch):
+        from app.config import get_settings
+
+        monkeypatch.setenv("READING_BUNDLE_ENABLED", "false")
+        get_settings.cache_clear()
+
+        rows = reading_job_rows("user-1")
+        assert [row["payload"]["section"] for row in rows][:2] == ["missao_da_alma", "personalidade"]
+        assert rows[2]["idempotency_key"] == "user-1:destino:v1"
+
+
+class TestProcessPendingJobs:
+    """Tests for process_pending_jobs function."""
+
+    @patch("app.services.job_processor.process_job", new_callable=AsyncMock)
+    @patch("app.services.job_processor.claim_jobs", new_callable=AsyncMock)
+    async def test_processes_claimed_jobs(self, mock_claim, mock_process, reading_job):
+        mock_claim.return_value = [reading_job, {**reading_job, "id": "job-00000002"}]
+
+        count = await process_pending_jobs()
+
+        assert count == 2
+        assert mock_process.await_count == 2
+
+    @patch("app.services.job_processor.claim_jobs", new_callable=AsyncMock)
+    async def test_no_jobs(self, mock_claim):
+        mock_claim.return_value = []
+        assert await process_pending_jobs() == 0
+
+
+class TestDrainPendingJobs:
+    """Tests for drain_pending_jobs function."""
+
+    @patch("app.services.job_processor.process_pending_jobs", new_callable=AsyncMock)
+    async def test_drains_until_claim_is_empty(self, mock_process):
+        mock_process.side_effect = [50, 50, 7, 0]
+
+        stats = await drain_pending_jobs()
+
+        assert stats.batches == 3
+        assert stats.jobs == 107
+        assert stats.backlog_remaining is False
+        assert mock_process.await_count == 4
+
+    @patch("app.services.job_processor.process_pending_jobs", new_callable=AsyncMock)
+    async def test_stops_at_time_budget(self, mock_process, monkeypatch):
+        monkeypatch.setenv("DRAIN_MAX_SECONDS", "0.000001")
+        mock_process.side_effect = [50, 50, 0]
+
+        stats = await drain_pending_jobs()
+
+        assert stats.batches == 1
+        assert stats.backlog_remaining is True
+
+    @patch("app.services.job_processor.process_pending_jobs", new_callable=AsyncMock)
+    async def test_empty_queue(self, mock_process):
+        mock_process.return_value = 0
+
+        stats = await drain_pending_jobs()
+
+        assert stats.batches == 0
+        assert stats.jobs_per_second == 0.0
+
+
+class FakeSubscriptionsQuery:
+    """Minimal keyset-capable stand-in for a PostgREST subscriptions query."""
+
+    def __init__(self, user_ids: list[str], calls: list):
+        self.user_ids = sorted(user_ids)
+        self.calls = calls
+        self.after = None
+        self.page_size = None
+
+    def select(self, *_args):
+        return self
+
+    def eq(self, *_args):
+        return self
+
+    def order(self, *_args):
+        return self
+
+    def limit(self, page_size):
+        self.page_size = page_size
+        return self
+
+    def gt(self, _column, value):
+        self.after = value
+        return self
+
+    def execute(self):
+        self.calls.append(self.after)
+        remaining = [u for u in self.user_ids if self.after is None or u > self.after]
+        return MagicMock(data=[{"user_id": u} for u in remaining[: self.page_size]])
+
+
+class TestIterActiveSubscriberIds:
+    """Tests for iter_active_subscriber_ids function."""
+
+    @pytest.fixture
+    def subscriptions(self):
+        user_ids = [f"user-{i:05d}" for i in range(25)]
+        calls = []
+        supabase = MagicMock()
+        supabase.table.side_effect = lambda _name: FakeSubscriptionsQuery(user_ids, calls)
+        with patch("app.services.job_processor.get_supabase_client", return_value=supabase):
+            yield user_ids, calls
+
+    def test_pages_cover_every_subscriber(self, subscriptions):
+        user_ids, calls = subscriptions
+
+        assert list(iter_active_subscriber_ids(page_size=10)) == user_ids
+        assert calls == [None, "user-00009", "user-00019"]
+
+    def test_exact_multiple_of_page_size(self, subscriptions):
+        user_ids, calls = subscriptions
+
+        assert len(list(iter_active_subscriber_ids(page_size=5))) == 25
+        # Last full page needs one empty follow-up to confirm the end
+        assert len(calls) == 6
+
+
+class FakeJobsTable:
+    """Records bulk upserts and skips keys that already exist."""
+
+    def __init__(self, existing_keys: set[str] = frozenset()):
+        self.keys = set(existing_keys)
+        self.requests: list[int] = []
+        self._chunk: list[dict] = []
+
+    def upsert(self, rows, on_conflict, ignore_duplicates):
+        assert on_conflict == "idempotency_key"
+        assert ignore_duplicates is True
+        self._chunk = rows
+        return self
+
+    def execute(self):
+        self.requests.append(len(self._chunk))
+        inserted = [row for row in self._chunk if row["idempotency_key"] not in self.keys]
+        self.keys.update(row["idempotency_key"] for row in inserted)
+        return MagicMock(data=inserted)
+
+
+class TestEnqueueJobsBulk:
+    """Tests for bulk job enqueue."""
+
+    @pytest.fixture
+    def jobs_table(self, monkeypatch):
+        monkeypatch.setenv("JOB_ENQUEUE_CHUNK_SIZE", "100")
+        table = FakeJobsTable(existing_keys={"key-00003", "key-00150"})
+        supabase = MagicMock()
+        supabase.table.return_value = table
+        with patch("app.services.job_processor.get_supabase_client", return_value=supabase):
+            yield table
+
+    def test_chunks_and_counts_created(self, jobs_table):
+        rows = ({"idempotency_key": f"key-{i:05d}"} for i in range(250))
+
+        created = enqueue_jobs_bulk(rows)
+
+        assert created == 248
+        assert jobs_table.requests == [100, 100, 50]
+
+    def test_empty_rows_make_no_requests(self, jobs_table):
+        assert enqueue_jobs_bulk([]) == 0
+        assert jobs_table.requests == []
+
+    @patch("app.services.job_processor.iter_active_subscriber_ids")
+    def test_forecast_fan_out_is_bulk(self, mock_iter, jobs_table):
+        mock_iter.return_value = iter([f"user-{i:05d}" for i in range(250)])
+
+        created = enqueue_forecast_jobs_for_all_users(
+            "weekly", date(2026, 2, 1), date(2026, 2, 7)
+        )
+
+        assert created == 250
+        assert len(jobs_table.requests) == 3
+        assert "user-00000:weekly:2026-02-01" in jobs_table.keys
+
+
+class TestCheckAndEnqueueForActiveSubscriptions:
+    """Tests for the set-based subscription check."""
+
+    @pytest.fixture
+    def rpc(self, monkeypatch):
+        monkeypatch.setattr("app.services.job_processor._subscription_watermark", None)
+        monkeypatch.setattr("app.services.job_processor._last_full_subscription_scan", 0.0)
+        supabase = MagicMock()
+        with patch("app.services.job_processor.get_supabase_client", return_value=supabase), \
+                patch("app.services.job_processor._insert_jobs_chunk") as mock_bulk:
+            mock_bulk.side_effect = lambda _supabase, rows: len(rows)
+            yield supabase.rpc, mock_bulk
+
+    def test_full_then_incremental(self, rpc):
+        mock_rpc, mock_bulk = rpc
+        mock_rpc.return_value.execute.return_value = MagicMock(data=[{"user_id": "user-1"}])
+
+        assert check_and_enqueue_for_active_subscriptions() == 1
+        first_params = mock_rpc.call_args.args[1]
+        assert first_params["changed_since"] is None
+
+        mock_rpc.return_value.execute.return_value = MagicMock(data=[])
+        assert check_and_enqueue_for_active_subscriptions() == 0
+        second_params = mock_rpc.call_args.args[1]
+        assert second_params["changed_since"] is not None
+
+        # One RPC per check, no per-user queries
+        assert mock_rpc.call_count == 2
+        mock_bulk.assert_called()
+
+    def test_full_page_keeps_window(self, rpc, monkeypatch):
+        monkeypatch.setenv("SUBSCRIPTION_PAGE_SIZE", "2")
+        mock_rpc, _ = rpc
+        mock_rpc.return_value.execute.return_value = MagicMock(
+            data=[{"user_id": "user-1"}, {"user_id": "user-2"}]
+        )
+
+        check_and_enqueue_for_active_subscriptions()
+        check_and_enqueue_for_active_subscriptions()
+
+        # Still a full scan: the first page may have had more behind it
+        assert mock_rpc.call_args.args[1]["changed_since"] is None
+
+    def test_failed_chunk_not_counted_and_window_kept(self, rpc, monkeypatch):
+        monkeypatch.setenv("JOB_ENQUEUE_CHUNK_SIZE", "1")
+        mock_rpc, mock_bulk = rpc
+        mock_rpc.return_value.execute.return_value = MagicMock(
+            data=[{"user_id": "user-1"}, {"user_id": "user-2"}]
+        )
+        mock_bulk.side_effect = [1, None]
+
+        assert check_and_enqueue_for_active_subscriptions() == 1
+        assert [call.args[1][0]["user_id"] for call in mock_bulk.call_args_list] == ["user-1", "user-2"]
+
+        # user-2 is looked for again: the watermark did not move
+        mock_bulk.side_effect = lambda _supabase, rows: len(rows)
+        assert check_and_enqueue_for_active_subscriptions() == 2
+        assert mock_rpc.call_args.args[1]["changed_since"] is None
+
+
+    def test_overlapping_checks_run_one_at_a_time(self, rpc):
+        mock_rpc, _ = rpc
+        running, overlaps = [], []
+
+        def execute():
+            running.append(1)
+            overlaps.append(len(running))
+            time.sleep(0.05)
+            running.pop()
+            return MagicMock(data=[{"user_id": "user-1"}])
+
+        mock_rpc.return_value.execute.side_effect = execute
+        threads = [threading.Thread(target=check_and_enqueue_for_active_subscriptions) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert overlaps == [1, 1]
+        # The second check starts from the first one's watermark
+        assert mock_rpc.call_args_list[0].args[1]["changed_since"] is None
+        assert mock_rpc.call_args_list[1].args[1]["changed_since"] is not None
+
+
+class FakeForecastsTable:
+    """Expired forecasts with select-page and delete-in support."""
+
+    def __init__(self, rows: list[dict]):
+        self.rows = rows
+        self.deletes: list[int] = []
+        self._limit = None
+        self._delete = False
+
+    def select(self, *_args):
+        self._delete = False
+        return self
+
+    def lt(self, *_args):
+        return self
+
+    def order(self, *_args):
+        return self
+
+    def limit(self, n):
+        self._limit = n
+        return self
+
+    def delete(self):
+        self._delete = True
+        return self
+
+    def in_(self, _column, ids):
+        self._ids = set(ids)
+        return self
+
+    def execute(self):
+        if self._delete:
+            self.deletes.append(len(self._ids))
+            self.rows = [row for row in self.rows if row["id"] not in self._ids]
+            return MagicMock(data=[])
+        return MagicMock(data=self.rows[: self._limit])
+
+
+class TestCleanupExpiredForecasts:
+    """Tests for batched expired-forecast cleanup."""
+
+    @pytest.fixture
+    def storage(self, monkeypatch):
+        monkeypatch.setenv("CLEANUP_BATCH_SIZE", "10")
+        rows = [
+            {
+                "id": f"forecast-{i:03d}",
+                "audio_url": (
+                    f"https://x.supabase.co/storage/v1/object/public/forecasts-audio/user/{i}.mp3"
+                    if i % 2 else None
+                ),
+            }
+            for i in range(25)
+        ]
+        table = FakeForecastsTable(rows)
+        supabase = MagicMock()
+        supabase.table.return_value = table
+        with patch("app.services.job_processor.get_supabase_client", return_value=supabase):
+            yield table, supabase.storage.from_.return_value
+
+    def test_batches_storage_and_row_deletes(self, storage):
+        table, bucket = storage
+
+        assert cleanup_expired_forecasts() == 25
+        assert table.deletes == [10, 10, 5]
+        assert bucket.remove.call_count == 3
+        assert "user/1.mp3" in bucket.remove.call_args_list[0].args[0]
+
+    def test_time_budget_stops_early(self, storage, monkeypatch):
+        monkeypatch.setenv("CLEANUP_TIME_BUDGET_SECONDS", "0")
+        table, _ = storage
+
+        assert cleanup_expired_forecasts() == 0
+        assert len(table.rows) == 25
+
+
+class TestAudioStoragePath:
+    """Tests for audio_storage_path helper."""
+
+    def test_extracts_path(self):
+        url = "https://x.supabase.co/storage/v1/object/public/forecasts-audio/u1/f1.mp3?"
+        assert audio_storage_path(url) == "u1/f1.mp3"
+
+    def test_foreign_url(self):
+        assert audio_storage_path("https://example.com/audio.mp3") is None
+
+
+def async_supabase(forecasts: list[dict] = ()) -> MagicMock:
+    """Async client whose forecasts lookup returns forecasts; writes are recorded."""
+    supabase = MagicMock()
+    table = supabase.table.return_value
+    lookup = table.select.return_value.eq.return_value.eq.return_value.eq.return_value.limit.return_value
+    lookup.execute = AsyncMock(return_value=MagicMock(data=list(forecasts)))
+    table.upsert.return_value.execute = AsyncMock()
+    table.update.return_value.eq.return_value.execute = AsyncMock()
+    return supabase
+
+
+class TestDeferredForecastAudio:
+    """Forecast text delivered at once, audio filled in by generate_forecast_audio jobs."""
+
+    TEXT = "Uma semana de escuta e pequenos ajustes na rotina. " * 6
+
+    @pytest.fixture
+    def minimax_env(self, monkeypatch):
+        monkeypatch.setenv("MINIMAX_API_KEY", "test-key")
+        monkeypatch.setenv("MINIMAX_VOICE_ID", "voice")
+
+    @pytest.fixture
+    def forecast_job(self):
+        return {
+            "id": "job-00000020",
+            "user_id": "user-00000001",
+            "type": "generate_forecast",
+            "attempts": 1,
+            "payload": {"forecast_type": "weekly", "period_start": "2026-10-19", "period_end": "2026-10-25"},
+            "prompt": {"section": "forecast_weekly", "version": "1.0.0", "template": "{nome}"},
+        }
+
+    @pytest.fixture
+    def audio_job(self):
+        return {
+            "id": "job-00000021",
+            "user_id": "user-00000001",
+            "type": "generate_forecast_audio",
+            "attempts": 2,
+            "payload": {"forecast_type": "weekly", "period_start": "2026-10-19"},
+        }
+
+    @pytest.fixture
+    def synthesize(self):
+        with patch("app.services.audio_cache.get_or_synthesize_audio", new_callable=AsyncMock) as mock:
+            mock.return_value = ("https://storage/cache/abc.mp3", 41.6, "miss")
+            yield mock
+
+    async def forecast_job_run(self, forecast_job, job_db, stored: list[dict] = ()):
+        from app.models.forecast import ForecastContent
+
+        content = ForecastContent(titulo="Semana", resumo="Ajustes.", conteudo=self.TEXT)
+        supabase = async_supabase(stored)
+        with patch("app.services.generation_cache.generate_forecast_cached", new_callable=AsyncMock) as generate, \
+                patch("app.services.job_processor.get_async_supabase_client", return_value=supabase):
+            generate.return_value = (content, "miss")
+            await process_forecast_job(forecast_job)
+        return supabase
+
+    async def test_text_delivered_and_audio_job_enqueued(self, minimax_env, forecast_job, job_db, synthesize):
+        supabase = await self.forecast_job_run(forecast_job, job_db)
+
+        synthesize.assert_not_awaited()
+        forecast_row, audio_job_row = [call.args[0] for call in supabase.table.return_value.upsert.call_args_list]
+        assert forecast_row["delivered_at"]
+        assert (forecast_row["audio_url"], forecast_row["audio_duration_seconds"]) == (None, None)
+        assert audio_job_row["type"] == "generate_forecast_audio"
+        assert audio_job_row["priority"] == AUDIO_JOB_PRIORITY
+        assert audio_job_row == forecast_audio_job_row("user-00000001", "weekly", date(2026, 10, 19), self.TEXT)
+        assert job_db["update_job_completed"].call_args.args[1]["audio_deferred"] is True
+
+    async def test_rerun_with_same_text_keeps_audio(self, minimax_env, forecast_job, job_db, synthesize):
+        supabase = await self.forecast_job_run(forecast_job, job_db, [{"content": self.TEXT}])
+
+        forecast_row = supabase.table.return_value.upsert.call_args_list[0].args[0]
+        assert "audio_url" not in forecast_row
+        assert "audio_duration_seconds" not in forecast_row
+
+    async def test_rerun_with_new_text_clears_stale_audio(self, minimax_env, forecast_job, job_db, synthesize):
+        stored = [{"content": "Texto anterior, já narrado. " * 6}]
+
+        supabase = await self.forecast_job_run(forecast_job, job_db, stored)
+
+        forecast_row = supabase.table.return_value.upsert.call_args_list[0].args[0]
+        assert forecast_row["content"] == self.TEXT
+        assert (forecast_row["audio_url"], forecast_row["audio_duration_seconds"]) == (None, None)
+        lookup = supabase.table.return_value.select.return_value.eq
+        assert lookup.call_args.args == ("user_id", "user-00000001")
+        assert job_db["update_job_completed"].call_args.args[1]["audio_deferred"] is True
+
+    async def test_inline_audio_when_not_deferred(self, minimax_env, forecast_job, job_db, synthesize, monkeypatch):
+        monkeypatch.setenv("FORECAST_AUDIO_DEFERRED", "false")
+
+        supabase = await self.forecast_job_run(forecast_job, job_db)
+
+        synthesize.assert_awaited_once()
+        (forecast_row,) = [call.args[0] for call in supabase.table.return_value.upsert.call_args_list]
+        assert (forecast_row["audio_url"], forecast_row["audio_duration_seconds"]) == ("https://storage/cache/abc.mp3", 42)
+
+    async def test_no_audio_job_without_minimax(self, forecast_job, job_db, synthesize):
+        supabase = await self.forecast_job_run(forecast_job, job_db)
+
+        assert supabase.table.return_value.upsert.call_count == 1
+        assert job_db["update_job_completed"].call_args.args[1]["audio_deferred"] is False
+
+    def test_audio_job_key_follows_text(self):
+        first = forecast_audio_job_row("user-1", "weekly", date(2026, 10, 19), "Texto A")
+
+        assert first == forecast_audio_job_row("user-1", "weekly", date(2026, 10, 19), "Texto A")
+        assert first["idempotency_key"] != forecast_audio_job_row(
+            "user-1", "weekly", date(2026, 10, 19), "Texto B"
+        )["idempotency_key"]
+
+    async def test_audio_job_fills_in_forecast(self, minimax_env, audio_job, job_db, synthesize):
+        forecast = {"id": "forecast-1", "content": self.TEXT, "expires_at": "2027-01-17T10:00:00+00:00"}
+        supabase = async_supabase([forecast])
+
+        with patch("app.services.job_processor.get_async_supabase_client", return_value=supabase):
+            await process_forecast_audio_job(audio_job)
+
+        user_id, text, expires_at = synthesize.call_args.args
+        assert (user_id, text, expires_at.year) == ("user-00000001", self.TEXT, 2027)
+        supabase.table.return_value.update.assert_called_once_with(
+            {"audio_url": "https://storage/cache/abc.mp3", "audio_duration_seconds": 42}
+        )
+        assert job_db["update_job_completed"].call_args.args[1]["audio_cache"] == "miss"
+
+    async def test_audio_job_for_cleaned_up_forecast_skipped(self, minimax_env, audio_job, job_db, synthesize):
+        with patch("app.services.job_processor.get_async_supabase_client", return_value=async_supabase()):
+            await process_forecast_audio_job(audio_job)
+
+        synthesize.assert_not_awaited()
+        assert job_db["update_job_completed"].call_args.args[1]["skipped"] == "forecast_not_found"
+
+    async def test_audio_job_waits_out_open_circuit(self, minimax_env, audio_job, job_db, synthesize, monkeypatch):
+        from app.services.minimax_service import get_minimax_breaker
+
+        monkeypatch.setenv("MINIMAX_BREAKER_FAILURE_THRESHOLD", "1")
+        monkeypatch.setenv("MINIMAX_BREAKER_RECOVERY_SECONDS", "90")
+        with pytest.raises(httpx.ConnectError):
+            with get_minimax_breaker().guard():
+                raise httpx.ConnectError("down")
+
+        with patch("app.services.job_processor.defer_job", new_callable=AsyncMock) as defer:
+            await process_forecast_audio_job(audio_job)
+
+        synthesize.assert_not_awaited()
+        job_db["update_job_failed"].assert_not_awaited()
+        job_id, delay, attempts = defer.call_args.args
+        assert (job_id, attempts) == ("job-00000021", 2)
+        assert 80 < delay <= 90
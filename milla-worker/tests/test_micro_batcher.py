@@ -0,0 +1,95 @@
+"""
+Tests for the micro-batcher and batched forecast generation.
+"""
+import asyncio
+
+import pytest
+
+from app.services.micro_batcher import MicroBatcher
+
+
+def make_batcher(batch_size=3, window=0.01, fail=()):
+    calls = {"batches": [], "singles": []}
+
+    async def run_batch(items):
+        calls["batches"].append(list(items))
+        return [ValueError("bad") if item in fail else item * 10 for item in items]
+
+    async def run_single(item):
+        calls["singles"].append(item)
+        return item * 100
+
+    return MicroBatcher("test", batch_size, window, run_batch, run_single), calls
+
+
+class TestMicroBatcher:
+    """Tests for MicroBatcher."""
+
+    async def test_concurrent_submits_share_batches(self):
+        batcher, calls = make_batcher(batch_size=3)
+
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(1, 8)))
+
+        assert results == [10, 20, 30, 40, 50, 60, 700]
+        assert [len(batch) for batch in calls["batches"]] == [3, 3]
+        # A lone leftover item goes through run_single
+        assert calls["singles"] == [7]
+        assert batcher.stats()["batches"] == 3
+
+    async def test_failed_elements_retried_single(self):
+        batcher, calls = make_batcher(batch_size=3, fail={2})
+
+        results = await asyncio.gather(*(batcher.submit(i) for i in (1, 2, 3)))
+
+        assert results == [10, 200, 30]
+        assert calls["singles"] == [2]
+        assert batcher.stats()["fallbacks"] == 1
+
+    async def test_whole_batch_failure_falls_back(self):
+        async def run_batch(items):
+            raise RuntimeError("upstream down")
+
+        async def run_single(item):
+            if item == 2:
+                raise ValueError("still bad")
+            return item
+
+        batcher = MicroBatcher("test", 2, 0.01, run_batch, run_single)
+        results = await asyncio.gather(*(batcher.submit(i) for i in (1, 2)), return_exceptions=True)
+
+        assert results[0] == 1
+        assert isinstance(results[1], ValueError)
+
+
+class TestForecastBatching:
+    """Batched forecast prompts against the fake OpenAI server."""
+
+    @pytest.fixture
+    async def fake_openai(self, monkeypatch):
+        from app.config import get_settings
+        from app.services.http_transport import close_http_client
+        from tests.fake_servers import fake_openai_app, serve
+
+        with serve(fake_openai_app(invalid_items=frozenset({2}))) as base_url:
+            monkeypatch.setenv("OPENAI_BASE_URL", f"{base_url}/v1")
+            monkeypatch.setenv("FORECAST_BATCH_SIZE", "4")
+            get_settings.cache_clear()
+            yield
+            await close_http_client()
+
+    async def test_batch_splits_invalid_items_into_single_retries(self, fake_openai):
+        from app.services.forecast_generator import (
+            forecast_batching_stats,
+            get_forecast_batcher,
+            reset_forecast_usage,
+        )
+
+        reset_forecast_usage()
+        batcher = get_forecast_batcher()
+        results = await asyncio.gather(*(batcher.submit(f"prompt {i}") for i in range(4)))
+
+        assert [r.titulo for r in results] == ["Semana 1", "Semana 1", "Semana 3", "Semana 4"]
+        stats = forecast_batching_stats()
+        assert stats["requests"] == 2
+        assert stats["fallbacks"] == 1
+        assert stats["completion_tokens"] > 0
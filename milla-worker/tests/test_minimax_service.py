@@ -1,15 +1,37 @@
 """
 Tests for minimax_service TTS service.
 """
+import asyncio
+import time
+
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 import httpx
+from tenacity import wait_none
 
+from app.services.circuit_breaker import CircuitOpenError
+from app.services.http_transport import close_http_client
 from app.services.minimax_service import (
+    SpeechStream,
+    get_minimax_breaker,
     synthesize_speech,
+    synthesize_speech_async,
+    synthesize_long_speech_async,
+    split_text_for_speech,
+    stream_speech_async,
+    upload_audio_stream_async,
     upload_audio_to_storage,
     estimate_audio_duration,
 )
+from app.services.mp3 import join_mp3, mp3_duration
+from tests.fake_servers import (
+    MP3_FRAME_HEADER,
+    fake_minimax_app,
+    fake_mp3,
+    fake_storage_app,
+    json_app,
+    serve,
+)
 
 
 class TestSynthesizeSpeech:
@@ -25,9 +47,9 @@ class TestSynthesizeSpeech:
         with pytest.raises(ValueError, match="Minimax not configured"):
             synthesize_speech("Test text")
     
-    @patch("app.services.minimax_service.httpx.Client")
+    @patch("app.services.minimax_service.get_http_client")
     @patch("app.services.minimax_service.get_settings")
-    def test_synthesize_speech_success(self, mock_settings, mock_client_class):
+    def test_synthesize_speech_success(self, mock_settings, mock_get_client):
         """Test successful speech synthesis."""
         # Setup settings mock
         settings = MagicMock()
@@ -35,11 +57,14 @@ class TestSynthesizeSpeech:
         settings.minimax_voice_id = "test-voice-id"
         settings.minimax_group_id = "test-group-id"
         settings.minimax_timeout_seconds = 60
+        settings.minimax_breaker_failure_threshold = 5
+        settings.minimax_breaker_recovery_seconds = 30
+        settings.minimax_concurrency = 4
         mock_settings.return_value = settings
         
-        # Setup HTTP client mock
-        mock_client = MagicMock()
-        mock_client_class.return_value.__enter__.return_value = mock_client
+        # Setup shared HTTP client mock
+        mock_client = AsyncMock()
+        mock_get_client.return_value = mock_client
         
         # Create hex-encoded MP3 header (fake audio data)
         fake_audio_hex = "494433" + "00" * 100  # ID3 tag + padding
@@ -59,9 +84,9 @@ class TestSynthesizeSpeech:
         assert len(result) > 0
         mock_client.post.assert_called_once()
         
-    @patch("app.services.minimax_service.httpx.Client")
+    @patch("app.services.minimax_service.get_http_client")
     @patch("app.services.minimax_service.get_settings")
-    def test_synthesize_speech_api_error(self, mock_settings, mock_client_class):
+    def test_synthesize_speech_api_error(self, mock_settings, mock_get_client):
         """Test handling of API error response."""
         # Setup settings
         settings = MagicMock()
@@ -69,11 +94,14 @@ class TestSynthesizeSpeech:
         settings.minimax_voice_id = "test-voice-id"
         settings.minimax_group_id = "test-group-id"
         settings.minimax_timeout_seconds = 60
+        settings.minimax_breaker_failure_threshold = 5
+        settings.minimax_breaker_recovery_seconds = 30
+        settings.minimax_concurrency = 4
         mock_settings.return_value = settings
         
         # Setup error response
-        mock_client = MagicMock()
-        mock_client_class.return_value.__enter__.return_value = mock_client
+        mock_client = AsyncMock()
+        mock_get_client.return_value = mock_client
         mock_response = MagicMock()
         mock_response.json.return_value = {
             "base_resp": {"status_code": 2049, "status_msg": "invalid api key"}
@@ -93,13 +121,16 @@ class TestSynthesizeSpeech:
         settings.minimax_voice_id = "test-voice"
         settings.minimax_group_id = "test-group"
         settings.minimax_timeout_seconds = 60
+        settings.minimax_breaker_failure_threshold = 5
+        settings.minimax_breaker_recovery_seconds = 30
+        settings.minimax_concurrency = 4
         mock_settings.return_value = settings
         
         long_text = "A" * 3000  # Longer than 2000 char limit
         
-        with patch("app.services.minimax_service.httpx.Client") as mock_client_class:
-            mock_client = MagicMock()
-            mock_client_class.return_value.__enter__.return_value = mock_client
+        with patch("app.services.minimax_service.get_http_client") as mock_get_client:
+            mock_client = AsyncMock()
+            mock_get_client.return_value = mock_client
             mock_response = MagicMock()
             mock_response.json.return_value = {
                 "base_resp": {"status_code": 0},
@@ -119,13 +150,14 @@ class TestSynthesizeSpeech:
 class TestUploadAudioToStorage:
     """Tests for upload_audio_to_storage function."""
     
-    @patch("app.services.minimax_service.get_supabase_client")
+    @patch("app.services.minimax_service.get_async_supabase_client", new_callable=AsyncMock)
     def test_upload_audio_success(self, mock_supabase):
         """Test successful audio upload."""
         mock_client = MagicMock()
         mock_supabase.return_value = mock_client
-        mock_client.storage.from_.return_value.upload.return_value = {"Key": "test-path"}
-        mock_client.storage.from_.return_value.get_public_url.return_value = "https://example.com/audio.mp3"
+        mock_bucket = mock_client.storage.from_.return_value
+        mock_bucket.upload = AsyncMock(return_value={"Key": "test-path"})
+        mock_bucket.get_public_url = AsyncMock(return_value="https://example.com/audio.mp3")
         
         result = upload_audio_to_storage(
             audio_bytes=b"fake-audio-data",
@@ -136,12 +168,12 @@ class TestUploadAudioToStorage:
         assert result == "https://example.com/audio.mp3"
         mock_client.storage.from_.assert_called_with("forecasts-audio")
     
-    @patch("app.services.minimax_service.get_supabase_client")
+    @patch("app.services.minimax_service.get_async_supabase_client", new_callable=AsyncMock)
     def test_upload_audio_failure(self, mock_supabase):
         """Test handling of upload failure."""
         mock_client = MagicMock()
         mock_supabase.return_value = mock_client
-        mock_client.storage.from_.return_value.upload.side_effect = Exception("Upload failed")
+        mock_client.storage.from_.return_value.upload = AsyncMock(side_effect=Exception("Upload failed"))
         
         result = upload_audio_to_storage(
             audio_bytes=b"fake-audio-data",
@@ -173,3 +205,306 @@ class TestEstimateAudioDuration:
         """Test duration estimate for empty text."""
         result = estimate_audio_duration("")
         assert result == 0
+
+
+class TestSplitTextForSpeech:
+    """Tests for split_text_for_speech function."""
+    
+    def test_splits_between_sentences(self):
+        """Chunks end at sentence boundaries and keep every word in order."""
+        text = " ".join(f"Frase número {i}, com algum conteúdo para ouvir." for i in range(100))
+        
+        chunks = split_text_for_speech(text, 500)
+        
+        assert all(len(chunk) <= 500 for chunk in chunks)
+        assert all(chunk.endswith(".") for chunk in chunks)
+        assert " ".join(chunks) == text
+    
+    def test_long_sentence_split_at_clauses_then_words(self):
+        """A sentence longer than a chunk is cut at commas, then between words."""
+        clauses = ", ".join(["uma parte " * 8] * 5) + "fim."
+        
+        chunks = split_text_for_speech(clauses, 120)
+        
+        assert all(len(chunk) <= 120 for chunk in chunks)
+        assert all(chunk.endswith(",") for chunk in chunks[:-1])
+        assert " ".join(split_text_for_speech("palavra " * 100, 120)).split() == ["palavra"] * 100
+    
+    def test_never_above_api_limit(self):
+        """Chunk size is capped at the API limit."""
+        chunks = split_text_for_speech("Uma frase curta. " * 1000, 50000)
+        assert max(len(chunk) for chunk in chunks) <= 2000
+
+
+class TestSynthesizeLongSpeech:
+    """Tests for synthesize_long_speech_async against the fake Minimax server."""
+    
+    @pytest.fixture(autouse=True)
+    def minimax_env(self, monkeypatch):
+        monkeypatch.setenv("MINIMAX_API_KEY", "test-key")
+        monkeypatch.setenv("MINIMAX_VOICE_ID", "voice")
+        monkeypatch.setenv("MINIMAX_GROUP_ID", "group")
+        monkeypatch.setenv("MINIMAX_CHUNK_MAX_CHARS", "1000")
+        monkeypatch.setenv("MINIMAX_CONCURRENCY", "4")
+    
+    async def test_full_text_in_order_with_exact_duration(self, monkeypatch):
+        """A 10,000-char forecast is fully voiced and joined in text order."""
+        text = " ".join(f"Trecho {i} da previsão, com calma e atenção ao ritmo." for i in range(180))
+        app = fake_minimax_app(seconds_per_char=0.00002)
+        
+        with serve(app) as base_url:
+            monkeypatch.setenv("MINIMAX_BASE_URL", base_url)
+            audio, duration = await synthesize_long_speech_async(text)
+        await close_http_client()
+        
+        chunks = split_text_for_speech(text, 1000)
+        assert len(chunks) > 1
+        assert sorted(app.state.texts) == sorted(chunks)
+        
+        # One stream of audio frames: no per-chunk ID3/Info headers left
+        expected = [fake_mp3(len(chunk) / 15) for chunk in chunks]
+        assert audio == b"".join(join_mp3([data])[0] for data in expected)
+        assert audio[:4] == MP3_FRAME_HEADER
+        assert duration == pytest.approx(mp3_duration(audio))
+        assert duration == pytest.approx(len(text) / 15, rel=0.02)
+
+
+    async def test_concurrency_cap_shared_by_jobs(self, monkeypatch):
+        """Several audio jobs together stay within minimax_concurrency calls."""
+        monkeypatch.setenv("MINIMAX_CONCURRENCY", "2")
+        text = " ".join(f"Trecho {i} da previsão, com calma e atenção ao ritmo." for i in range(90))
+        app = fake_minimax_app(base_latency=0.02)
+        
+        async def consume(speech):
+            return [piece async for piece in speech]
+        
+        with serve(app) as base_url:
+            monkeypatch.setenv("MINIMAX_BASE_URL", base_url)
+            await asyncio.gather(*(synthesize_long_speech_async(text) for _ in range(3)))
+            speeches = [SpeechStream(text) for _ in range(3)]
+            await asyncio.gather(*(consume(speech) for speech in speeches))
+        await close_http_client()
+        
+        assert len(app.state.texts) == 6 * len(split_text_for_speech(text, 1000))
+        assert app.state.max_in_flight == 2
+    
+    async def test_failed_chunk_cancels_the_others(self):
+        """The first failure stops the remaining chunks instead of paying for them."""
+        text = " ".join(f"Trecho {i} da previsão, com calma e atenção ao ritmo." for i in range(180))
+        started, finished = [], []
+        
+        async def synthesize(chunk):
+            started.append(chunk)
+            if len(started) == 1:
+                raise httpx.HTTPStatusError("400", request=MagicMock(), response=MagicMock(status_code=400))
+            await asyncio.sleep(0.05)
+            finished.append(chunk)
+        
+        with patch("app.services.minimax_service.synthesize_speech_async", synthesize):
+            with pytest.raises(httpx.HTTPStatusError):
+                await synthesize_long_speech_async(text)
+            # Long enough for any chunk left running to finish
+            await asyncio.sleep(0.2)
+        
+        # Chunks in flight or waiting for a slot were cancelled
+        assert finished == []
+
+
+class TestMinimaxOutage:
+    """Error-aware retries and the Minimax circuit breaker."""
+
+    @pytest.fixture(autouse=True)
+    def minimax_env(self, monkeypatch):
+        monkeypatch.setenv("MINIMAX_API_KEY", "test-key")
+        monkeypatch.setenv("MINIMAX_VOICE_ID", "voice")
+        monkeypatch.setenv("MINIMAX_GROUP_ID", "group")
+        monkeypatch.setenv("MINIMAX_BREAKER_FAILURE_THRESHOLD", "2")
+        monkeypatch.setenv("MINIMAX_BREAKER_RECOVERY_SECONDS", "0.2")
+        monkeypatch.setattr(synthesize_speech_async.retry, "wait", wait_none())
+        monkeypatch.setattr("app.services.minimax_service.STREAM_RETRY_WAIT_SECONDS", 0)
+
+    @pytest.mark.parametrize("status, requests", [(400, 1), (401, 1), (429, 3), (503, 3)])
+    async def test_only_transient_statuses_retried(self, monkeypatch, status, requests):
+        monkeypatch.setenv("MINIMAX_BREAKER_FAILURE_THRESHOLD", "0")
+        app = fake_minimax_app()
+        app.state.fail_status = status
+
+        with serve(app) as base_url:
+            monkeypatch.setenv("MINIMAX_BASE_URL", base_url)
+            with pytest.raises(httpx.HTTPStatusError):
+                await synthesize_speech_async("Texto")
+        await close_http_client()
+
+        assert len(app.state.texts) == requests
+
+    async def test_outage_fails_fast_then_recovers(self, monkeypatch):
+        app = fake_minimax_app()
+        app.state.fail_status = 503
+
+        with serve(app) as base_url:
+            monkeypatch.setenv("MINIMAX_BASE_URL", base_url)
+
+            # Two failed attempts open the circuit; the third is not sent
+            with pytest.raises(CircuitOpenError):
+                await synthesize_speech_async("Texto")
+            assert len(app.state.texts) == 2
+
+            started = time.perf_counter()
+            with pytest.raises(CircuitOpenError):
+                await synthesize_long_speech_async("Uma frase. Outra frase.")
+            assert time.perf_counter() - started < 0.05
+            assert len(app.state.texts) == 2
+
+            # Minimax back: after recovery_seconds a probe closes the circuit
+            app.state.fail_status = None
+            await asyncio.sleep(0.25)
+            assert get_minimax_breaker().state == "half_open"
+            assert await synthesize_speech_async("Texto")
+        await close_http_client()
+
+        stats = get_minimax_breaker().stats()
+        assert stats["state"] == "closed"
+        assert (stats["opened"], stats["rejected"]) == (1, 2)
+
+    async def test_stream_counts_towards_breaker(self, monkeypatch):
+        app = fake_minimax_app()
+        app.state.fail_status = 502
+
+        with serve(app) as base_url:
+            monkeypatch.setenv("MINIMAX_BASE_URL", base_url)
+            # Two failed attempts open the circuit; the third is not sent
+            with pytest.raises(CircuitOpenError):
+                async for _ in stream_speech_async("Texto"):
+                    pass
+        await close_http_client()
+
+        assert len(app.state.texts) == 2
+
+    @pytest.mark.parametrize("status, fail_count, requests", [(503, 2, 3), (400, 1, 1)])
+    async def test_stream_retries_transient_errors(self, monkeypatch, status, fail_count, requests):
+        monkeypatch.setenv("MINIMAX_BREAKER_FAILURE_THRESHOLD", "0")
+        app = fake_minimax_app()
+        app.state.fail_status = status
+        app.state.fail_count = fail_count
+
+        with serve(app) as base_url:
+            monkeypatch.setenv("MINIMAX_BASE_URL", base_url)
+            if status == 400:
+                with pytest.raises(httpx.HTTPStatusError):
+                    async for _ in stream_speech_async("Texto"):
+                        pass
+            else:
+                pieces = [piece async for piece in stream_speech_async("Texto")]
+                assert b"".join(pieces) == fake_mp3(5 / 15)
+        await close_http_client()
+
+        assert len(app.state.texts) == requests
+
+    async def test_stream_not_retried_after_first_piece(self):
+        attempts = 0
+
+        async def cut_short(text):
+            nonlocal attempts
+            attempts += 1
+            yield b"inicio"
+            raise httpx.ReadTimeout("stalled")
+
+        pieces = []
+        with patch("app.services.minimax_service._stream_speech_once", cut_short):
+            with pytest.raises(httpx.ReadTimeout):
+                async for piece in stream_speech_async("Texto"):
+                    pieces.append(piece)
+
+        # A retry would send the start of the audio twice
+        assert pieces == [b"inicio"]
+        assert attempts == 1
+
+
+class TestStreamingSpeechUpload:
+    """Tests for stream_speech_async, SpeechStream and upload_audio_stream_async."""
+    
+    TEXT = " ".join(f"Trecho {i} da previsão, com calma e atenção ao ritmo." for i in range(90))
+    
+    @pytest.fixture(autouse=True)
+    def minimax_env(self, monkeypatch):
+        monkeypatch.setenv("MINIMAX_API_KEY", "test-key")
+        monkeypatch.setenv("MINIMAX_VOICE_ID", "voice")
+        monkeypatch.setenv("MINIMAX_GROUP_ID", "group")
+        monkeypatch.setenv("MINIMAX_CHUNK_MAX_CHARS", "1000")
+        monkeypatch.setenv("MINIMAX_CONCURRENCY", "2")
+    
+    async def test_stream_decodes_pieces_without_aggregated_audio(self, monkeypatch):
+        """Pieces add up to the audio once; the final aggregated copy is not requested."""
+        app = fake_minimax_app(stream_piece_bytes=4096)
+        
+        with serve(app) as base_url:
+            monkeypatch.setenv("MINIMAX_BASE_URL", base_url)
+            pieces = [piece async for piece in stream_speech_async("Olá. " * 100)]
+        await close_http_client()
+        
+        assert len(pieces) > 1
+        assert b"".join(pieces) == fake_mp3(500 / 15)
+    
+    async def test_streamed_upload_matches_joined_audio(self, monkeypatch):
+        """What reaches Storage is the same MP3 the buffered path would build."""
+        minimax, storage = fake_minimax_app(), fake_storage_app()
+        
+        with serve(minimax) as minimax_url, serve(storage) as storage_url:
+            monkeypatch.setenv("MINIMAX_BASE_URL", minimax_url)
+            monkeypatch.setenv("SUPABASE_URL", storage_url)
+            speech = SpeechStream(self.TEXT)
+            url = await upload_audio_stream_async(speech, "user-123", "forecast-456")
+        await close_http_client()
+        
+        expected, seconds = join_mp3([fake_mp3(len(chunk) / 15) for chunk in speech.chunks])
+        assert storage.state.uploads["forecasts-audio/user-123/forecast-456.mp3"] == expected
+        assert url.endswith("/storage/v1/object/public/forecasts-audio/user-123/forecast-456.mp3")
+        assert speech.duration == pytest.approx(seconds)
+    
+    async def test_upload_starts_before_synthesis_finishes(self, monkeypatch):
+        minimax, storage = fake_minimax_app(), fake_storage_app()
+        started_mid_synthesis = None
+        
+        async def audio(speech):
+            nonlocal started_mid_synthesis
+            async for piece in speech:
+                yield piece
+                if started_mid_synthesis is None:
+                    while not storage.state.received:
+                        await asyncio.sleep(0.005)
+                    # Chunks past the concurrency limit wait for the first one to be consumed
+                    started_mid_synthesis = len(minimax.state.texts) < len(speech.chunks)
+        
+        with serve(minimax) as minimax_url, serve(storage) as storage_url:
+            monkeypatch.setenv("MINIMAX_BASE_URL", minimax_url)
+            monkeypatch.setenv("SUPABASE_URL", storage_url)
+            speech = SpeechStream(self.TEXT)
+            url = await asyncio.wait_for(upload_audio_stream_async(audio(speech), "user-123", "forecast-456"), 10)
+        await close_http_client()
+        
+        assert url
+        assert len(speech.chunks) > 2
+        assert started_mid_synthesis is True
+    
+    async def test_synthesis_error_raised_not_swallowed(self, monkeypatch):
+        """A Minimax outage must reach the job (to defer it), not look like a failed upload."""
+        storage = fake_storage_app()
+        
+        async def audio():
+            yield fake_mp3(1)
+            raise CircuitOpenError("minimax", 30)
+        
+        with serve(storage) as storage_url:
+            monkeypatch.setenv("SUPABASE_URL", storage_url)
+            with pytest.raises(CircuitOpenError):
+                await upload_audio_stream_async(audio(), "user-123", "forecast-456")
+        await close_http_client()
+    
+    async def test_storage_error_returns_none(self, monkeypatch):
+        async def audio():
+            yield fake_mp3(1)
+        
+        with serve(json_app({"error": "unavailable"}, status=503)) as storage_url:
+            monkeypatch.setenv("SUPABASE_URL", storage_url)
+            assert await upload_audio_stream_async(audio(), "user-123", "forecast-456") is None
+        await close_http_client()
@@ -0,0 +1,48 @@
+"""
+Tests for MP3 frame parsing and joining.
+"""
+import pytest
+
+from app.services.mp3 import iter_frames, join_mp3, mp3_duration, parse_header
+from tests.fake_servers import MP3_FRAME_HEADER, MP3_FRAME_SECONDS, MP3_FRAME_SIZE, fake_mp3
+
+
+class TestParseHeader:
+    """Tests for parse_header."""
+
+    def test_mpeg1_layer3(self):
+        frame = parse_header(MP3_FRAME_HEADER)
+        assert (frame.length, frame.samples, frame.sample_rate) == (MP3_FRAME_SIZE, 1152, 32000)
+
+    def test_mpeg2_with_padding(self):
+        # MPEG-2 Layer III, 64 kbps, 24 kHz, padded, stereo
+        frame = parse_header(b"\xff\xf3\x86\x00")
+        assert (frame.length, frame.samples, frame.sample_rate) == (72 * 64000 // 24000 + 1, 576, 24000)
+
+    def test_rejects_non_layer3(self):
+        assert parse_header(b"\xff\xfd\x98\xc4") is None  # Layer II
+        assert parse_header(b"ID3\x04") is None
+
+
+class TestJoinMp3:
+    """Tests for iter_frames, mp3_duration and join_mp3."""
+
+    def test_skips_tags_and_info_frame(self):
+        data = fake_mp3(10 * MP3_FRAME_SECONDS) + b"TAG" + b"\x00" * 125
+
+        assert len(list(iter_frames(data))) == 11  # Info frame + 10 audio frames
+        assert mp3_duration(data) == pytest.approx(10 * MP3_FRAME_SECONDS)
+
+    def test_join_keeps_only_audio_frames_in_order(self):
+        first = fake_mp3(3 * MP3_FRAME_SECONDS)
+        second = fake_mp3(5 * MP3_FRAME_SECONDS).replace(MP3_FRAME_HEADER + b"\x00", MP3_FRAME_HEADER + b"\x01")
+
+        joined, seconds = join_mp3([first, second])
+
+        assert len(joined) == 8 * MP3_FRAME_SIZE
+        assert [joined[i * MP3_FRAME_SIZE + 4] for i in range(8)] == [0] * 3 + [1] * 5
+        assert seconds == pytest.approx(8 * MP3_FRAME_SECONDS)
+
+    def test_resyncs_after_junk(self):
+        data = b"\x00\x01junk" + fake_mp3(2 * MP3_FRAME_SECONDS)
+        assert mp3_duration(data) == pytest.approx(2 * MP3_FRAME_SECONDS)
@@ -0,0 +1,99 @@
+"""
+Tests for openai_service reading generation.
+"""
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.services.openai_service import generate_reading_bundle_async, parse_reading
+
+
+def valid_reading(arcano="O Mago"):
+    return {
+        "arcano": arcano,
+        "titulo": "O Início",
+        "interpretacao": "Este arcano sugere potencial e iniciativa para novos caminhos. " * 4,
+        "sombra": "A insegurança pode atrasar decisões importantes para o seu crescimento.",
+        "conselho": "Escolha um pequeno passo concreto hoje e observe o que ele desperta.",
+    }
+
+
+def completion(payload):
+    message = MagicMock(content=json.dumps(payload))
+    return MagicMock(choices=[MagicMock(message=message)])
+
+
+@pytest.fixture
+def openai_client():
+    client = MagicMock()
+    client.chat.completions.create = AsyncMock()
+    with patch("app.services.openai_service.get_async_openai_client", return_value=client):
+        yield client
+
+
+SECTIONS = {
+    section: {
+        "prompt_template": "Seção {ponto_nome} ({ponto_valor}, {arcano}) para {nome}",
+        "ponto_nome": section,
+        "ponto_valor": 1,
+        "arcano": "O Mago",
+    }
+    for section in ["missao_da_alma", "destino", "proposito"]
+}
+
+
+class TestParseReading:
+    """Tests for parse_reading function."""
+
+    def test_carta_alias(self):
+        data = valid_reading()
+        data["carta"] = data.pop("arcano")
+        assert parse_reading(data).arcano == "O Mago"
+
+    def test_not_an_object(self):
+        with pytest.raises(ValueError):
+            parse_reading(None)
+
+
+class TestGenerateReadingBundle:
+    """Tests for generate_reading_bundle_async function."""
+
+    async def test_all_sections_in_one_call(self, openai_client):
+        openai_client.chat.completions.create.return_value = completion(
+            {section: valid_reading() for section in SECTIONS}
+        )
+
+        readings, errors = await generate_reading_bundle_async("Fabio", SECTIONS)
+
+        assert set(readings) == set(SECTIONS)
+        assert errors == {}
+        assert openai_client.chat.completions.create.await_count == 1
+        prompt = openai_client.chat.completions.create.call_args.kwargs["messages"][1]["content"]
+        assert "### destino" in prompt and "para Fabio" in prompt
+
+    async def test_only_failed_sections_are_regenerated(self, openai_client):
+        bad = {**valid_reading(), "interpretacao": "curta"}
+        openai_client.chat.completions.create.side_effect = [
+            completion({"missao_da_alma": valid_reading(), "destino": bad, "proposito": valid_reading()}),
+            completion({"destino": valid_reading("A Sacerdotisa")}),
+        ]
+
+        readings, errors = await generate_reading_bundle_async("Fabio", SECTIONS)
+
+        assert errors == {}
+        assert readings["destino"].arcano == "A Sacerdotisa"
+        retry_prompt = openai_client.chat.completions.create.call_args.kwargs["messages"][1]["content"]
+        assert "### destino" in retry_prompt
+        assert "### missao_da_alma" not in retry_prompt
+
+    async def test_gives_up_after_max_rounds(self, openai_client):
+        openai_client.chat.completions.create.return_value = completion(
+            {"missao_da_alma": valid_reading(), "destino": valid_reading()}
+        )
+
+        readings, errors = await generate_reading_bundle_async("Fabio", SECTIONS, max_rounds=2)
+
+        assert set(readings) == {"missao_da_alma", "destino"}
+        assert set(errors) == {"proposito"}
+        assert openai_client.chat.completions.create.await_count == 2
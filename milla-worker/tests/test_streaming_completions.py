@@ -0,0 +1,142 @@
+"""
+Tests for streamed completions with early abort.
+
+End-to-end cases stream from the local fake OpenAI server.
+"""
+import json
+
+import pytest
+
+from app.models.forecast import ForecastContent
+from app.models.reading import ReadingContent
+from app.services.forecast_generator import generate_forecast_from_prompt_async
+from app.services.http_transport import close_http_client
+from app.services.streaming_completions import (
+    StreamingJsonValidator,
+    reset_streaming_stats,
+    streaming_stats,
+)
+from app.services.structured_outputs import reset_completions_stats, track_job_completions
+from tests.fake_servers import fake_openai_app, serve
+
+
+@pytest.fixture(autouse=True)
+async def clean_stats():
+    reset_streaming_stats()
+    reset_completions_stats()
+    yield
+    reset_streaming_stats()
+    reset_completions_stats()
+    await close_http_client()
+
+
+def feed_in_pieces(validator: StreamingJsonValidator, text: str, size: int):
+    for start in range(0, len(text), size):
+        reason = validator.feed(text[start:start + size])
+        if reason:
+            return reason
+    return None
+
+
+class TestStreamingJsonValidator:
+    """Tests for StreamingJsonValidator."""
+
+    def test_valid_object_in_tiny_pieces(self):
+        payload = {
+            "titulo": 'Semana "nova"\né aqui',
+            "resumo": "Ajustes \\ pausas.",
+            "conteudo": "Um período de escuta. " * 20,
+        }
+        text = json.dumps(payload)
+        validator = StreamingJsonValidator(ForecastContent, check_forbidden_terms=False)
+
+        # Escapes (including é) are split across pieces
+        assert feed_in_pieces(validator, text, 3) is None
+        assert validator.fields == payload
+
+    def test_max_length_aborts_mid_field(self):
+        text = json.dumps({"titulo": "x" * 500, "resumo": "r", "conteudo": "c" * 300})
+        validator = StreamingJsonValidator(ForecastContent, check_forbidden_terms=False)
+
+        pieces = [text[i:i + 16] for i in range(0, len(text), 16)]
+        reasons = [validator.feed(piece) for piece in pieces]
+        aborted_at = next(i for i, reason in enumerate(reasons) if reason)
+
+        assert reasons[aborted_at] == "max_length: titulo > 80"
+        assert aborted_at < 10  # well before the end of the 500-char titulo
+
+    def test_surrogate_pair_counts_as_one_character(self):
+        titulo = "x" * 75 + "🌙" * 5  # 80 characters, the limit; 85 UTF-16 units
+        text = json.dumps({"titulo": titulo, "resumo": "r", "conteudo": "c" * 300})
+        assert "\\ud83c\\udf19" in text
+
+        for size in (1, 3, 7):
+            validator = StreamingJsonValidator(ForecastContent, check_forbidden_terms=False)
+            assert feed_in_pieces(validator, text, size) is None
+            assert validator.fields["titulo"] == titulo
+
+        overlong = json.dumps({"titulo": titulo + "🌙", "resumo": "r", "conteudo": "c" * 300})
+        validator = StreamingJsonValidator(ForecastContent, check_forbidden_terms=False)
+        assert feed_in_pieces(validator, overlong, 5) == "max_length: titulo > 80"
+
+    def test_lone_surrogate_kept(self):
+        validator = StreamingJsonValidator(ForecastContent, check_forbidden_terms=False)
+
+        assert validator.feed('{"titulo": "a\\ud83cb\\u00e9", ') is None
+        assert validator.fields["titulo"] == "a\ud83cbé"
+
+    def test_min_length_checked_when_field_closes(self):
+        validator = StreamingJsonValidator(ForecastContent, check_forbidden_terms=False)
+
+        assert validator.feed('{"titulo": "Semana", "resumo": "R", "conteudo": "cur') is None
+        assert validator.feed('to", ') == "min_length: conteudo < 200"
+
+    def test_forbidden_terms_only_when_not_repairable(self):
+        text = '{"arcano": "O Mago", "titulo": "T", "interpretacao": "Você vai certamente'
+
+        assert StreamingJsonValidator(ReadingContent, check_forbidden_terms=False).feed(text) is None
+        assert StreamingJsonValidator(ReadingContent, check_forbidden_terms=True).feed(text) == (
+            "forbidden_term: interpretacao 'você vai'"
+        )
+
+    def test_unexpected_shape_left_to_final_validation(self):
+        validator = StreamingJsonValidator(ForecastContent, check_forbidden_terms=False)
+
+        assert validator.feed('{"titulo": ["x"' + ', "y"' * 100) is None
+
+
+class TestCreateCompletion:
+    """Early abort against the fake server."""
+
+    async def test_overlong_forecast_aborted_and_retried(self, monkeypatch):
+        monkeypatch.setenv("STREAMING_VALIDATION_ENABLED", "true")
+        app = fake_openai_app(seconds_per_token=0.0005, overlong_every=2)
+
+        with serve(app) as base_url:
+            monkeypatch.setenv("OPENAI_BASE_URL", f"{base_url}/v1")
+            first = await generate_forecast_from_prompt_async("prompt")
+            with track_job_completions() as job:
+                second = await generate_forecast_from_prompt_async("prompt")
+
+        assert first.titulo == second.titulo == "Semana 1"
+        # Two full streams plus a few deltas of the aborted one
+        full_tokens = len(json.dumps(first.model_dump())) // 4
+        assert app.state.sent_tokens < 2 * full_tokens + 40
+
+        stats = streaming_stats()
+        assert stats["streams"] == 3
+        assert stats["aborts"] == 1
+        assert stats["abort_reasons"] == {"max_length": 1}
+        assert stats["tokens_saved"] > 0
+        assert job.early_aborts == 1
+        assert job.retries == 1
+
+    async def test_disabled_by_default(self, monkeypatch):
+        app = fake_openai_app()
+
+        with serve(app) as base_url:
+            monkeypatch.setenv("OPENAI_BASE_URL", f"{base_url}/v1")
+            await generate_forecast_from_prompt_async("prompt")
+
+        assert streaming_stats()["streams"] == 0
+        assert app.state.sent_tokens > 0
@@ -0,0 +1,96 @@
+"""
+Tests for strict structured-output schemas and the completion retry metric.
+"""
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.config import get_settings
+from app.models.forecast import ForecastContent
+from app.models.reading import ReadingContent
+from app.services.forecast_generator import generate_forecast_from_prompt_async
+from app.services.structured_outputs import (
+    completions_stats,
+    model_response_format,
+    record_completion,
+    reset_completions_stats,
+    strict_json_schema,
+)
+
+
+@pytest.fixture(autouse=True)
+def clean_stats():
+    reset_completions_stats()
+    yield
+    reset_completions_stats()
+
+
+def completion(payload):
+    message = MagicMock(content=json.dumps(payload))
+    return MagicMock(choices=[MagicMock(message=message)], usage=None)
+
+
+class TestStrictJsonSchema:
+    """Tests for strict_json_schema."""
+
+    def test_all_fields_required_no_extras(self):
+        schema = strict_json_schema(ReadingContent)
+
+        assert schema["required"] == ["arcano", "titulo", "interpretacao", "sombra", "conselho"]
+        assert schema["additionalProperties"] is False
+        assert all(prop["type"] == "string" for prop in schema["properties"].values())
+
+    def test_lengths_in_descriptions(self):
+        properties = strict_json_schema(ReadingContent)["properties"]
+
+        assert properties["interpretacao"]["description"].endswith("(200 a 2000 caracteres)")
+        assert properties["titulo"]["description"].endswith("(até 100 caracteres)")
+        assert "maxLength" not in properties["titulo"]
+
+    def test_length_keywords_opt_in(self, monkeypatch):
+        monkeypatch.setenv("STRUCTURED_OUTPUT_LENGTH_KEYWORDS", "true")
+
+        properties = strict_json_schema(ForecastContent)["properties"]
+
+        assert properties["conteudo"]["minLength"] == 200
+        assert properties["conteudo"]["maxLength"] == 10000
+        assert properties["resumo"]["description"] == "Até 200 caracteres"
+
+    def test_response_format(self, monkeypatch):
+        response_format = model_response_format(ForecastContent, "forecast")
+        assert response_format["type"] == "json_schema"
+        assert response_format["json_schema"]["strict"] is True
+        assert response_format["json_schema"]["name"] == "forecast"
+
+        monkeypatch.setenv("STRUCTURED_OUTPUTS_ENABLED", "false")
+        get_settings.cache_clear()
+        assert model_response_format(ForecastContent) == {"type": "json_object"}
+
+
+class TestCompletionStats:
+    """Tests for the retry-rate counters."""
+
+    def test_retry_rate(self):
+        for valid in (True, True, False, True):
+            record_completion("reading", valid)
+
+        stats = completions_stats()["by_kind"]["reading"]
+        assert stats == {"completions": 4, "invalid": 1, "retry_rate": 0.25}
+
+    async def test_invalid_forecast_asked_again(self):
+        valid = {"titulo": "Semana", "resumo": "Ajustes.", "conteudo": "Um período de escuta e ajustes. " * 10}
+        client = MagicMock()
+        client.chat.completions.create = AsyncMock(side_effect=[
+            completion({**valid, "conteudo": "curto"}),
+            completion(valid),
+        ])
+
+        with patch("app.services.forecast_generator.get_async_openai_client", return_value=client):
+            forecast = await generate_forecast_from_prompt_async("prompt")
+
+        assert forecast.titulo == "Semana"
+        assert client.chat.completions.create.await_count == 2
+        sent = client.chat.completions.create.call_args.kwargs["response_format"]
+        assert sent["json_schema"]["schema"]["required"] == ["titulo", "resumo", "conteudo"]
+        assert completions_stats()["by_kind"]["forecast"]["retry_rate"] == 0.5
@@ -0,0 +1,42 @@
+-- Migration: 014_jobs_notify_trigger
+-- Description: NOTIFY the worker when jobs become claimable or subscriptions activate
+
+-- Payload: {"type": ..., "scheduled_at": ...} so the worker can wake
+-- exactly when a retry becomes due. Identical payloads in one transaction
+-- are folded into a single notification by Postgres.
+CREATE OR REPLACE FUNCTION notify_job_pending()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  PERFORM pg_notify(
+    'jobs_pending',
+    json_build_object('type', NEW.type, 'scheduled_at', NEW.scheduled_at)::text
+  );
+  RETURN NULL;
+END;
+$$;
+
+-- New jobs and retries (status/scheduled_at reset to pending)
+CREATE TRIGGER jobs_notify_pending
+  AFTER INSERT OR UPDATE OF status, scheduled_at ON jobs
+  FOR EACH ROW
+  WHEN (NEW.status = 'pending')
+  EXECUTE FUNCTION notify_job_pending();
+
+-- Activated subscriptions need their reading jobs enqueued
+CREATE OR REPLACE FUNCTION notify_subscription_active()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  PERFORM pg_notify('jobs_pending', json_build_object('type', 'subscription')::text);
+  RETURN NULL;
+END;
+$$;
+
+CREATE TRIGGER subscriptions_notify_active
+  AFTER INSERT OR UPDATE OF status ON subscriptions
+  FOR EACH ROW
+  WHEN (NEW.status = 'active')
+  EXECUTE FUNCTION notify_subscription_active();
@@ -0,0 +1,5 @@
+-- Migration: 015_subscriptions_keyset_index
+-- Description: Index for keyset pagination over active subscriptions
+
+-- Worker pages with: WHERE status = 'active' AND user_id > $last ORDER BY user_id LIMIT $n
+CREATE INDEX subscriptions_status_user_id_idx ON subscriptions(status, user_id);
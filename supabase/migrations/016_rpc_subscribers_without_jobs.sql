@@ -0,0 +1,41 @@
+-- Migration: 016_rpc_subscribers_without_jobs
+-- Description: Set-based lookup of active subscribers that have no reading jobs yet
+
+-- Incremental mode: pass changed_since to only consider subscriptions
+-- created/updated after the worker's last check.
+CREATE OR REPLACE FUNCTION get_subscribers_without_reading_jobs(
+  changed_since TIMESTAMPTZ DEFAULT NULL,
+  max_rows INTEGER DEFAULT 1000
+)
+RETURNS TABLE (user_id UUID)
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+SET search_path = public
+AS $$
+  SELECT s.user_id
+  FROM subscriptions s
+  WHERE s.status = 'active'
+    AND (changed_since IS NULL OR s.updated_at >= changed_since)
+    AND NOT EXISTS (
+      -- Served by jobs_user_id_idx
+      SELECT 1
+      FROM jobs j
+      WHERE j.user_id = s.user_id
+        AND j.type = 'generate_reading'
+    )
+  ORDER BY s.user_id
+  LIMIT max_rows;
+$$;
+
+-- Incremental scans read only recently changed active subscriptions
+CREATE INDEX subscriptions_active_updated_at_idx ON subscriptions(updated_at)
+  WHERE status = 'active';
+
+REVOKE ALL ON FUNCTION get_subscribers_without_reading_jobs(TIMESTAMPTZ, INTEGER) FROM anon;
+REVOKE ALL ON FUNCTION get_subscribers_without_reading_jobs(TIMESTAMPTZ, INTEGER) FROM authenticated;
+GRANT EXECUTE ON FUNCTION get_subscribers_without_reading_jobs(TIMESTAMPTZ, INTEGER) TO service_role;
+
+COMMENT ON FUNCTION get_subscribers_without_reading_jobs IS
+'Active subscribers with no generate_reading jobs. Only callable by service_role.
+Pass changed_since for an incremental check of recently changed subscriptions.';
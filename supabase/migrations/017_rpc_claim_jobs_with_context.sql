@@ -0,0 +1,70 @@
+-- Migration: 017_rpc_claim_jobs_with_context
+-- Description: Claim pending jobs together with the profile and active prompt they need
+
+-- Same claim semantics as claim_pending_jobs (FOR UPDATE SKIP LOCKED), but
+-- each returned row is the job as JSON plus:
+--   profile: {full_name, birthdate}   (null if the profile is missing)
+--   prompt:  {section, version, template} for the job's section
+--            (null if there is no active prompt)
+-- so the worker can start the LLM call without further round trips.
+CREATE OR REPLACE FUNCTION claim_pending_jobs_with_context(job_limit INTEGER DEFAULT 10)
+RETURNS SETOF JSONB
+LANGUAGE sql
+VOLATILE
+SECURITY DEFINER
+SET search_path = public
+AS $$
+  WITH claimed AS (
+    SELECT id
+    FROM jobs
+    WHERE status = 'pending'
+      AND scheduled_at <= NOW()
+      AND attempts < max_attempts
+    ORDER BY scheduled_at ASC
+    LIMIT job_limit
+    FOR UPDATE SKIP LOCKED
+  ),
+  updated AS (
+    UPDATE jobs j
+    SET
+      status = 'processing',
+      started_at = NOW(),
+      attempts = j.attempts + 1
+    FROM claimed c
+    WHERE j.id = c.id
+    RETURNING j.*
+  )
+  SELECT to_jsonb(u) || jsonb_build_object(
+    'profile', CASE WHEN p.id IS NULL THEN NULL ELSE jsonb_build_object(
+      'full_name', p.full_name,
+      'birthdate', p.birthdate
+    ) END,
+    'prompt', CASE WHEN pr.id IS NULL THEN NULL ELSE jsonb_build_object(
+      'section', pr.section,
+      'version', pr.version,
+      'template', pr.template
+    ) END
+  )
+  FROM updated u
+  LEFT JOIN profiles p ON p.id = u.user_id
+  LEFT JOIN LATERAL (
+    -- Served by prompts_one_active_per_section
+    SELECT id, section, version, template
+    FROM prompts
+    WHERE is_active = true
+      AND section::text = CASE u.type
+        WHEN 'generate_forecast' THEN 'forecast_' || (u.payload->>'forecast_type')
+        ELSE COALESCE(u.payload->>'section', 'missao_da_alma')
+      END
+  ) pr ON true
+  ORDER BY u.scheduled_at ASC;
+$$;
+
+REVOKE ALL ON FUNCTION claim_pending_jobs_with_context(INTEGER) FROM anon;
+REVOKE ALL ON FUNCTION claim_pending_jobs_with_context(INTEGER) FROM authenticated;
+GRANT EXECUTE ON FUNCTION claim_pending_jobs_with_context(INTEGER) TO service_role;
+
+COMMENT ON FUNCTION claim_pending_jobs_with_context IS
+'Claims pending jobs like claim_pending_jobs and returns each job with its
+profile (full_name, birthdate) and active prompt (version, template).
+Only callable by service_role.';
@@ -0,0 +1,28 @@
+-- Migration: 018_create_generation_cache
+-- Description: Shared cache of name-neutral LLM generations reused across users
+
+-- A reading depends only on (section, ponto_valor, prompt_version, model);
+-- the user's name is the one per-user input. The worker stores a few
+-- variants per key with a {nome} placeholder and personalizes on use.
+CREATE TABLE generation_cache (
+  kind TEXT NOT NULL,                -- 'reading', ...
+  cache_key TEXT NOT NULL,           -- e.g. 'destino:2:1.0.0:gpt-4o'
+  variant SMALLINT NOT NULL,
+  content JSONB NOT NULL,
+  prompt_version TEXT NOT NULL,
+  model_used TEXT NOT NULL,
+  created_at TIMESTAMPTZ DEFAULT NOW() NOT NULL,
+  expires_at TIMESTAMPTZ,
+
+  PRIMARY KEY (kind, cache_key, variant)
+);
+
+CREATE INDEX generation_cache_expires_idx ON generation_cache(expires_at)
+  WHERE expires_at IS NOT NULL;
+
+-- Worker-only table: no policies, service_role bypasses RLS
+ALTER TABLE generation_cache ENABLE ROW LEVEL SECURITY;
+
+COMMENT ON TABLE generation_cache IS
+'Name-neutral LLM outputs keyed by their non-personal inputs. Content holds
+a {nome} placeholder that the worker replaces with the user''s name.';
@@ -0,0 +1,88 @@
+-- Migration: 019_reading_bundle_jobs
+-- Description: Support generate_reading_bundle jobs (all five sections in one job)
+
+-- A subscriber with a bundle job already has their readings enqueued
+CREATE OR REPLACE FUNCTION get_subscribers_without_reading_jobs(
+  changed_since TIMESTAMPTZ DEFAULT NULL,
+  max_rows INTEGER DEFAULT 1000
+)
+RETURNS TABLE (user_id UUID)
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+SET search_path = public
+AS $$
+  SELECT s.user_id
+  FROM subscriptions s
+  WHERE s.status = 'active'
+    AND (changed_since IS NULL OR s.updated_at >= changed_since)
+    AND NOT EXISTS (
+      -- Served by jobs_user_id_idx
+      SELECT 1
+      FROM jobs j
+      WHERE j.user_id = s.user_id
+        AND j.type IN ('generate_reading', 'generate_reading_bundle')
+    )
+  ORDER BY s.user_id
+  LIMIT max_rows;
+$$;
+
+COMMENT ON FUNCTION get_subscribers_without_reading_jobs IS
+'Active subscribers with no generate_reading or generate_reading_bundle jobs.
+Only callable by service_role. Pass changed_since for an incremental check.';
+
+-- Bundle jobs carry no single section prompt
+CREATE OR REPLACE FUNCTION claim_pending_jobs_with_context(job_limit INTEGER DEFAULT 10)
+RETURNS SETOF JSONB
+LANGUAGE sql
+VOLATILE
+SECURITY DEFINER
+SET search_path = public
+AS $$
+  WITH claimed AS (
+    SELECT id
+    FROM jobs
+    WHERE status = 'pending'
+      AND scheduled_at <= NOW()
+      AND attempts < max_attempts
+    ORDER BY scheduled_at ASC
+    LIMIT job_limit
+    FOR UPDATE SKIP LOCKED
+  ),
+  updated AS (
+    UPDATE jobs j
+    SET
+      status = 'processing',
+      started_at = NOW(),
+      attempts = j.attempts + 1
+    FROM claimed c
+    WHERE j.id = c.id
+    RETURNING j.*
+  )
+  SELECT to_jsonb(u) || jsonb_build_object(
+    'profile', CASE WHEN p.id IS NULL THEN NULL ELSE jsonb_build_object(
+      'full_name', p.full_name,
+      'birthdate', p.birthdate
+    ) END,
+    'prompt', CASE WHEN pr.id IS NULL THEN NULL ELSE jsonb_build_object(
+      'section', pr.section,
+      'version', pr.version,
+      'template', pr.template
+    ) END
+  )
+  FROM updated u
+  LEFT JOIN profiles p ON p.id = u.user_id
+  LEFT JOIN LATERAL (
+    -- Served by prompts_one_active_per_section
+    SELECT id, section, version, template
+    FROM prompts
+    WHERE is_active = true
+      AND section::text = CASE u.type
+        WHEN 'generate_forecast' THEN 'forecast_' || (u.payload->>'forecast_type')
+        -- Bundles need all five section prompts (cached by the worker)
+        WHEN 'generate_reading_bundle' THEN NULL
+        ELSE COALESCE(u.payload->>'section', 'missao_da_alma')
+      END
+  ) pr ON true
+  ORDER BY u.scheduled_at ASC;
+$$;
@@ -0,0 +1,31 @@
+-- Migration: 020_create_forecast_batches
+-- Description: Track offline (OpenAI Batch API) forecast generations
+
+-- One row per submitted batch: the worker polls 'submitted' rows, ingests
+-- completed ones into forecasts (delivered_at NULL until the delivery
+-- cron releases them) and falls back to realtime jobs on failure.
+CREATE TABLE forecast_batches (
+  id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+  openai_batch_id TEXT NOT NULL UNIQUE,
+  input_file_id TEXT NOT NULL,
+  output_file_id TEXT,
+  type forecast_type NOT NULL,
+  period_start DATE NOT NULL,
+  period_end DATE NOT NULL,
+  prompt_version TEXT NOT NULL,
+  model_used TEXT NOT NULL,
+  request_count INTEGER NOT NULL,
+  status TEXT NOT NULL DEFAULT 'submitted'
+    CHECK (status IN ('submitted', 'ingested', 'failed', 'cancelled')),
+  result JSONB,
+  error TEXT,
+  created_at TIMESTAMPTZ DEFAULT NOW() NOT NULL,
+  ingested_at TIMESTAMPTZ
+);
+
+CREATE INDEX forecast_batches_submitted_idx ON forecast_batches(created_at)
+  WHERE status = 'submitted';
+CREATE INDEX forecast_batches_period_idx ON forecast_batches(type, period_start);
+
+-- Worker-only table: no policies, service_role bypasses RLS
+ALTER TABLE forecast_batches ENABLE ROW LEVEL SECURITY;
@@ -0,0 +1,27 @@
+-- Migration: 021_create_audio_cache
+-- Description: Content-addressed cache of synthesized forecast audio
+
+-- Forecast audio depends only on the text and the TTS settings, so the
+-- worker stores it once under forecasts-audio/cache/{audio_key}.mp3 and
+-- indexes it here. Retried jobs and repeated texts reuse the object.
+CREATE TABLE audio_cache (
+  audio_key TEXT PRIMARY KEY,        -- sha256 of text, voice, model and audio settings
+  storage_path TEXT NOT NULL,        -- path in the forecasts-audio bucket
+  duration_seconds REAL NOT NULL,
+  size_bytes INT,
+  voice_id TEXT NOT NULL,
+  model_used TEXT NOT NULL,
+  created_at TIMESTAMPTZ DEFAULT NOW() NOT NULL,
+  expires_at TIMESTAMPTZ             -- latest expiry of a forecast using it (NULL = kept)
+);
+
+CREATE INDEX audio_cache_expires_idx ON audio_cache(expires_at)
+  WHERE expires_at IS NOT NULL;
+
+-- Worker-only table: no policies, service_role bypasses RLS
+ALTER TABLE audio_cache ENABLE ROW LEVEL SECURITY;
+
+COMMENT ON TABLE audio_cache IS
+'Synthesized forecast audio keyed by a hash of its text and TTS settings.
+Objects under cache/ are shared between forecasts and removed with their
+row once expires_at passes, not with each forecast.';
@@ -0,0 +1,111 @@
+-- Migration: 022_forecast_audio_jobs
+-- Description: Job priorities and generate_forecast_audio jobs (audio filled in after delivery)
+
+-- Lower runs first; generate_forecast_audio jobs use 10 so they run
+-- behind readings and forecast text
+ALTER TABLE jobs ADD COLUMN priority SMALLINT NOT NULL DEFAULT 0;
+
+COMMENT ON COLUMN jobs.priority IS 'Claim order among due jobs: lower first (0 = default, 10 = forecast audio).';
+
+DROP INDEX IF EXISTS jobs_pending_scheduled_idx;
+CREATE INDEX jobs_pending_priority_scheduled_idx ON jobs(priority, scheduled_at)
+  WHERE status = 'pending';
+
+CREATE OR REPLACE FUNCTION claim_pending_jobs(job_limit INTEGER DEFAULT 10)
+RETURNS SETOF jobs
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  claimed_jobs jobs[];
+BEGIN
+  -- Claim jobs atomically
+  WITH claimed AS (
+    SELECT *
+    FROM jobs
+    WHERE status = 'pending'
+      AND scheduled_at <= NOW()
+      AND attempts < max_attempts
+    ORDER BY priority ASC, scheduled_at ASC
+    LIMIT job_limit
+    FOR UPDATE SKIP LOCKED
+  )
+  UPDATE jobs j
+  SET
+    status = 'processing',
+    started_at = NOW(),
+    attempts = attempts + 1
+  FROM claimed c
+  WHERE j.id = c.id
+  RETURNING j.* INTO claimed_jobs;
+
+  -- Return the claimed jobs
+  RETURN QUERY
+  SELECT *
+  FROM jobs
+  WHERE status = 'processing'
+    AND started_at >= NOW() - INTERVAL '1 minute'
+    AND id = ANY(
+      SELECT id FROM unnest(claimed_jobs)
+    );
+END;
+$$;
+
+-- Audio jobs need no prompt; profile is unused but harmless
+CREATE OR REPLACE FUNCTION claim_pending_jobs_with_context(job_limit INTEGER DEFAULT 10)
+RETURNS SETOF JSONB
+LANGUAGE sql
+VOLATILE
+SECURITY DEFINER
+SET search_path = public
+AS $$
+  WITH claimed AS (
+    SELECT id
+    FROM jobs
+    WHERE status = 'pending'
+      AND scheduled_at <= NOW()
+      AND attempts < max_attempts
+    -- Served by jobs_pending_priority_scheduled_idx
+    ORDER BY priority ASC, scheduled_at ASC
+    LIMIT job_limit
+    FOR UPDATE SKIP LOCKED
+  ),
+  updated AS (
+    UPDATE jobs j
+    SET
+      status = 'processing',
+      started_at = NOW(),
+      attempts = j.attempts + 1
+    FROM claimed c
+    WHERE j.id = c.id
+    RETURNING j.*
+  )
+  SELECT to_jsonb(u) || jsonb_build_object(
+    'profile', CASE WHEN p.id IS NULL THEN NULL ELSE jsonb_build_object(
+      'full_name', p.full_name,
+      'birthdate', p.birthdate
+    ) END,
+    'prompt', CASE WHEN pr.id IS NULL THEN NULL ELSE jsonb_build_object(
+      'section', pr.section,
+      'version', pr.version,
+      'template', pr.template
+    ) END
+  )
+  FROM updated u
+  LEFT JOIN profiles p ON p.id = u.user_id
+  LEFT JOIN LATERAL (
+    -- Served by prompts_one_active_per_section
+    SELECT id, section, version, template
+    FROM prompts
+    WHERE is_active = true
+      AND section::text = CASE u.type
+        WHEN 'generate_forecast' THEN 'forecast_' || (u.payload->>'forecast_type')
+        -- Bundles need all five section prompts (cached by the worker)
+        WHEN 'generate_reading_bundle' THEN NULL
+        WHEN 'generate_forecast_audio' THEN NULL
+        ELSE COALESCE(u.payload->>'section', 'missao_da_alma')
+      END
+  ) pr ON true
+  ORDER BY u.priority ASC, u.scheduled_at ASC;
+$$;